@@ -0,0 +1,73 @@
+# benchmarks/__main__.py
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+from benchmarks.end_to_end import end_to_end_benchmarks
+from benchmarks.micro import micro_benchmarks
+from benchmarks.regression import (
+    DEFAULT_TOLERANCE,
+    compare_reports,
+    format_comparison,
+    load_report,
+    make_report,
+    save_report
+)
+from benchmarks.synthetic import SyntheticAddressGenerator, load_canonical
+from src.processing.index_store import CANONICAL_PATH
+
+BASELINE_PATH = "benchmarks/baseline.json"
+RESULTS_DIR = "benchmarks/results"
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Run matching benchmarks and compare them with a baseline")
+    parser.add_argument('--suite', nargs='+', choices=['micro', 'e2e'], default=['micro', 'e2e'])
+    parser.add_argument('--canonical', default=CANONICAL_PATH, help="Canonical address CSV")
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000],
+                        help="Transaction counts of the end-to-end runs")
+    parser.add_argument('--workers', nargs='+', type=int, default=[1, 2],
+                        help="Worker counts of the end-to-end runs")
+    parser.add_argument('--canonical-scales', nargs='+', type=int, default=[1, 4],
+                        help="Canonical set size multiples of the end-to-end runs")
+    parser.add_argument('--candidates', choices=['prefix', 'trigram'], default='prefix')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5, help="Timed repetitions per microbenchmark")
+    parser.add_argument('--output', help="Result JSON; a timestamped file in benchmarks/results by default")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative slowdown before a benchmark counts as a regression")
+    parser.add_argument('--update-baseline', action='store_true', help="Store the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    canonical = load_canonical(args.canonical)
+    results = {}
+    if 'micro' in args.suite:
+        transactions = SyntheticAddressGenerator(canonical, seed=args.seed).generate(1000)
+        results.update(micro_benchmarks(canonical, transactions, repeat=args.repeat))
+    if 'e2e' in args.suite:
+        results.update(end_to_end_benchmarks(canonical, args.sizes, args.workers, args.canonical_scales,
+                                             args.seed, args.candidates))
+
+    report = make_report(results, suite=args.suite, sizes=args.sizes, workers=args.workers,
+                         canonical_scales=args.canonical_scales, candidates=args.candidates, seed=args.seed)
+    output = args.output or os.path.join(RESULTS_DIR, f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    save_report(report, output)
+    print(f"Benchmark results saved to: {output}")
+
+    if args.update_baseline:
+        save_report(report, args.baseline)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to store one")
+        return 0
+
+    rows = compare_reports(report, load_report(args.baseline), args.tolerance)
+    print(format_comparison(rows))
+    return 1 if any(row['status'] == 'regression' for row in rows) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
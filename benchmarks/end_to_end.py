@@ -0,0 +1,93 @@
+# benchmarks/end_to_end.py
+
+import time
+from multiprocessing import Pool
+from typing import Dict, Any, Sequence
+
+import pandas as pd
+
+from main import imap_bounded, init_worker, process_chunk
+from src.api.validator import AddressValidator
+from src.processing.index_store import build_indexes
+from src.processing.preprocess_utils import CanonicalTable
+from benchmarks.synthetic import SyntheticAddressGenerator, scale_canonical
+
+# Allowed absolute drop in match accuracy before it counts as a regression
+ACCURACY_TOLERANCE = 0.01
+
+def run_matching(transactions: pd.DataFrame, indexes: Dict[str, Any], workers: int,
+                 candidates: str = 'prefix') -> Dict[str, Any]:
+    """
+    Match transactions the way main.main does: bounded chunks over a pool of
+    workers that hold the indexes
+    Args:
+        transactions: Synthetic transactions with expected_hhid
+        indexes: Indexes from build_indexes
+        workers: Worker processes
+        candidates: Fuzzy candidate generator name
+    Returns:
+        Dictionary with seconds, records_per_second and accuracy
+    """
+    # Same sizing rule as main.get_optimal_chunk_size, for the given worker count
+    chunk_size = max(1000, min(len(transactions) // (workers * 4), 100000))
+    chunks = (transactions.iloc[start:start + chunk_size] for start in range(0, len(transactions), chunk_size))
+    hhids = indexes['table'].column('hhid')
+
+    correct = 0
+    start = time.perf_counter()
+    with Pool(workers, initializer=init_worker, initargs=(indexes, AddressValidator(), candidates)) as pool:
+        for chunk, (results, _) in imap_bounded(pool, process_chunk, chunks, max_pending=workers * 2):
+            ids = results['canonical_id']
+            matched = ids >= 0
+            expected = chunk.loc[results['transaction_index'], 'expected_hhid'].to_numpy()
+            correct += int((hhids[ids[matched]] == expected[matched]).sum())
+    seconds = time.perf_counter() - start
+
+    return {
+        'seconds': seconds,
+        'records_per_second': len(transactions) / seconds if seconds else 0.0,
+        'accuracy': correct / len(transactions) if len(transactions) else 0.0
+    }
+
+def end_to_end_benchmarks(canonical: pd.DataFrame, sizes: Sequence[int], workers: Sequence[int],
+                          canonical_scales: Sequence[int] = (1,), seed: int = 0,
+                          candidates: str = 'prefix') -> Dict[str, Dict[str, Any]]:
+    """
+    Index build time and matching throughput and accuracy across canonical set
+    sizes, transaction counts and worker counts
+    Args:
+        canonical: Canonical addresses
+        sizes: Transaction counts
+        workers: Worker counts
+        canonical_scales: Canonical set size multiples, see scale_canonical
+        seed: Seed of the synthetic transactions and scaled canonical sets
+        candidates: Fuzzy candidate generator name
+    Returns:
+        Benchmark entries keyed by name
+    """
+    results = {}
+    for scale in canonical_scales:
+        scaled = scale_canonical(canonical, scale, seed)
+        start = time.perf_counter()
+        indexes = build_indexes(CanonicalTable.from_frame(scaled))
+        prefix = f"e2e.canonical_{len(scaled)}"
+        results[f"{prefix}.build_indexes"] = {
+            'value': time.perf_counter() - start, 'unit': 'seconds', 'higher_is_better': False
+        }
+
+        # Transactions come from the original rows, so every scale sees the same input
+        generator = SyntheticAddressGenerator(canonical, seed=seed)
+        for size in sizes:
+            transactions = generator.generate(size)
+            for worker_count in workers:
+                run = run_matching(transactions, indexes, worker_count, candidates)
+                name = f"{prefix}.transactions_{size}.workers_{worker_count}"
+                results[f"{name}.throughput"] = {
+                    'value': run['records_per_second'], 'unit': 'records/s', 'higher_is_better': True,
+                    'seconds': run['seconds']
+                }
+                results[f"{name}.accuracy"] = {
+                    'value': run['accuracy'], 'unit': 'ratio', 'higher_is_better': True,
+                    'tolerance': ACCURACY_TOLERANCE, 'absolute': True
+                }
+    return results
@@ -0,0 +1,97 @@
+# benchmarks/micro.py
+
+import timeit
+from typing import Callable, Dict, Any, List
+
+import pandas as pd
+
+from src.matching.candidates import TrigramCandidateGenerator
+from src.matching.fallback import phonetic_fallback
+from src.matching.matcher_engine import fuzzy_match_block
+from src.processing.index_store import build_indexes
+from src.processing.preprocess_utils import (
+    CanonicalTable,
+    build_component_index,
+    build_house_index,
+    build_metaphone_index,
+    build_normalized_index_extended,
+    build_prefix_index,
+    clean,
+    make_normalized_key
+)
+
+# Index builders timed one full build at a time
+INDEX_BUILDERS = {
+    'normalized': build_normalized_index_extended,
+    'component': build_component_index,
+    'prefix': build_prefix_index,
+    'metaphone': build_metaphone_index,
+    'house': build_house_index,
+    'trigram': TrigramCandidateGenerator
+}
+
+def time_per_op(func: Callable[[], Any], ops: int, repeat: int = 5, min_time: float = 0.2) -> Dict[str, Any]:
+    """
+    Time a function that performs ops operations per call
+    Args:
+        func: Function without arguments
+        ops: Operations performed by one call
+        repeat: Timed repetitions; the fastest counts, as the others mostly measure noise
+        min_time: Minimum seconds per repetition; short calls are looped until they take this long
+    Returns:
+        Benchmark entry with seconds per operation
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < min_time and number < 1 << 20:
+        number *= 2
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+    return {'value': best / ops, 'unit': 'seconds/op', 'higher_is_better': False, 'ops': ops}
+
+def _cold_clean(values: List[str]):
+    clean.cache_clear()
+    for value in values:
+        clean(value)
+
+def micro_benchmarks(canonical: pd.DataFrame, transactions: pd.DataFrame, repeat: int = 5,
+                     sample_size: int = 500) -> Dict[str, Dict[str, Any]]:
+    """
+    Per-function benchmarks of the matching primitives
+    Args:
+        canonical: Canonical addresses
+        transactions: Synthetic transactions from SyntheticAddressGenerator
+        repeat: Timed repetitions per benchmark
+        sample_size: Transactions passed through each per-row function
+    Returns:
+        Benchmark entries keyed by name
+    """
+    table = CanonicalTable.from_frame(canonical)
+    indexes = build_indexes(table)
+    sample = transactions.head(sample_size)
+    streets = sample['street'].tolist()
+    rows = [
+        {field: clean(value) for field, value in row.items()}
+        for row in sample[['house', 'street', 'strtype', 'apttype', 'aptnbr', 'city', 'state', 'zip',
+                           'normalized_address']].to_dict('records')
+    ]
+    ops = len(rows)
+
+    results = {
+        'micro.clean.cold': time_per_op(lambda: _cold_clean(streets), ops, repeat),
+        'micro.clean.warm': time_per_op(lambda: [clean(street) for street in streets], ops, repeat),
+        'micro.make_normalized_key': time_per_op(
+            lambda: [make_normalized_key(row['house'], row['street'], row['strtype']) for row in rows], ops, repeat
+        ),
+        'micro.fuzzy_match_block': time_per_op(
+            lambda: [fuzzy_match_block(row['normalized_address'], row['street'], indexes['prefix'], table)
+                     for row in rows], ops, repeat
+        ),
+        'micro.phonetic_fallback': time_per_op(
+            lambda: [phonetic_fallback(row, indexes['metaphone'], table) for row in rows], ops, repeat
+        ),
+    }
+    for name, builder in INDEX_BUILDERS.items():
+        entry = time_per_op(lambda: builder(table), 1, repeat=min(repeat, 3))
+        entry['canonical_rows'] = len(table)
+        results[f'micro.build_index.{name}'] = entry
+    return results
@@ -0,0 +1,82 @@
+# benchmarks/regression.py
+
+import json
+import os
+import platform
+from datetime import datetime
+from multiprocessing import cpu_count
+from typing import Dict, Any, List
+
+# Allowed relative slowdown before a benchmark counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+def make_report(results: Dict[str, Dict[str, Any]], **settings) -> Dict[str, Any]:
+    """Wrap benchmark entries with the machine and settings they were measured on"""
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'machine': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': cpu_count()
+        },
+        'settings': settings,
+        'results': results
+    }
+
+def save_report(report: Dict[str, Any], path: str):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+def compare_reports(current: Dict[str, Any], baseline: Dict[str, Any],
+                    tolerance: float = DEFAULT_TOLERANCE) -> List[Dict[str, Any]]:
+    """
+    Compare benchmark entries with a baseline report.
+    An entry regresses when it is worse than the baseline by more than its own
+    tolerance, or the default one; tolerances are relative unless the entry
+    is marked absolute.
+    Args:
+        current: Report from make_report
+        baseline: Stored baseline report
+        tolerance: Default relative tolerance
+    Returns:
+        One row per benchmark with name, baseline, current, change and status,
+        which is ok, regression, improvement, new or missing
+    """
+    current_results, baseline_results = current['results'], baseline['results']
+    rows = []
+    for name in sorted(set(current_results) | set(baseline_results)):
+        entry, base = current_results.get(name), baseline_results.get(name)
+        if base is None or entry is None:
+            rows.append({'name': name, 'baseline': base and base['value'], 'current': entry and entry['value'],
+                         'change': None, 'status': 'new' if base is None else 'missing'})
+            continue
+
+        allowed = entry.get('tolerance', tolerance)
+        if entry.get('absolute'):
+            change = entry['value'] - base['value']
+        else:
+            change = (entry['value'] - base['value']) / base['value'] if base['value'] else 0.0
+        # Positive when the benchmark got worse
+        worse = -change if entry.get('higher_is_better') else change
+        status = 'regression' if worse > allowed else 'improvement' if worse < -allowed else 'ok'
+        rows.append({'name': name, 'baseline': base['value'], 'current': entry['value'],
+                     'change': change, 'status': status})
+    return rows
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    """Render a comparison as a text table, regressions first"""
+    order = {'regression': 0, 'missing': 1, 'improvement': 2, 'new': 3, 'ok': 4}
+    lines = ["\n=== Benchmark Comparison ===", f"{'benchmark':<60} {'baseline':>12} {'current':>12} {'change':>9}  status"]
+    for row in sorted(rows, key=lambda row: (order[row['status']], row['name'])):
+        baseline = '-' if row['baseline'] is None else f"{row['baseline']:.4g}"
+        current = '-' if row['current'] is None else f"{row['current']:.4g}"
+        change = '-' if row['change'] is None else f"{row['change']:+.1%}"
+        lines.append(f"{row['name']:<60} {baseline:>12} {current:>12} {change:>9}  {row['status']}")
+    regressions = sum(row['status'] == 'regression' for row in rows)
+    lines.append(f"\n{regressions} regression(s) in {len(rows)} benchmarks")
+    return "\n".join(lines)
@@ -0,0 +1,151 @@
+# benchmarks/synthetic.py
+
+import string
+from typing import Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.processing.normalizer import ABBREVIATIONS, normalize_column
+from src.processing.preprocess_utils import phonetic_column
+from src.processing.table_io import read_table
+
+# Full spellings of the abbreviations used in canonical addresses, e.g. ST -> STREET
+EXPANSIONS = {abbr.upper(): word.upper() for word, abbr in ABBREVIATIONS.items()}
+
+# Spellings of the apartment designator seen in transactions
+UNIT_PREFIXES = ('APT ', 'UNIT ', '#', 'APT. ', 'APARTMENT ')
+
+# Transaction columns written by preprocessing, plus the canonical hhid each row was drawn from
+SYNTHETIC_COLUMNS = ['transaction_id', 'original_address', 'normalized_address',
+                     'house', 'street', 'strtype', 'apttype', 'aptnbr', 'city', 'state', 'zip',
+                     'street_phonetic', 'expected_hhid']
+
+def _text(value) -> str:
+    return '' if value is None or value != value else str(value)
+
+class SyntheticAddressGenerator:
+    """
+    Seeded generator of preprocessed transactions drawn from a canonical address set.
+
+    Each transaction copies a random canonical address and then, with the given
+    probabilities, misspells the street, spells out or abbreviates the street
+    type, rewrites or drops the unit designator, and swaps in a neighbourhood
+    city name. The source hhid is kept as expected_hhid so match accuracy can
+    be measured. The same seed always yields the same transactions.
+    """
+
+    def __init__(self, canonical: pd.DataFrame, seed: int = 0, typo_rate: float = 0.3,
+                 abbreviation_rate: float = 0.5, unit_rate: float = 0.5, city_rate: float = 0.2):
+        """
+        Args:
+            canonical: Canonical addresses with the columns of 11211 Addresses.csv
+            seed: Random seed
+            typo_rate: Probability of a one-character typo in the street name
+            abbreviation_rate: Probability of spelling out the street type
+            unit_rate: Probability of rewriting the unit designator; a quarter of these drop the unit
+            city_rate: Probability of using WILLIAMSBURG as the city
+        """
+        self.canonical = canonical.reset_index(drop=True)
+        self.seed = seed
+        self.typo_rate = typo_rate
+        self.abbreviation_rate = abbreviation_rate
+        self.unit_rate = unit_rate
+        self.city_rate = city_rate
+
+    @staticmethod
+    def _typo(word: str, rng: np.random.Generator) -> str:
+        """Delete, replace, insert or transpose one letter"""
+        if len(word) < 3:
+            return word
+        pos = int(rng.integers(1, len(word) - 1))
+        letter = string.ascii_uppercase[int(rng.integers(26))]
+        kind = int(rng.integers(4))
+        if kind == 0:
+            return word[:pos] + word[pos + 1:]
+        if kind == 1:
+            return word[:pos] + letter + word[pos + 1:]
+        if kind == 2:
+            return word[:pos] + letter + word[pos:]
+        return word[:pos - 1] + word[pos] + word[pos - 1] + word[pos + 1:]
+
+    def _transaction(self, record: Dict[str, Any], rng: np.random.Generator) -> Dict[str, Any]:
+        house, street, strtype = _text(record['house']), _text(record['street']), _text(record['strtype'])
+        apttype, aptnbr = _text(record.get('apttype')), _text(record.get('aptnbr'))
+        city = _text(record.get('city'))
+
+        if street and rng.random() < self.typo_rate:
+            street = self._typo(street, rng)
+        if rng.random() < self.abbreviation_rate:
+            strtype = EXPANSIONS.get(strtype.upper(), strtype)
+        unit = f"{apttype} {aptnbr}".strip()
+        if aptnbr and rng.random() < self.unit_rate:
+            if rng.random() < 0.25:
+                apttype, aptnbr, unit = '', '', ''
+            else:
+                prefix = UNIT_PREFIXES[int(rng.integers(len(UNIT_PREFIXES)))]
+                apttype, unit = prefix.strip(' #.'), prefix + aptnbr
+        if rng.random() < self.city_rate:
+            city = 'WILLIAMSBURG'
+
+        return {
+            'original_address': ' '.join(part for part in (house, street, strtype, unit) if part).title(),
+            'house': house,
+            'street': street.title(),
+            'strtype': strtype.title(),
+            'apttype': apttype.title(),
+            'aptnbr': aptnbr,
+            'city': city.title(),
+            'state': _text(record.get('state')),
+            'zip': _text(record.get('zip')),
+            'expected_hhid': record['hhid']
+        }
+
+    def generate(self, count: int) -> pd.DataFrame:
+        """
+        Generate transactions
+        Args:
+            count: Number of transactions
+        Returns:
+            DataFrame with SYNTHETIC_COLUMNS
+        """
+        rng = np.random.default_rng(self.seed)
+        rows = rng.integers(len(self.canonical), size=count)
+        records = self.canonical.to_dict('records')
+        frame = pd.DataFrame([self._transaction(records[row], rng) for row in rows.tolist()])
+        if frame.empty:
+            return pd.DataFrame(columns=SYNTHETIC_COLUMNS)
+
+        frame['transaction_id'] = [f"synthetic-{self.seed}-{number}" for number in range(count)]
+        frame['normalized_address'] = normalize_column(frame['original_address'], case='upper', drop_unit=True)
+        frame['street_phonetic'] = phonetic_column(frame['street'])
+        return frame[SYNTHETIC_COLUMNS]
+
+def scale_canonical(canonical: pd.DataFrame, factor: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Grow a canonical set factor times by adding copies of every street with
+    house numbers shifted by multiples of 10000 and fresh hhids, so the scaled
+    set keeps the street distribution of the original.
+    Args:
+        canonical: Canonical addresses
+        factor: Size multiple; 1 returns the original rows
+        seed: Seed of the generated hhids
+    Returns:
+        Canonical addresses, the original rows first
+    """
+    rng = np.random.default_rng(seed)
+    copies = [canonical]
+    for copy in range(1, factor):
+        shifted = canonical.copy()
+        offset = copy * 10000
+        shifted['house'] = shifted['house'].astype(str).str.replace(
+            r'\d+', lambda match: str(int(match.group()) + offset), regex=True
+        )
+        shifted['hhid'] = [f"{value:040X}" for value in rng.integers(2 ** 62, size=len(shifted)).tolist()]
+        copies.append(shifted)
+    return pd.concat(copies, ignore_index=True)
+
+def load_canonical(path: str, limit: Optional[int] = None) -> pd.DataFrame:
+    """Read canonical addresses the way index_store does, optionally only the first limit rows"""
+    canonical = read_table(path, dtype=str)
+    return canonical if limit is None else canonical.head(limit)
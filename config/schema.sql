@@ -1,8 +1,19 @@
 -- schema.sql
 
+-- Raw transactions, as listed in the source export
+CREATE TABLE raw_transactions (
+    id VARCHAR(100) PRIMARY KEY,
+    address_line_1 TEXT,
+    address_line_2 TEXT,
+    city VARCHAR(100),
+    state VARCHAR(2),
+    zip_code VARCHAR(10),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Transactions table
 CREATE TABLE transactions (
-    transaction_id VARCHAR(50) PRIMARY KEY,
+    transaction_id VARCHAR(100) PRIMARY KEY,
     house VARCHAR(50),
     street VARCHAR(100),
     strtype VARCHAR(50),
@@ -13,6 +24,7 @@ CREATE TABLE transactions (
     zip VARCHAR(10),
     original_address TEXT,
     normalized_address TEXT,
+    street_phonetic TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -34,7 +46,8 @@ CREATE TABLE canonical_addresses (
 -- Matching results table
 CREATE TABLE matching_results (
     result_id SERIAL PRIMARY KEY,
-    transaction_id VARCHAR(50),
+    run_id VARCHAR(64) NOT NULL,
+    transaction_id VARCHAR(100),
     matched_address_id VARCHAR(50),
     confidence_score DECIMAL(4,3),
     match_type VARCHAR(20),
@@ -42,6 +55,8 @@ CREATE TABLE matching_results (
     normalized_address TEXT,
     matched_address TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- One result per transaction and matching run, so a rerun upserts instead of duplicating
+    UNIQUE (run_id, transaction_id),
     FOREIGN KEY (transaction_id) REFERENCES transactions(transaction_id),
     FOREIGN KEY (matched_address_id) REFERENCES canonical_addresses(hhid)
 );
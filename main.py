@@ -1,22 +1,28 @@
 # main.py
 
 import pandas as pd
+import argparse
 import logging
+import queue
+from contextlib import nullcontext
 from datetime import datetime
 from tqdm import tqdm
 from multiprocessing import Pool, cpu_count
-from src.matching.matcher_engine import (
-    exact_match_dict,
-    fuzzy_match_block
-)
-from src.matching.fallback import phonetic_fallback, api_fallback
+from src.api.validator import AddressValidator, AsyncValidatorClient
+from src.matching.cascade import MATCH_TYPES, match_transactions, build_results_frame
+from src.matching.candidates import make_candidate_generator
+from src.matching.match_store import MatchStore
+from src.processing.preprocess_utils import clean
+from src.processing.table_io import count_records, iter_batches, with_format
+from src.utils.checkpoint import CHECKPOINT_DIR, RunCheckpoint
 from src.utils.performance_monitor import PerformanceMonitor
-from src.processing.preprocess_utils import (
-    clean, 
-    make_normalized_key, 
-    build_prefix_index, 
-    build_metaphone_index, 
-    build_normalized_index_extended
+from src.processing.index_store import (
+    CANONICAL_PATH,
+    INDEX_PATH,
+    artifact_version,
+    build_index_artifact,
+    load_or_build_indexes,
+    update_index_artifact
 )
 from src.reporting.report_generator import (
     generate_matching_summary,
@@ -31,39 +37,19 @@ import psutil
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-class AddressValidator:
-    """Mock API validator for address validation"""
-    def __init__(self):
-        pass
-
-    def validate_address(self, address):
-        return address, 0.95
-
-def build_row(txn, match, score, match_type):
-    """Build a result row with transaction and match information"""
-    return {
-        'transaction_id': txn['transaction_id'],
-        'matched_address_id': match['hhid'] if match else None,
-        'confidence_score': score,
-        'match_type': match_type,
-        'original_address': txn['original_address'],
-        'normalized_address': txn['normalized_address'],
-        'matched_address': f"{match['house']} {match['street']} {match['strtype']}" if match else None
-    }
-
 def get_optimal_workers():
     """
     Calculate optimal number of workers based on system resources.
     Returns the optimal number of worker processes based on available CPU cores and memory.
     """
-    cpu_count = cpu_count()
+    cores = cpu_count()
     memory_gb = psutil.virtual_memory().total / (1024 * 1024 * 1024)
     
     # Calculate workers based on CPU and memory
-    cpu_based = cpu_count
+    cpu_based = cores
     memory_based = int(memory_gb * 2)  # Assuming 0.5GB memory per worker
     
-    return min(cpu_based, memory_based, 8)  # Limit maximum workers to 8
+    return max(1, min(cpu_based, memory_based, 8))  # Limit maximum workers to 8
 
 def get_optimal_chunk_size(total_records):
     """
@@ -73,160 +59,239 @@ def get_optimal_chunk_size(total_records):
     workers = get_optimal_workers()
     # Ensure minimum chunk size for efficiency
     min_chunk = 1000
-    # Set maximum chunk size to 50M records per thread
-    max_chunk = 50000000
+    # Cap chunk size so each in-flight chunk stays small in memory
+    max_chunk = 100000
     
     chunk_size = total_records // (workers * 4)
     return max(min_chunk, min(chunk_size, max_chunk))
 
-def process_chunk(args):
+# Reference data held by each worker process, set once by init_worker
+_worker_state = {}
+
+def init_worker(indexes, validator, candidates='prefix'):
+    """
+    Pool initializer that keeps the reference data resident in each worker.
+    With the fork start method the data is inherited from the parent instead of
+    being pickled, and with spawn it is sent once per worker rather than per task.
+    
+    Args:
+        indexes: Dictionary of matching indexes, including the canonical table
+        validator: Address validator used by the API fallback
+        candidates: Fuzzy candidate generator name, 'prefix' or 'trigram'
+    """
+    _worker_state['indexes'] = indexes
+    _worker_state['validator'] = validator
+    _worker_state['candidates'] = make_candidate_generator(candidates, indexes)
+
+def imap_bounded(pool, func, iterable, max_pending):
+    """
+    Like Pool.imap_unordered, but only pulls the next item from iterable when
+    fewer than max_pending tasks are in flight. Unlike imap_unordered, a lazy
+    reader is never drained ahead of the workers, so memory stays bounded.
+    
+    Args:
+        pool: multiprocessing Pool
+        func: Function applied to each item in a worker
+        iterable: Lazy source of task items
+        max_pending: Maximum number of submitted but unfinished tasks
+    
+    Yields:
+        (item, result) pairs in completion order
+    """
+    done = queue.Queue()
+    pending = 0
+    
+    def collect():
+        item, result = done.get()
+        if isinstance(result, BaseException):
+            raise result
+        return item, result
+    
+    for item in iterable:
+        pool.apply_async(func, (item,),
+                         callback=lambda result, item=item: done.put((item, result)),
+                         error_callback=lambda error, item=item: done.put((item, error)))
+        pending += 1
+        if pending >= max_pending:
+            yield collect()
+            pending -= 1
+    
+    while pending:
+        yield collect()
+        pending -= 1
+
+def process_chunk(chunk):
     """
     Process a chunk of transactions in parallel.
     
     Args:
-        args: Tuple containing (chunk, canonical_addresses, indexes, validator)
+        chunk: DataFrame slice of transactions; reference data comes from init_worker
     
     Returns:
-        Tuple of (results, stats) where results is a list of matching results
-        and stats contains performance metrics
+        Tuple of (results, stats) where results holds parallel arrays of
+        transaction_index, canonical_id (-1 if unmatched), score, match_type code
+        and api_failed, and stats contains performance metrics
     """
-    chunk, canonical_addresses, indexes, validator = args
     monitor = PerformanceMonitor()
+    clean_cache = clean.cache_info()
+    results, _ = match_transactions(chunk, _worker_state['indexes'], _worker_state['validator'], monitor,
+                                    _worker_state['candidates'])
     
-    results = []
-    # Pre-process all transactions in the batch
-    parsed_transactions = []
-    for _, txn in chunk.iterrows():
-        parsed = {
-            'house': clean(txn['house']),
-            'street': clean(txn['street']),
-            'strtype': clean(txn['strtype']),
-            'apttype': clean(txn['apttype']),
-            'aptnbr': clean(txn['aptnbr']),
-            'city': clean(txn['city']),
-            'state': clean(txn['state']),
-            'zip': clean(txn['zip']),
-            'normalized_address': clean(txn['normalized_address']),
-            'original_txn': txn
-        }
-        parsed_transactions.append(parsed)
-
-    # Process each transaction
-    for parsed in parsed_transactions:
-        # Try exact matching first
-        match = exact_match_dict(parsed, canonical_addresses, indexes['normalized'])
-        if match:
-            results.append(build_row(parsed['original_txn'], match, 1.0, 'exact'))
-            continue
-
-        # Try fuzzy matching
-        fuzzy = fuzzy_match_block(parsed['normalized_address'], parsed['street'], indexes['prefix'])
-        if fuzzy:
-            match, score = fuzzy
-            results.append(build_row(parsed['original_txn'], match, score, 'fuzzy'))
-            continue
-
-        # Try phonetic matching
-        phonetic = phonetic_fallback(parsed, indexes['metaphone'])
-        if phonetic:
-            match, score = phonetic
-            results.append(build_row(parsed['original_txn'], match, score, 'metaphone'))
-            continue
-
-        # Try API validation as fallback
-        api = api_fallback(parsed, indexes['prefix'], validator)
-        if api:
-            match, score = api
-            monitor.record_api_call(0.01)  # Record API call cost
-            results.append(build_row(parsed['original_txn'], match, score, 'api_validated'))
-            continue
-
-        # No match found - record the highest score from previous attempts
-        highest_score = 0.0
-        if fuzzy:
-            highest_score = max(highest_score, fuzzy[1])
-        if phonetic:
-            highest_score = max(highest_score, phonetic[1])
-        if api:
-            highest_score = max(highest_score, api[1])
-            
-        monitor.record_unmatched('no_match_found')
-        results.append(build_row(parsed['original_txn'], None, highest_score, 'no_match'))
-    
-    # Record batch statistics
+    # Record batch statistics; the parent merges them with monitor.merge_stats
+    clean_after = clean.cache_info()
+    monitor.record_cache('clean', clean_after.hits - clean_cache.hits, clean_after.misses - clean_cache.misses)
+    monitor.record_matches(MATCH_TYPES[results['match_type']], results['score'])
     monitor.record_batch_stats(len(chunk), monitor.get_runtime())
+    monitor.update_peak_memory()
     return results, monitor.get_stats()
 
-def main():
+def process_numbered_chunk(item):
+    """process_chunk for (chunk number, chunk) items from RunCheckpoint.pending"""
+    return process_chunk(item[1])
+
+def main(validator_url=None, candidates='prefix', metrics_path=None, dsn=None, run_id=None, file_format='csv',
+         checkpoint_dir=CHECKPOINT_DIR, match_store=None):
     """
     Main function to run the address matching pipeline.
     Handles data loading, processing, and result saving.
+    
+    Args:
+        validator_url: Base URL of an address validation service; the mock validator is used if None
+        candidates: Fuzzy candidate generator, 'prefix' blocking or the 'trigram' street index
+        metrics_path: JSON file for the merged performance statistics; a timestamped
+            file next to the report if None
+        dsn: PostgreSQL connection string; transactions are streamed from its
+            transactions table instead of the processed CSV if given, and the
+            results are written back to its matching_results table
+        run_id: Identifier of the run. Each finished chunk is checkpointed under
+            checkpoint_dir/run_id, and running an existing id again resumes it,
+            skipping the chunks already done. Also identifies the results in
+            matching_results. The start time if None
+        file_format: 'csv' or 'parquet'; format of the processed transactions read
+            and of the result files written
+        checkpoint_dir: Directory holding the run manifests and per-chunk outputs
+        match_store: SQLite file of earlier match outcomes. If given, only new or
+            changed transactions are matched, or all of them after the canonical
+            index changed; the others reuse their stored outcome
     """
     # Initialize performance monitor
     monitor = PerformanceMonitor()
-    validator = AddressValidator()
-    
-    # Load transactions and canonical addresses
-    transactions = pd.read_csv("data/processed/processed_transactions.csv")
-    canonical_df = pd.read_csv("data/raw/11211 Addresses.csv")
+    run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+    validator = AsyncValidatorClient(validator_url) if validator_url else AddressValidator()
     
-    # Convert canonical addresses to records
-    canonical_addresses = canonical_df.to_dict('records')
+    # Load the canonical table and indexes; transactions are streamed in chunks below
+    transactions_path = with_format("data/processed/processed_transactions.csv", file_format)
+    indexes = load_or_build_indexes(CANONICAL_PATH, INDEX_PATH)
+    canonical_table = indexes['table']
+    # Outcomes depend on the canonical data and on the fuzzy candidate generator
+    store = MatchStore(match_store, f"{artifact_version(INDEX_PATH)}:{candidates}") if match_store else None
     
-    # Build indexes
-    indexes = {
-        'normalized': build_normalized_index_extended(canonical_addresses),
-        'prefix': build_prefix_index(canonical_addresses),
-        'metaphone': build_metaphone_index(canonical_addresses)
-    }
+    # Size chunks and workers from the input and the machine
+    if dsn:
+        # Imported here so CSV runs do not need a PostgreSQL driver
+        from src.ingestion.postgres import count_rows, stream_transactions
+        from src.ingestion.result_sink import ResultSink
+        total_records = count_rows('transactions', dsn)
+    else:
+        total_records = count_records(transactions_path)
+    num_processes = get_optimal_workers()
     
-    # Set fixed chunk size and number of processes
-    CHUNK_SIZE = 50000000  # Process 50M records per thread
-    num_processes = 8  # Fixed number of processes
+    # A resumed run keeps the chunk size it started with, so chunk numbers stay valid
+    checkpoint = RunCheckpoint.open(run_id, {
+        'source': 'postgres:transactions' if dsn else transactions_path,
+        'total_records': total_records,
+        'file_format': file_format,
+        'candidates': candidates
+    }, get_optimal_chunk_size(total_records), checkpoint_dir)
+    chunk_size = checkpoint.chunk_size
+    for chunk_stats in checkpoint.completed_stats():
+        monitor.merge_stats(chunk_stats)
+    logger.info(f"Streaming {total_records:,} transactions in chunks of {chunk_size:,} "
+                f"across {num_processes} workers")
     
-    # Split data into chunks for parallel processing
-    chunks = [transactions.iloc[i:i+CHUNK_SIZE].copy() 
-             for i in range(0, len(transactions), CHUNK_SIZE)]
+    if dsn:
+        # Batches come from a server-side cursor, so the table is never loaded at once
+        chunks = stream_transactions(dsn, chunk_size)
+    else:
+        # Read transactions lazily; all columns stay strings so chunks parse consistently
+        chunks = iter_batches(transactions_path, chunk_size)
     
     # Create progress bar
-    pbar = tqdm(total=len(transactions), 
+    pbar = tqdm(total=total_records,
+                initial=checkpoint.rows_done,
                 desc="Processing Transactions",
                 unit='records',
                 unit_scale=True,
                 bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}] {rate_fmt} {postfix}')
     
-    # Process chunks in parallel
-    all_results = []
+    # Process the chunks that are not done yet in parallel
+    processed = checkpoint.rows_done
+    reused = {}
+    
+    def to_match(pending):
+        """Hold back transactions with a current stored outcome; only the rest go to the workers"""
+        for number, chunk in pending:
+            if store is not None:
+                chunk, reused[number] = store.split(chunk)
+            yield number, chunk
+    
+    sink = ResultSink(run_id, dsn, batch_size=chunk_size, expected_rows=total_records) if dsn else nullcontext()
     try:
-        with Pool(num_processes) as pool:
-            args = [(chunk, canonical_addresses, indexes, validator) for chunk in chunks]
-            for chunk_results, chunk_stats in pool.imap_unordered(process_chunk, args):
-                all_results.extend(chunk_results)
-                pbar.update(len(chunk_results))
+        with sink, Pool(num_processes, initializer=init_worker,
+                        initargs=(indexes, validator, candidates)) as pool:
+            # Keep at most two chunks per worker in flight
+            for (number, chunk), (chunk_results, chunk_stats) in imap_bounded(
+                    pool, process_numbered_chunk, to_match(checkpoint.pending(chunks)),
+                    max_pending=num_processes * 2):
+                chunk_df = build_results_frame(chunk, chunk_results, canonical_table)
+                if store is not None:
+                    # No-match outcomes of failed API validations are not kept, so they are retried
+                    store.update(chunk, chunk_df, retry=chunk_results['api_failed'])
+                    # Put matched and reused rows back in input order
+                    chunk_df.index = chunk_results['transaction_index']
+                    chunk_df = pd.concat([reused.pop(number), chunk_df]).sort_index().reset_index(drop=True)
+                if dsn:
+                    # Commit the chunk's rows before the checkpoint counts it as done
+                    sink.write(chunk_df)
+                    sink.flush()
+                checkpoint.record(number, chunk_df, chunk_stats)
+                monitor.merge_stats(chunk_stats)
+                processed += len(chunk_df)
+                pbar.update(len(chunk_df))
                 pbar.set_postfix({
-                    'Processed': f"{len(all_results):,}",
+                    'Processed': f"{processed:,}",
                     'Runtime': f"{chunk_stats['total_runtime_seconds']:.1f}s",
                     'Memory': f"{chunk_stats['peak_memory_mb']/1024:.1f}GB"
                 })
                 pbar.refresh()
     finally:
         pbar.close()
+        if store is not None:
+            store.close()
+    monitor.update_peak_memory()
+    if store is not None:
+        store_stats = store.get_stats()
+        monitor.record_cache('match_store', store_stats['reused'], store_stats['matched'])
+    if dsn:
+        monitor.record_write('matching_results', sink.rows_written, sink.seconds)
+        print(f"\nResults of run {run_id} written to matching_results")
     
-    # Convert results to DataFrame
-    results_df = pd.DataFrame(all_results)
+    # Combine the per-chunk results of this and earlier attempts
+    results_df = checkpoint.merge()
     
     # Generate timestamp for file names
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
     # Save results using report generator
-    results_path = f"data/processed/matching_results_{timestamp}.csv"
+    results_path = with_format(f"data/processed/matching_results_{timestamp}.csv", file_format)
     if save_results(results_df, results_path):
         print(f"\nResults saved to: {results_path}")
+        checkpoint.finish(results_path)
     
     # Generate and print reports
     print(generate_matching_summary(results_df))
     print(generate_confidence_distribution(results_df))
-    print(generate_unmatched_analysis(monitor, results_df))
+    print(generate_unmatched_analysis(monitor, results_df, file_format))
     print(generate_performance_metrics(monitor))
     
     # Save report to file
@@ -234,10 +299,44 @@ def main():
     with open(report_path, 'w') as f:
         f.write(generate_matching_summary(results_df))
         f.write(generate_confidence_distribution(results_df))
-        f.write(generate_unmatched_analysis(monitor, results_df))
+        f.write(generate_unmatched_analysis(monitor, results_df, file_format))
         f.write(generate_performance_metrics(monitor))
     
     print(f"\nDetailed report saved to: {report_path}")
+    
+    metrics_path = monitor.export_json(metrics_path or f"data/processed/performance_metrics_{timestamp}.json")
+    print(f"Performance metrics saved to: {metrics_path}")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Match transactions against canonical addresses")
+    parser.add_argument('command', nargs='?', default='match', choices=['match', 'build-index', 'update-index'],
+                        help="'build-index' (re)builds the canonical index artifact, "
+                             "'update-index' applies a delta CSV to it")
+    parser.add_argument('delta', nargs='?', help="Delta CSV for update-index")
+    parser.add_argument('--validator-url', help="Base URL of the address validation service")
+    parser.add_argument('--candidates', choices=['prefix', 'trigram'], default='prefix',
+                        help="Fuzzy candidate generator: street prefix blocking or the trigram street index")
+    parser.add_argument('--metrics-json', help="Where to write the merged performance statistics as JSON")
+    parser.add_argument('--dsn', help="Stream transactions from this PostgreSQL database instead of the processed CSV "
+                                      "and write the results back to it")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv',
+                        help="Format of the processed transactions and of the result files")
+    parser.add_argument('--run-id', help="Run id; running an existing id again resumes it from its last checkpoint")
+    parser.add_argument('--match-store', help="SQLite file of match outcomes kept between runs; "
+                                              "only new or changed transactions are matched")
+    parser.add_argument('--checkpoint-dir', default=CHECKPOINT_DIR,
+                        help="Directory for run manifests and per-chunk results")
+    args = parser.parse_args()
+
+    if args.command == 'build-index':
+        build_index_artifact(CANONICAL_PATH, INDEX_PATH)
+        print(f"Index artifact saved to: {INDEX_PATH}")
+    elif args.command == 'update-index':
+        if not args.delta:
+            parser.error("update-index requires a delta CSV")
+        stats = update_index_artifact(CANONICAL_PATH, INDEX_PATH, args.delta)
+        print(f"Index artifact updated: {stats['inserted']:,} inserted, {stats['updated']:,} updated, "
+              f"{stats['deleted']:,} deleted")
+    else:
+        main(args.validator_url, args.candidates, args.metrics_json, args.dsn, args.run_id, args.format,
+             args.checkpoint_dir, args.match_store)
@@ -18,7 +18,12 @@ setup(
         'SQLAlchemy',
         'fastapi',
         'uvicorn',
+        'httpx',
         'pyyaml',
         'pytest'
-    ]
+    ],
+    extras_require={
+        # Parquet intermediates, see src/processing/table_io.py
+        'parquet': ['pyarrow']
+    }
 )
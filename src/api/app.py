@@ -0,0 +1,147 @@
+# src/api/app.py
+
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional
+
+import pandas as pd
+from fastapi import FastAPI, Request
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+
+from src.api.validator import AddressValidator, AsyncValidatorClient
+from src.matching.candidates import make_candidate_generator
+from src.matching.cascade import MATCH_TYPES, TRANSACTION_FIELDS, match_transactions, run_cascade
+from src.processing.index_store import CANONICAL_PATH, INDEX_PATH, load_or_build_indexes
+from src.processing.preprocess_utils import clean
+from src.utils.performance_monitor import PerformanceMonitor
+
+logger = logging.getLogger(__name__)
+
+# Largest batch accepted by /match/batch
+MAX_BATCH_SIZE = 10000
+
+class AddressIn(BaseModel):
+    """Parsed address components of one transaction"""
+    transaction_id: Optional[str] = None
+    house: Optional[str] = None
+    street: Optional[str] = None
+    strtype: Optional[str] = None
+    apttype: Optional[str] = None
+    aptnbr: Optional[str] = None
+    city: Optional[str] = None
+    state: Optional[str] = None
+    zip: Optional[str] = None
+    normalized_address: Optional[str] = None
+
+class MatchOut(BaseModel):
+    """Match outcome of one transaction"""
+    transaction_id: Optional[str] = None
+    matched_address_id: Optional[str] = None
+    matched_address: Optional[str] = None
+    confidence_score: float
+    match_type: str
+
+class MatchResponse(MatchOut):
+    """Single-address match with per-stage latency in milliseconds"""
+    stage_ms: Dict[str, float]
+    total_ms: float
+
+class BatchRequest(BaseModel):
+    addresses: List[AddressIn] = Field(..., max_length=MAX_BATCH_SIZE)
+
+class BatchResponse(BaseModel):
+    """Batch matches with per-stage latency in milliseconds"""
+    results: List[MatchOut]
+    distinct_addresses: int
+    stage_ms: Dict[str, float]
+    total_ms: float
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load the canonical indexes once, before the first request is served"""
+    canonical_path = os.environ.get('ADDRESS_CANONICAL_PATH', CANONICAL_PATH)
+    index_path = os.environ.get('ADDRESS_INDEX_PATH', INDEX_PATH)
+    app.state.indexes = await run_in_threadpool(load_or_build_indexes, canonical_path, index_path)
+    app.state.candidates = make_candidate_generator(os.environ.get('ADDRESS_FUZZY_CANDIDATES', 'prefix'),
+                                                    app.state.indexes)
+    validator_url = os.environ.get('ADDRESS_VALIDATOR_URL')
+    app.state.validator = AsyncValidatorClient(validator_url) if validator_url else AddressValidator()
+    logger.info(f"Serving {len(app.state.indexes['table']):,} canonical addresses")
+    yield
+    if validator_url:
+        app.state.validator.close()
+
+app = FastAPI(title="Address Matching Service", lifespan=lifespan)
+
+def _match_out(indexes: Dict[str, Any], transaction_id, canonical_id: int, score: float,
+               match_type: int) -> Dict[str, Any]:
+    """Describe one cascade outcome with the matched canonical address"""
+    result = {
+        'transaction_id': transaction_id,
+        'matched_address_id': None,
+        'matched_address': None,
+        'confidence_score': float(score),
+        'match_type': MATCH_TYPES[match_type]
+    }
+    if canonical_id >= 0:
+        table = indexes['table']
+        result['matched_address_id'] = str(table.column('hhid')[canonical_id])
+        result['matched_address'] = ' '.join(
+            str(table.column(field)[canonical_id]) for field in ('house', 'street', 'strtype')
+        )
+    return result
+
+def _stage_ms(stage_seconds: Dict[str, float]) -> Dict[str, float]:
+    return {stage: seconds * 1000 for stage, seconds in stage_seconds.items()}
+
+def match_one(address: AddressIn, indexes: Dict[str, Any], validator, candidates=None) -> Dict[str, Any]:
+    """Run the cascade for one address, skipping the DataFrame path used for batches"""
+    start = time.perf_counter()
+    columns = {field: [clean(getattr(address, field))] for field in TRANSACTION_FIELDS}
+    match_ids, scores, match_types, _, stage_seconds = run_cascade(columns, indexes, validator,
+                                                                   PerformanceMonitor(), candidates)
+
+    result = _match_out(indexes, address.transaction_id, match_ids[0], scores[0], match_types[0])
+    result['stage_ms'] = _stage_ms(stage_seconds)
+    result['total_ms'] = (time.perf_counter() - start) * 1000
+    return result
+
+def match_batch(addresses: List[AddressIn], indexes: Dict[str, Any], validator,
+                candidates=None) -> Dict[str, Any]:
+    """Run the vectorized cascade over a batch, once per distinct parsed address"""
+    start = time.perf_counter()
+    transactions = pd.DataFrame([address.model_dump() for address in addresses],
+                                columns=['transaction_id', *TRANSACTION_FIELDS])
+    monitor = PerformanceMonitor()
+    results, stage_seconds = match_transactions(transactions, indexes, validator, monitor, candidates)
+
+    transaction_ids = transactions['transaction_id'].to_numpy()[results['transaction_index']]
+    return {
+        'results': [
+            _match_out(indexes, *outcome)
+            for outcome in zip(transaction_ids, results['canonical_id'], results['score'],
+                               results['match_type'])
+        ],
+        'distinct_addresses': monitor.dedup_distinct_rows,
+        'stage_ms': _stage_ms(stage_seconds),
+        'total_ms': (time.perf_counter() - start) * 1000
+    }
+
+@app.get("/health")
+async def health(request: Request) -> Dict[str, Any]:
+    return {'status': 'ok', 'canonical_addresses': int(request.app.state.indexes['table'].live.sum())}
+
+# Matching is CPU-bound, so it runs in the thread pool to keep the event loop responsive
+@app.post("/match", response_model=MatchResponse)
+async def match(address: AddressIn, request: Request):
+    state = request.app.state
+    return await run_in_threadpool(match_one, address, state.indexes, state.validator, state.candidates)
+
+@app.post("/match/batch", response_model=BatchResponse)
+async def match_many(batch: BatchRequest, request: Request):
+    state = request.app.state
+    return await run_in_threadpool(match_batch, batch.addresses, state.indexes, state.validator,
+                                   state.candidates)
@@ -0,0 +1,247 @@
+# src/api/validator.py
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+import httpx
+
+from src.processing.preprocess_utils import clean, make_normalized_key
+
+logger = logging.getLogger(__name__)
+
+# Cost recorded per billed validation request
+API_CALL_COST = 0.01
+
+# Address fields sent to the validation service
+VALIDATION_FIELDS = ('house', 'street', 'strtype', 'apttype', 'aptnbr', 'city', 'state', 'zip')
+
+# (validated address or None, confidence); the confidence is None when the service could not answer
+Validation = Tuple[Optional[Dict[str, Any]], Optional[float]]
+
+class AddressValidator:
+    """Mock API validator for address validation"""
+    def __init__(self):
+        pass
+
+    def validate_address(self, address):
+        return address, 0.95
+
+    def validate_batch(self, addresses: List[Dict[str, Any]], monitor=None) -> List[Validation]:
+        """Validate addresses one by one; every address counts as an API call"""
+        results = [self.validate_address(address) for address in addresses]
+        if monitor is not None:
+            for _ in results:
+                monitor.record_api_call(API_CALL_COST)
+        return results
+
+class TTLCache:
+    """
+    LRU cache whose entries also expire a fixed number of seconds after being stored
+    """
+
+    def __init__(self, max_entries: int = 100000, ttl: float = 86400.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def get(self, key: str):
+        """Return the cached value, or None if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+def validation_cache_key(address: Dict[str, Any]) -> str:
+    """Cache key of an address: its normalized key including apartment, city, state and zip"""
+    key = make_normalized_key(address.get('house'), address.get('street'), address.get('strtype'),
+                              address.get('city'), address.get('state'),
+                              address.get('apttype'), address.get('aptnbr'))
+    return f"{key}|{clean(address.get('zip'))}"
+
+class AsyncValidatorClient:
+    """
+    Client for an HTTP address validation service.
+
+    Addresses needing validation are sent as one batch: duplicates and cached
+    addresses are resolved locally, and the remaining requests run concurrently
+    on a pooled asyncio HTTP session, limited by a semaphore and retried with
+    exponential backoff on timeouts, connection errors, 429 and 5xx responses.
+
+    The service is called with POST {base_url}{endpoint} and a JSON body of
+    VALIDATION_FIELDS, and answers {"address": {...} or null, "confidence": float}.
+
+    validate_batch is synchronous so that worker processes and the matching
+    cascade can call it directly; it drives a private event loop that keeps the
+    HTTP session open between batches.
+    """
+
+    def __init__(self, base_url: str, endpoint: str = '/validate', max_concurrency: int = 16,
+                 max_retries: int = 3, backoff: float = 0.1, timeout: float = 5.0,
+                 cache_size: int = 100000, cache_ttl: float = 86400.0,
+                 cost_per_call: float = API_CALL_COST):
+        self.base_url = base_url
+        self.endpoint = endpoint
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cost_per_call = cost_per_call
+        self.cache = TTLCache(cache_size, cache_ttl)
+
+        self.lookups = 0
+        self.calls = 0
+        self.cache_hits = 0
+        self.retries = 0
+        self.failures = 0
+        self._reset_session()
+
+    def _reset_session(self):
+        self._loop = None
+        self._client = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Event loops, sessions and locks cannot be pickled; they are recreated on first use
+        state = self.__dict__.copy()
+        for name in ('_loop', '_client', '_semaphore', '_lock'):
+            state.pop(name)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset_session()
+
+    async def _session(self) -> httpx.AsyncClient:
+        # Created inside the running loop, which the semaphore and pool are bound to
+        if self._client is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency)
+            )
+        return self._client
+
+    async def _request(self, address: Dict[str, Any], monitor=None) -> Optional[Validation]:
+        """Validate one address; returns None if the service could not answer"""
+        client = await self._session()
+        payload = {field: address.get(field) for field in VALIDATION_FIELDS}
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    response = await client.post(self.endpoint, json=payload)
+                self.calls += 1
+                if monitor is not None:
+                    monitor.record_api_call(self.cost_per_call)
+
+                if response.status_code != 429 and response.status_code < 500:
+                    response.raise_for_status()
+                    body = response.json()
+                    return body.get('address'), float(body.get('confidence') or 0.0)
+            except httpx.HTTPStatusError as error:
+                # Other client errors will not succeed on retry
+                logger.warning(f"Address validation rejected: {error}")
+                break
+            except (httpx.TransportError, ValueError) as error:
+                logger.debug(f"Address validation attempt {attempt + 1} failed: {error}")
+
+            if attempt < self.max_retries:
+                self.retries += 1
+                # Exponential backoff with jitter so retries from many rows spread out
+                await asyncio.sleep(self.backoff * 2 ** attempt * (1 + random.random()))
+
+        self.failures += 1
+        return None
+
+    async def validate_many(self, addresses: List[Dict[str, Any]], monitor=None) -> List[Validation]:
+        """
+        Validate a batch of addresses concurrently.
+        Args:
+            addresses: Address dictionaries with VALIDATION_FIELDS
+            monitor: Optional PerformanceMonitor recording calls and cache hits
+        Returns:
+            (validated address or None, confidence) per address; failed requests
+            give (None, None) and are not cached
+        """
+        keys = [validation_cache_key(address) for address in addresses]
+        results = {}
+        pending = {}
+        for key, address in zip(keys, addresses):
+            if key in results or key in pending:
+                continue
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[key] = cached
+            else:
+                pending[key] = address
+
+        # Duplicates within the batch count as cache hits
+        hits = len(keys) - len(pending)
+        self.lookups += len(keys)
+        self.cache_hits += hits
+        if monitor is not None and hits:
+            monitor.record_api_cache_hit(hits)
+
+        responses = await asyncio.gather(*(self._request(address, monitor) for address in pending.values()))
+        for key, response in zip(pending, responses):
+            if response is None:
+                results[key] = (None, None)
+            else:
+                results[key] = response
+                self.cache.put(key, response)
+
+        return [results[key] for key in keys]
+
+    def validate_batch(self, addresses: List[Dict[str, Any]], monitor=None) -> List[Validation]:
+        """Synchronous validate_many on the client's own event loop"""
+        if not addresses:
+            return []
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+            return self._loop.run_until_complete(self.validate_many(addresses, monitor))
+
+    def validate_address(self, address: Dict[str, Any]) -> Validation:
+        return self.validate_batch([address])[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get request, cache and failure counts; calls include retries"""
+        return {
+            'lookups': self.lookups,
+            'calls': self.calls,
+            'cache_hits': self.cache_hits,
+            'retries': self.retries,
+            'failures': self.failures,
+            'cache_hit_rate': self.cache_hits / self.lookups if self.lookups else 0.0
+        }
+
+    def close(self):
+        """Close the HTTP session and the event loop"""
+        with self._lock:
+            if self._loop is not None:
+                if self._client is not None:
+                    self._loop.run_until_complete(self._client.aclose())
+                self._loop.close()
+            self._reset_session()
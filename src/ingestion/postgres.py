@@ -0,0 +1,261 @@
+# src/ingestion/postgres.py
+
+import argparse
+import io
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from psycopg2 import sql
+from psycopg2.pool import ThreadedConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# Connection string used when none is passed explicitly
+DSN_ENV = 'ADDRESS_MATCHING_DSN'
+SCHEMA_PATH = "config/schema.sql"
+
+# Columns copied per table, named as in the CSV files they are loaded from
+TABLE_COLUMNS = {
+    'raw_transactions': ['id', 'address_line_1', 'address_line_2', 'city', 'state', 'zip_code'],
+    'transactions': ['transaction_id', 'original_address', 'normalized_address',
+                     'house', 'street', 'strtype', 'apttype', 'aptnbr', 'city', 'state', 'zip',
+                     'street_phonetic'],
+    'canonical_addresses': ['hhid', 'house', 'street', 'strtype', 'apttype', 'aptnbr', 'city', 'state', 'zip']
+}
+
+# Primary key per table, used to skip rows that are already loaded and to order streamed rows
+TABLE_KEYS = {
+    'raw_transactions': 'id',
+    'transactions': 'transaction_id',
+    'canonical_addresses': 'hhid'
+}
+
+# One pool per process and DSN; forked workers must not share the parent's sockets
+_pools: Dict[Tuple[int, str], ThreadedConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def resolve_dsn(dsn: Optional[str] = None) -> str:
+    """Return dsn, or the ADDRESS_MATCHING_DSN environment variable"""
+    dsn = dsn or os.environ.get(DSN_ENV)
+    if not dsn:
+        raise ValueError(f"No PostgreSQL DSN given and {DSN_ENV} is not set")
+    return dsn
+
+def get_pool(dsn: Optional[str] = None, max_connections: int = 4) -> ThreadedConnectionPool:
+    """
+    Connection pool of the current process, created on first use. A pool
+    created before a fork is never reused in the child, so each worker
+    process opens its own connections.
+    """
+    dsn = resolve_dsn(dsn)
+    key = (os.getpid(), dsn)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ThreadedConnectionPool(1, max_connections, dsn)
+        return pool
+
+def close_pools():
+    """Close the pools of the current process"""
+    pid = os.getpid()
+    with _pools_lock:
+        for key in [key for key in _pools if key[0] == pid]:
+            _pools.pop(key).closeall()
+
+@contextmanager
+def connection(dsn: Optional[str] = None):
+    """
+    Borrow a pooled connection; the transaction commits when the block exits
+    normally and rolls back when it raises
+    """
+    pool = get_pool(dsn)
+    conn = pool.getconn()
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
+
+def apply_schema(dsn: Optional[str] = None, schema_path: str = SCHEMA_PATH):
+    """Create the tables and indexes of config/schema.sql"""
+    with open(schema_path) as f, connection(dsn) as conn, conn.cursor() as cur:
+        cur.execute(f.read())
+
+class CsvStream(io.TextIOBase):
+    """
+    Read-only text stream over an iterable of CSV text blocks, so COPY pulls
+    rows as it needs them instead of from one string holding the whole file
+    """
+
+    def __init__(self, blocks: Iterable[str]):
+        self._blocks = iter(blocks)
+        self._buffer = ''
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) < size:
+            block = next(self._blocks, None)
+            if block is None:
+                break
+            self._buffer += block
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def readline(self, size: int = -1) -> str:
+        # copy_expert only calls read, but TextIOBase requires readline
+        return self.read(size)
+
+def frame_blocks(frames: Iterable[pd.DataFrame], columns: List[str]) -> Iterator[str]:
+    """CSV text of each frame without header; missing values become unquoted empty fields, i.e. NULL"""
+    for frame in frames:
+        yield frame.reindex(columns=columns).to_csv(header=False, index=False)
+
+def copy_frames(conn, table: str, frames: Iterable[pd.DataFrame], columns: Optional[List[str]] = None,
+                skip_existing: bool = False) -> int:
+    """
+    Stream DataFrames into a table with one COPY FROM STDIN.
+    Args:
+        conn: psycopg2 connection; the caller commits
+        table: Target table
+        frames: DataFrames, e.g. chunks of pd.read_csv
+        columns: Columns to copy; TABLE_COLUMNS[table] by default
+        skip_existing: Copy into a temporary table first and insert only rows
+            whose primary key is not in the table yet; otherwise a duplicate key
+            aborts the whole load
+    Returns:
+        Number of rows inserted
+    """
+    columns = columns or TABLE_COLUMNS[table]
+    column_list = sql.SQL(', ').join(map(sql.Identifier, columns))
+    with conn.cursor() as cur:
+        target = sql.Identifier(table)
+        if skip_existing:
+            target = sql.Identifier(f"{table}_load")
+            cur.execute(sql.SQL("CREATE TEMP TABLE {} (LIKE {} INCLUDING DEFAULTS) ON COMMIT DROP").format(
+                target, sql.Identifier(table)))
+
+        copy = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(target, column_list)
+        cur.copy_expert(copy.as_string(conn), CsvStream(frame_blocks(frames, columns)))
+        if not skip_existing:
+            return cur.rowcount
+
+        cur.execute(sql.SQL("INSERT INTO {table} ({columns}) SELECT {columns} FROM {load} "
+                            "ON CONFLICT ({key}) DO NOTHING").format(
+            table=sql.Identifier(table), columns=column_list, load=target,
+            key=sql.Identifier(TABLE_KEYS[table])))
+        return cur.rowcount
+
+def load_csv(table: str, csv_path: str, dsn: Optional[str] = None, chunk_size: int = 100000,
+             skip_existing: bool = False) -> int:
+    """
+    Load a CSV file into a table, reading it in chunks so memory use does not
+    depend on the file size. The load is one transaction.
+    Args:
+        table: Target table in TABLE_COLUMNS
+        csv_path: CSV with the table's columns; other columns are ignored
+        dsn: PostgreSQL connection string; ADDRESS_MATCHING_DSN if None
+        chunk_size: Rows read from the CSV at a time
+        skip_existing: Skip rows whose primary key is already loaded
+    Returns:
+        Number of rows inserted
+    """
+    columns = TABLE_COLUMNS[table]
+    chunks = pd.read_csv(csv_path, usecols=lambda column: column in columns, dtype=str, chunksize=chunk_size)
+    with connection(dsn) as conn:
+        rows = copy_frames(conn, table, chunks, columns, skip_existing)
+    logger.info(f"Loaded {rows:,} rows from {csv_path} into {table}")
+    return rows
+
+def load_raw_transactions(csv_path: str, dsn: Optional[str] = None, **kwargs) -> int:
+    """Load a raw transaction export such as data/raw/transactions_2_11211.csv"""
+    return load_csv('raw_transactions', csv_path, dsn, **kwargs)
+
+def load_transactions(csv_path: str, dsn: Optional[str] = None, **kwargs) -> int:
+    """Load preprocessed transactions such as data/processed/processed_transactions.csv"""
+    return load_csv('transactions', csv_path, dsn, **kwargs)
+
+def load_canonical_addresses(csv_path: str, dsn: Optional[str] = None, **kwargs) -> int:
+    """Load canonical addresses such as data/raw/11211 Addresses.csv"""
+    return load_csv('canonical_addresses', csv_path, dsn, **kwargs)
+
+def count_rows(table: str, dsn: Optional[str] = None) -> int:
+    with connection(dsn) as conn, conn.cursor() as cur:
+        cur.execute(sql.SQL("SELECT count(*) FROM {}").format(sql.Identifier(table)))
+        return cur.fetchone()[0]
+
+def stream_table(table: str, dsn: Optional[str] = None, batch_size: int = 100000,
+                 columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Stream a table in primary key order through a server-side cursor, one
+    DataFrame of at most batch_size rows at a time. NULLs come back as missing
+    values, as they would from pd.read_csv.
+    Args:
+        table: Table in TABLE_COLUMNS
+        dsn: PostgreSQL connection string; ADDRESS_MATCHING_DSN if None
+        batch_size: Rows fetched per round trip and per yielded frame
+        columns: Columns to read; TABLE_COLUMNS[table] by default
+    Yields:
+        DataFrames with the requested columns
+    """
+    columns = columns or TABLE_COLUMNS[table]
+    query = sql.SQL("SELECT {} FROM {} ORDER BY {}").format(
+        sql.SQL(', ').join(map(sql.Identifier, columns)), sql.Identifier(table),
+        sql.Identifier(TABLE_KEYS[table]))
+    start = 0
+    with connection(dsn) as conn:
+        # A named cursor keeps the result set on the server
+        with conn.cursor(name=f"stream_{table}") as cur:
+            cur.execute(query)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                frame = pd.DataFrame(rows, columns=columns, index=pd.RangeIndex(start, start + len(rows)))
+                start += len(rows)
+                yield frame.where(frame.notna(), np.nan)
+
+def stream_transactions(dsn: Optional[str] = None, batch_size: int = 100000) -> Iterator[pd.DataFrame]:
+    """Stream preprocessed transactions in batches for matching"""
+    return stream_table('transactions', dsn, batch_size)
+
+def read_canonical_addresses(dsn: Optional[str] = None) -> pd.DataFrame:
+    """Read the whole canonical address table, e.g. for CanonicalTable.from_frame"""
+    frames = list(stream_table('canonical_addresses', dsn))
+    if not frames:
+        return pd.DataFrame(columns=TABLE_COLUMNS['canonical_addresses'])
+    return pd.concat(frames)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Load address data into PostgreSQL with COPY")
+    parser.add_argument('command', choices=['init-schema', 'raw', 'transactions', 'canonical'],
+                        help="'init-schema' creates the tables of config/schema.sql; the others load a CSV")
+    parser.add_argument('path', nargs='?', help="CSV file to load")
+    parser.add_argument('--dsn', help=f"PostgreSQL connection string; defaults to ${DSN_ENV}")
+    parser.add_argument('--chunk-size', type=int, default=100000)
+    parser.add_argument('--skip-existing', action='store_true',
+                        help="Skip rows whose primary key is already loaded instead of failing")
+    args = parser.parse_args()
+
+    if args.command == 'init-schema':
+        apply_schema(args.dsn)
+    else:
+        if not args.path:
+            parser.error(f"{args.command} requires a CSV path")
+        loaders = {'raw': load_raw_transactions, 'transactions': load_transactions,
+                   'canonical': load_canonical_addresses}
+        loaded = loaders[args.command](args.path, args.dsn, chunk_size=args.chunk_size,
+                                       skip_existing=args.skip_existing)
+        print(f"Loaded {loaded:,} rows")
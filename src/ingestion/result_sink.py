@@ -0,0 +1,143 @@
+# src/ingestion/result_sink.py
+
+import logging
+import time
+from typing import Dict, Any, List, Optional
+
+import pandas as pd
+from psycopg2 import sql
+
+from src.ingestion.postgres import CsvStream, frame_blocks, get_pool
+
+logger = logging.getLogger(__name__)
+
+# matching_results columns written by the sink, as produced by build_results_frame plus run_id
+RESULT_COLUMNS = ['run_id', 'transaction_id', 'matched_address_id', 'confidence_score', 'match_type',
+                  'original_address', 'normalized_address', 'matched_address']
+
+# Secondary indexes of matching_results in config/schema.sql, dropped during large loads
+DEFERRABLE_INDEXES = {
+    'idx_matching_transaction': "CREATE INDEX IF NOT EXISTS idx_matching_transaction "
+                                "ON matching_results(transaction_id)",
+    'idx_matching_address': "CREATE INDEX IF NOT EXISTS idx_matching_address "
+                            "ON matching_results(matched_address_id)"
+}
+
+class ResultSink:
+    """
+    Writes matching results to the matching_results table of one run.
+
+    Result frames are buffered and flushed in batches. Each flush COPYs the
+    batch into a temporary staging table and moves it into matching_results
+    with one INSERT ... ON CONFLICT (run_id, transaction_id) DO UPDATE, in its
+    own transaction. Writing the same run again replaces its rows, so a rerun
+    or a resumed run is idempotent. For loads of at least defer_indexes_rows
+    rows, the secondary indexes are dropped first and rebuilt once at close,
+    or when the with block exits with an error.
+    """
+
+    def __init__(self, run_id: str, dsn: Optional[str] = None, batch_size: int = 100000,
+                 expected_rows: int = 0, defer_indexes_rows: int = 1000000):
+        """
+        Args:
+            run_id: Identifier of the matching run the results belong to
+            dsn: PostgreSQL connection string; ADDRESS_MATCHING_DSN if None
+            batch_size: Rows per COPY and upsert
+            expected_rows: Rows the run is expected to write, if known
+            defer_indexes_rows: Smallest expected_rows for which indexes are rebuilt after the load
+        """
+        self.run_id = run_id
+        self.batch_size = batch_size
+        self.defer_indexes = expected_rows >= defer_indexes_rows
+        self.rows_written = 0
+        self.seconds = 0.0
+        self._pending: List[pd.DataFrame] = []
+        self._pending_rows = 0
+
+        self._pool = get_pool(dsn)
+        self._conn = self._pool.getconn()
+        with self._conn.cursor() as cur:
+            # Session-local staging table; rows are removed after every flush
+            cur.execute("CREATE TEMP TABLE IF NOT EXISTS matching_results_staging "
+                        "(LIKE matching_results INCLUDING DEFAULTS)")
+            if self.defer_indexes:
+                for name in DEFERRABLE_INDEXES:
+                    cur.execute(sql.SQL("DROP INDEX IF EXISTS {}").format(sql.Identifier(name)))
+        self._conn.commit()
+
+    def write(self, results: pd.DataFrame):
+        """Queue a frame from build_results_frame, flushing once a batch is full"""
+        self._pending.append(results)
+        self._pending_rows += len(results)
+        if self._pending_rows >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """COPY the queued rows into staging and upsert them into matching_results"""
+        if not self._pending:
+            return
+        start = time.perf_counter()
+        frames = [frame.assign(run_id=self.run_id) for frame in self._pending]
+        columns = sql.SQL(', ').join(map(sql.Identifier, RESULT_COLUMNS))
+        updates = sql.SQL(', ').join(
+            sql.SQL("{column} = EXCLUDED.{column}").format(column=sql.Identifier(column))
+            for column in RESULT_COLUMNS[2:]
+        )
+        try:
+            with self._conn.cursor() as cur:
+                copy = sql.SQL("COPY matching_results_staging ({}) FROM STDIN WITH (FORMAT csv)").format(columns)
+                cur.copy_expert(copy.as_string(self._conn), CsvStream(frame_blocks(frames, RESULT_COLUMNS)))
+                # A transaction repeated within the run keeps its last result
+                cur.execute(sql.SQL(
+                    "INSERT INTO matching_results ({columns}) "
+                    "SELECT DISTINCT ON (transaction_id) {columns} FROM matching_results_staging "
+                    "ORDER BY transaction_id, result_id DESC "
+                    "ON CONFLICT (run_id, transaction_id) DO UPDATE SET {updates}, created_at = now()"
+                ).format(columns=columns, updates=updates))
+                cur.execute("TRUNCATE matching_results_staging")
+            self._conn.commit()
+        except BaseException:
+            self._conn.rollback()
+            raise
+
+        self.rows_written += self._pending_rows
+        self.seconds += time.perf_counter() - start
+        self._pending, self._pending_rows = [], 0
+
+    def close(self):
+        """Flush the remaining rows, rebuild deferred indexes and return the connection to its pool"""
+        try:
+            self.flush()
+        finally:
+            self._release()
+        logger.info(f"Wrote {self.rows_written:,} results of run {self.run_id} in {self.seconds:.2f} seconds")
+
+    def _release(self):
+        """Rebuild deferred indexes, also after a failed load, and return the connection to its pool"""
+        try:
+            if self.defer_indexes:
+                start = time.perf_counter()
+                with self._conn.cursor() as cur:
+                    for statement in DEFERRABLE_INDEXES.values():
+                        cur.execute(statement)
+                self._conn.commit()
+                self.seconds += time.perf_counter() - start
+        finally:
+            self._pool.putconn(self._conn)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'rows': self.rows_written,
+            'seconds': self.seconds,
+            'rows_per_second': self.rows_written / self.seconds if self.seconds > 0 else 0
+        }
+
+    def __enter__(self) -> 'ResultSink':
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._conn.rollback()
+            self._release()
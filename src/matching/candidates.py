@@ -0,0 +1,148 @@
+# src/matching/candidates.py
+
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from src.matching.matcher_engine import fuzzy_blocking_keys, fuzzy_candidates
+from src.processing.preprocess_utils import clean, CanonicalTable, CandidateBlock
+
+_EMPTY_IDS = np.empty(0, dtype=np.int64)
+
+def street_trigrams(street: str) -> List[str]:
+    """
+    Distinct character trigrams of a cleaned street name, padded like pg_trgm
+    so the first letters form trigrams of their own
+    """
+    padded = f"  {street} "
+    return sorted({padded[pos:pos + 3] for pos in range(len(padded) - 2)})
+
+class PrefixCandidateGenerator:
+    """
+    Fuzzy candidates from the street prefix blocking index, the default of
+    fuzzy_match_block_batch
+    """
+
+    def __init__(self, prefix_index: Dict[str, CandidateBlock]):
+        self.prefix_index = prefix_index
+
+    def group_key(self, street: str) -> Tuple[str, ...]:
+        return fuzzy_blocking_keys(street)
+
+    def candidates(self, group_key: Tuple[str, ...]) -> Optional[CandidateBlock]:
+        return fuzzy_candidates(group_key, self.prefix_index)
+
+class TrigramCandidateGenerator:
+    """
+    Fuzzy candidates from a character-trigram inverted index over distinct
+    canonical street names.
+
+    A query street is compared with every canonical street sharing a trigram,
+    ranked by trigram Jaccard similarity, and the rows of the top_k most similar
+    streets become the candidates, capped at max_candidates rows. Unlike prefix
+    blocking, a typo in the first letters still finds the street, and the
+    candidate count does not grow with the size of the canonical set.
+    """
+
+    def __init__(self, canonical_table: CanonicalTable, top_k: int = 3, min_similarity: float = 0.3,
+                 max_candidates: int = 2000):
+        """
+        Args:
+            canonical_table: Columnar canonical address table
+            top_k: Most similar streets whose rows become candidates
+            min_similarity: Minimum trigram similarity for a street to be considered
+            max_candidates: Maximum candidate rows per query street
+        """
+        self.table = canonical_table
+        self.top_k = top_k
+        self.min_similarity = min_similarity
+        self.max_candidates = max_candidates
+
+        street_rows = {}
+        for row_id in np.flatnonzero(canonical_table.live).tolist():
+            street = clean(canonical_table.column('street')[row_id])
+            if street:
+                street_rows.setdefault(street, []).append(row_id)
+
+        self.streets = list(street_rows)
+        self.street_ids = {street: street_id for street_id, street in enumerate(self.streets)}
+        self.street_rows = [np.asarray(rows, dtype=np.int64) for rows in street_rows.values()]
+
+        postings = {}
+        for street_id, street in enumerate(self.streets):
+            for trigram in street_trigrams(street):
+                postings.setdefault(trigram, []).append(street_id)
+        self.postings = {trigram: np.asarray(ids, dtype=np.int64) for trigram, ids in postings.items()}
+        self.trigram_counts = np.array([len(street_trigrams(street)) for street in self.streets],
+                                       dtype=np.int64)
+
+    def similar_streets(self, street: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rank canonical streets by trigram similarity to a cleaned street name
+        Returns:
+            Tuple of (street ids, similarities) of the top_k streets, most similar first
+        """
+        trigrams = street_trigrams(street)
+        lists = [self.postings[trigram] for trigram in trigrams if trigram in self.postings]
+        if not lists:
+            return _EMPTY_IDS, np.empty(0)
+
+        street_ids, overlap = np.unique(np.concatenate(lists), return_counts=True)
+        similarity = overlap / (len(trigrams) + self.trigram_counts[street_ids] - overlap)
+        keep = similarity >= self.min_similarity
+        street_ids, similarity = street_ids[keep], similarity[keep]
+
+        order = np.argsort(-similarity, kind='stable')[:self.top_k]
+        return street_ids[order], similarity[order]
+
+    def group_key(self, street: str) -> str:
+        return clean(street)
+
+    def candidates(self, street: str) -> Optional[CandidateBlock]:
+        """Candidate rows of the streets most similar to a cleaned street name"""
+        if not street:
+            return None
+        street_ids, _ = self.similar_streets(street)
+        blocks = [self.street_rows[street_id] for street_id in street_ids]
+        ids = np.concatenate(blocks)[:self.max_candidates] if blocks else _EMPTY_IDS
+        if not len(ids):
+            return None
+        return CandidateBlock(keys=self.table.text_keys[ids].tolist(), ids=ids)
+
+    def add_row(self, row_id: int):
+        """Index a table row added or changed by IndexManager"""
+        street = clean(self.table.column('street')[row_id])
+        if not street:
+            return
+        street_id = self.street_ids.get(street)
+        if street_id is None:
+            street_id = len(self.streets)
+            self.streets.append(street)
+            self.street_ids[street] = street_id
+            self.street_rows.append(_EMPTY_IDS)
+            trigrams = street_trigrams(street)
+            for trigram in trigrams:
+                self.postings[trigram] = np.append(self.postings.get(trigram, _EMPTY_IDS), street_id)
+            self.trigram_counts = np.append(self.trigram_counts, len(trigrams))
+
+        rows = self.street_rows[street_id]
+        self.street_rows[street_id] = np.insert(rows, int(np.searchsorted(rows, row_id)), row_id)
+
+    def remove_row(self, row_id: int):
+        """Remove a table row before IndexManager changes or deletes it"""
+        street_id = self.street_ids.get(clean(self.table.column('street')[row_id]))
+        if street_id is None:
+            return
+        rows = self.street_rows[street_id]
+        # Streets left without rows stay in the postings and yield no candidates
+        self.street_rows[street_id] = rows[rows != row_id]
+
+def make_candidate_generator(name: str, indexes: Dict[str, Any]):
+    """
+    Select the fuzzy candidate generator by name: 'prefix' or 'trigram'
+    """
+    if name == 'prefix':
+        return PrefixCandidateGenerator(indexes['prefix'])
+    if name == 'trigram':
+        return indexes['trigram']
+    raise ValueError(f"Unknown candidate generator: {name}")
@@ -0,0 +1,221 @@
+# src/matching/cascade.py
+
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.matching.matcher_engine import exact_match_ids, fuzzy_match_block_batch, house_match_ids
+from src.matching.fallback import phonetic_match_ids, api_match_ids
+from src.processing.normalizer import normalize_column
+from src.processing.preprocess_utils import (
+    COMPONENT_FIELDS,
+    house_number,
+    make_normalized_key,
+    phonetic_codes,
+    phonetic_column
+)
+from src.utils.performance_monitor import PerformanceMonitor
+
+# Match types in code order; workers return the code, the parent the name.
+# New types are appended so existing codes keep their meaning.
+MATCH_TYPES = np.array(['exact', 'fuzzy', 'metaphone', 'api_validated', 'no_match', 'house_range'],
+                       dtype=object)
+MATCH_CODES = {match_type: code for code, match_type in enumerate(MATCH_TYPES)}
+
+# Transaction columns cleaned before matching
+TRANSACTION_FIELDS = ['house', 'street', 'strtype', 'apttype', 'aptnbr', 'city', 'state', 'zip',
+                      'normalized_address']
+
+# Cascade stages in the order they run
+STAGES = ('exact', 'house', 'fuzzy', 'metaphone', 'api')
+
+def run_cascade(columns: Dict[str, Sequence[str]], indexes: Dict[str, Any], validator,
+                monitor: PerformanceMonitor,
+                candidate_generator=None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray,
+                                                   Dict[str, float]]:
+    """
+    Run the exact -> house range -> fuzzy -> metaphone -> API cascade stage by stage.
+    Each stage runs once over the whole batch and only sees the rows the
+    previous stages left unmatched; rows in, rows matched and time per stage
+    are recorded in the monitor.
+
+    Args:
+        columns: Cleaned TRANSACTION_FIELDS values, one parallel sequence per field,
+            plus optional precomputed street_phonetic codes
+        indexes: Dictionary of matching indexes, including the canonical table
+        validator: Address validator used by the API fallback
+        monitor: Performance monitor for stage, candidate size, API call and cache hit statistics
+        candidate_generator: Fuzzy candidate generator from src.matching.candidates;
+            street prefix blocking if None
+
+    Returns:
+        Tuple of (canonical ids with -1 if unmatched, scores, match type codes,
+        whether the API stage failed to validate the row, seconds spent per stage)
+    """
+    n = len(columns['street'])
+    match_ids = np.full(n, -1, dtype=np.int64)
+    scores = np.zeros(n, dtype=np.float64)
+    match_types = np.full(n, MATCH_CODES['no_match'], dtype=np.int8)
+    api_failed = np.zeros(n, dtype=bool)
+    stage_seconds = OrderedDict((stage, 0.0) for stage in STAGES)
+
+    def take(field: str, rows: np.ndarray) -> List[str]:
+        values = columns[field]
+        return [values[row] for row in rows]
+
+    def resolve(stage: str, match_type: str, rows: np.ndarray, stage_ids: np.ndarray,
+                stage_scores: np.ndarray, start: float) -> np.ndarray:
+        """Store a stage's matches and return the rows it left unmatched"""
+        hit = stage_ids >= 0
+        matched_rows = rows[hit]
+        match_ids[matched_rows] = stage_ids[hit]
+        scores[matched_rows] = stage_scores[hit]
+        match_types[matched_rows] = MATCH_CODES[match_type]
+
+        stage_seconds[stage] = time.perf_counter() - start
+        monitor.record_stage(stage, len(rows), int(hit.sum()), stage_seconds[stage])
+        return rows[~hit]
+
+    rows = np.arange(n)
+
+    # Exact matching is a hash join of the whole batch against the indexes
+    start = time.perf_counter()
+    component_keys = list(zip(*(columns[field] for field in COMPONENT_FIELDS)))
+    exact_ids = exact_match_ids(columns['normalized_address'], component_keys,
+                                indexes['normalized'], indexes['component'])
+    rows = resolve('exact', 'exact', rows, exact_ids, np.ones(n), start)
+
+    # Numeric house number matching on the exact street, before any string scoring
+    start = time.perf_counter()
+    house_ids, house_scores = house_match_ids(take('house', rows), take('street', rows), take('strtype', rows),
+                                              take('aptnbr', rows), indexes['house'])
+    rows = resolve('house', 'house_range', rows, house_ids, house_scores, start)
+
+    # Fuzzy matching runs in batch over everything the earlier stages missed
+    start = time.perf_counter()
+    fuzzy_ids, fuzzy_scores = fuzzy_match_block_batch(
+        take('normalized_address', rows), take('street', rows), indexes['prefix'],
+        candidate_generator=candidate_generator, monitor=monitor
+    )
+    rows = resolve('fuzzy', 'fuzzy', rows, fuzzy_ids, fuzzy_scores, start)
+
+    # Phonetic matching on precomputed street codes, sub-blocked by house number
+    start = time.perf_counter()
+    houses = take('house', rows)
+    streets = take('street', rows)
+    phonetic_keys = [make_normalized_key(house, street, strtype)
+                     for house, street, strtype in zip(houses, streets, take('strtype', rows))]
+    if 'street_phonetic' in columns:
+        codes = [row_codes.split() for row_codes in take('street_phonetic', rows)]
+    else:
+        codes = [phonetic_codes(street) for street in streets]
+    phonetic_ids, phonetic_scores = phonetic_match_ids(phonetic_keys, codes,
+                                                       [house_number(house) for house in houses],
+                                                       indexes['metaphone'], monitor=monitor)
+    rows = resolve('metaphone', 'metaphone', rows, phonetic_ids, phonetic_scores, start)
+
+    # API validation as fallback, validating the remaining rows as one batch
+    start = time.perf_counter()
+    residual = [{field: columns[field][row] for field in TRANSACTION_FIELDS} for row in rows]
+    api_ids, api_scores, failed = api_match_ids(residual, indexes['prefix'], indexes['table'], validator, monitor)
+    api_failed[rows] = failed
+    resolve('api', 'api_validated', rows, api_ids, api_scores, start)
+
+    return match_ids, scores, match_types, api_failed, stage_seconds
+
+def match_transactions(transactions: pd.DataFrame, indexes: Dict[str, Any], validator,
+                       monitor: PerformanceMonitor,
+                       candidate_generator=None) -> Tuple[Dict[str, np.ndarray], Dict[str, float]]:
+    """
+    Clean a frame of transactions, run the cascade once per distinct parsed
+    address and fan the outcomes back out to every transaction.
+
+    Args:
+        transactions: Transactions with TRANSACTION_FIELDS columns
+        indexes: Dictionary of matching indexes, including the canonical table
+        validator: Address validator used by the API fallback
+        monitor: Performance monitor for dedup, API and unmatched statistics
+        candidate_generator: Fuzzy candidate generator passed to run_cascade
+
+    Returns:
+        Tuple of (results, stage_seconds) where results holds parallel arrays of
+        transaction_index, canonical_id (-1 if unmatched), score, match_type code
+        and api_failed, true for no_match rows the validator could not answer
+    """
+    # Pre-process all transactions in the batch, one vectorized pass per column
+    cleaned = {field: normalize_column(transactions[field]).tolist() for field in TRANSACTION_FIELDS}
+    fields = list(TRANSACTION_FIELDS)
+    # Phonetic codes from preprocessing are a function of the street, so they do not split keys
+    if 'street_phonetic' in transactions.columns:
+        # Rows without stored codes get them computed from the street, as phonetic_match_id does
+        stored = transactions['street_phonetic'].fillna('').astype(str)
+        empty = stored.str.strip() == ''
+        if empty.any():
+            stored = stored.where(~empty, phonetic_column(transactions.loc[empty, 'street']))
+        cleaned['street_phonetic'] = stored.tolist()
+        fields.append('street_phonetic')
+
+    # Deduplicate on the parsed key so the cascade runs once per distinct address
+    key_codes = {}
+    row_codes = [key_codes.setdefault(key, len(key_codes))
+                 for key in zip(*(cleaned[field] for field in fields))]
+    distinct = list(zip(*key_codes)) or [()] * len(fields)
+    columns = dict(zip(fields, distinct))
+    monitor.record_dedup(len(row_codes), len(key_codes))
+
+    match_ids, scores, match_types, api_failed, stage_seconds = run_cascade(columns, indexes, validator, monitor,
+                                                                            candidate_generator)
+
+    # Fan the outcomes back out to every transaction sharing the key
+    row_codes = np.asarray(row_codes, dtype=np.int64)
+    results = {
+        'transaction_index': transactions.index.to_numpy(),
+        'canonical_id': match_ids[row_codes],
+        'score': scores[row_codes],
+        'match_type': match_types[row_codes],
+        'api_failed': api_failed[row_codes]
+    }
+    unmatched_count = int((results['match_type'] == MATCH_CODES['no_match']).sum())
+    if unmatched_count:
+        monitor.record_unmatched('no_match_found', unmatched_count)
+
+    return results, stage_seconds
+
+def build_results_frame(chunk, columns, canonical_table):
+    """
+    Join columnar worker results with transaction and canonical address text.
+
+    Args:
+        chunk: Transactions the results were computed for
+        columns: Worker result arrays (transaction_index, canonical_id, score, match_type)
+        canonical_table: Table the canonical ids refer to
+
+    Returns:
+        DataFrame with one result row per transaction
+    """
+    txns = chunk.loc[columns['transaction_index']]
+    ids = columns['canonical_id']
+    matched = ids >= 0
+    matched_ids = ids[matched]
+
+    matched_address_id = np.full(len(ids), None, dtype=object)
+    matched_address_id[matched] = canonical_table.column('hhid')[matched_ids]
+    matched_address = np.full(len(ids), None, dtype=object)
+    matched_address[matched] = (
+        pd.Series(canonical_table.column('house')[matched_ids]).astype(str) + ' ' +
+        pd.Series(canonical_table.column('street')[matched_ids]).astype(str) + ' ' +
+        pd.Series(canonical_table.column('strtype')[matched_ids]).astype(str)
+    ).to_numpy(dtype=object)
+
+    return pd.DataFrame({
+        'transaction_id': txns['transaction_id'].to_numpy(),
+        'matched_address_id': matched_address_id,
+        'confidence_score': columns['score'],
+        'match_type': MATCH_TYPES[columns['match_type']],
+        'original_address': txns['original_address'].to_numpy(),
+        'normalized_address': txns['normalized_address'].to_numpy(),
+        'matched_address': matched_address
+    })
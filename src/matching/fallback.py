@@ -1,79 +1,262 @@
 # src/matching/fallback.py
 
-from rapidfuzz import fuzz
-import metaphone
-from typing import Dict, Any, List, Optional, Tuple
-from src.processing.preprocess_utils import clean, make_normalized_key
-import time
+import numpy as np
+from collections import defaultdict
+from rapidfuzz import fuzz, process
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from src.processing.preprocess_utils import (
+    clean,
+    house_number,
+    make_normalized_key,
+    phonetic_codes,
+    CanonicalTable,
+    CandidateBlock,
+    PhoneticBlock
+)
 
 
-def phonetic_fallback(transaction: Dict[str, Any], metaphone_index: Dict[str, List[Dict[str, Any]]], threshold: float = 0.75) -> Optional[Tuple[Dict[str, Any], float]]:
+def house_slice(block: PhoneticBlock, house: int) -> Tuple[int, int]:
     """
-    Try to find a phonetic (Metaphone) match for the transaction's normalized address.
-    Returns best matching address and score if any above threshold.
+    Binary search a phonetic block for the rows with a house number; if there
+    are none, the rows with the nearest lower and higher house numbers
+    """
+    lo = int(np.searchsorted(block.houses, house, side='left'))
+    hi = int(np.searchsorted(block.houses, house, side='right'))
+    if lo == hi:
+        if lo > 0:
+            lo = int(np.searchsorted(block.houses, block.houses[lo - 1], side='left'))
+        if hi < len(block.houses):
+            hi = int(np.searchsorted(block.houses, block.houses[hi], side='right'))
+    return lo, hi
+
+def house_slices(block: PhoneticBlock, houses: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """house_slice for an array of house numbers, with one binary search per step for all of them"""
+    lo = np.searchsorted(block.houses, houses, side='left')
+    hi = np.searchsorted(block.houses, houses, side='right')
+    below = (lo == hi) & (lo > 0)
+    above = (lo == hi) & (hi < len(block.houses))
+    lo[below] = np.searchsorted(block.houses, block.houses[lo[below] - 1], side='left')
+    hi[above] = np.searchsorted(block.houses, block.houses[hi[above]], side='right')
+    return lo, hi
+
+def _slice_candidates(slices: Sequence[Tuple[str, int, int]],
+                      metaphone_index: Dict[str, PhoneticBlock]) -> Dict[int, str]:
+    """Keys by row id in the (code, lo, hi) block slices, in slice order"""
+    candidates = {}
+    for code, lo, hi in slices:
+        block = metaphone_index[code]
+        for row_id, candidate_key in zip(block.ids[lo:hi].tolist(), block.keys[lo:hi]):
+            candidates.setdefault(row_id, candidate_key)
+    return candidates
+
+def _phonetic_candidates(codes: Sequence[str], house: int,
+                         metaphone_index: Dict[str, PhoneticBlock]) -> Dict[int, str]:
+    """Keys by row id in the house-number neighbourhood of each phonetic code"""
+    slices = [(code, *house_slice(metaphone_index[code], house)) for code in codes if code in metaphone_index]
+    return _slice_candidates(slices, metaphone_index)
+
+def _best_phonetic(key: str, candidates: Dict[int, str], score_cutoff: float) -> Optional[Tuple[int, float]]:
+    if not candidates:
+        return None
+    result = process.extractOne(key, list(candidates.values()), scorer=fuzz.token_sort_ratio,
+                                score_cutoff=score_cutoff)
+    if result:
+        return list(candidates)[result[2]], result[1] / 100.0
+    return None
+
+def phonetic_match_id(transaction: Dict[str, Any], metaphone_index: Dict[str, PhoneticBlock],
+                      threshold: float = 0.75) -> Optional[Tuple[int, float]]:
+    """
+    Phonetic (Metaphone) match returning the canonical table row id and score
+    if any candidate is above threshold. Uses the transaction's precomputed
+    street_phonetic codes when present and not empty.
     """
     key = make_normalized_key(transaction['house'], transaction['street'], transaction['strtype'])
-    mkey = metaphone.dm(key)[0]
+    codes = transaction.get('street_phonetic')
+    codes = codes.split() if isinstance(codes, str) and codes.strip() else phonetic_codes(transaction['street'])
+    candidates = _phonetic_candidates(codes, house_number(transaction['house']), metaphone_index)
+    return _best_phonetic(key, candidates, threshold * 100)
+
+def phonetic_match_ids(keys: Sequence[str], codes: Sequence[Sequence[str]], houses: Sequence[int],
+                       metaphone_index: Dict[str, PhoneticBlock], threshold: float = 0.75,
+                       max_rows_per_call: int = 1024, monitor=None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Batch variant of phonetic_match_id. Candidates per row come from a binary
+    search by house number in each phonetic block, so the cost per row does not
+    depend on how many addresses share a code; each block is searched once for
+    all rows having its code. Rows searching the same block slices share one
+    candidate list and are scored with one rapidfuzz cdist call.
+    Args:
+        keys: make_normalized_key string of each row
+        codes: Street phonetic codes of each row
+        houses: house_number of each row
+        metaphone_index: Index from build_metaphone_index
+        threshold: Minimum similarity score to consider a match
+        max_rows_per_call: Rows scored per cdist call, bounding the score matrix size
+        monitor: Optional PerformanceMonitor that records the candidate set size per row
+    Returns:
+        Tuple of (row ids with -1 for no match, scores) per row
+    """
+    n = len(keys)
+    row_ids = np.full(n, -1, dtype=np.int64)
+    scores = np.zeros(n, dtype=np.float64)
+    candidate_sizes = np.zeros(n, dtype=np.int64)
+    score_cutoff = threshold * 100
+
+    # Binary search each phonetic block once for all rows having its code
+    code_rows = defaultdict(list)
+    slices = [[] for _ in range(n)]
+    for row, (key, row_codes) in enumerate(zip(keys, codes)):
+        if key:
+            for code in row_codes:
+                if code in metaphone_index:
+                    code_rows[code].append((row, len(slices[row])))
+                    slices[row].append(None)
+    houses = np.asarray(houses, dtype=np.int64)
+    for code, positions in code_rows.items():
+        rows, slots = zip(*positions)
+        lo, hi = house_slices(metaphone_index[code], houses[list(rows)])
+        for row, slot, start, end in zip(rows, slots, lo.tolist(), hi.tolist()):
+            slices[row][slot] = (code, start, end)
 
-    best_score = 0
-    best_match = None
+    # Group rows by the block slices they would search
+    groups = defaultdict(list)
+    for row, row_slices in enumerate(slices):
+        if row_slices:
+            groups[tuple(row_slices)].append(row)
 
-    for candidate in metaphone_index.get(mkey, [])[:20]:
-        cand_key = make_normalized_key(candidate.get('house'), candidate.get('street'), candidate.get('strtype'))
-        score = fuzz.token_sort_ratio(key, cand_key) / 100.0
-        if score > best_score:
-            best_score = score
-            best_match = candidate
+    for group_slices, rows in groups.items():
+        candidates = _slice_candidates(group_slices, metaphone_index)
+        if not candidates:
+            continue
+        candidate_sizes[rows] = len(candidates)
+        candidate_ids = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        candidate_keys = list(candidates.values())
 
-    if best_score >= threshold:
-        return best_match, best_score
+        for start in range(0, len(rows), max_rows_per_call):
+            batch_rows = np.asarray(rows[start:start + max_rows_per_call])
+            # float64 scores, so the first best candidate is the one extractOne picks.
+            # Groups are small, as slices depend on the house number; threads would cost more than they save
+            matrix = process.cdist([keys[row] for row in batch_rows], candidate_keys,
+                                   scorer=fuzz.token_sort_ratio, score_cutoff=score_cutoff,
+                                   dtype=np.float64, workers=1)
+            best = matrix.argmax(axis=1)
+            best_scores = matrix[np.arange(len(batch_rows)), best]
+            hit = best_scores >= max(score_cutoff, 1)
+            row_ids[batch_rows[hit]] = candidate_ids[best[hit]]
+            scores[batch_rows[hit]] = best_scores[hit] / 100.0
+
+    if monitor is not None:
+        monitor.record_candidates('metaphone', candidate_sizes)
+    return row_ids, scores
+
+def phonetic_fallback(transaction: Dict[str, Any], metaphone_index: Dict[str, PhoneticBlock],
+                      canonical_table: CanonicalTable, threshold: float = 0.75) -> Optional[Tuple[Dict[str, Any], float]]:
+    """
+    Try to find a phonetic (Metaphone) match for the transaction's normalized address.
+    Returns best matching address and score if any above threshold.
+    """
+    result = phonetic_match_id(transaction, metaphone_index, threshold)
+    if result:
+        row_id, score = result
+        return canonical_table.record(row_id), score
     return None
 
-def api_fallback(transaction: Dict[str, Any], street_index: Dict[str, List[Dict[str, Any]]], api_validator, threshold: float = 0.8) -> Optional[Tuple[Dict[str, Any], float]]:
+def match_validated_address(validated_address: Optional[Dict[str, Any]], api_conf: float,
+                            street_index: Dict[str, CandidateBlock], canonical_table: CanonicalTable,
+                            threshold: float = 0.8) -> Optional[Tuple[int, float]]:
     """
-    API fallback that validates address and tries to match using validated address
+    Match an address returned by the validation API,
+    returning the canonical table row id and combined score
     """
-    # 验证地址
-    validated_address, api_conf = api_validator.validate_address(transaction)
     if not validated_address or api_conf < threshold:
         return None
 
     # 使用验证后的地址进行匹配
-    street = clean(validated_address['street'])
+    street = clean(validated_address.get('street'))
     if not street or street not in street_index:
         return None
 
     # 获取相同街道的候选地址
     candidates = street_index[street]
-    if not candidates:
+    if not len(candidates.ids):
         return None
 
     # 构建验证后的地址键
     validated_key = make_normalized_key(
-        validated_address['house'],
-        validated_address['street'],
-        validated_address['strtype']
+        validated_address.get('house'),
+        validated_address.get('street'),
+        validated_address.get('strtype')
     )
 
-    # 在候选地址中查找最佳匹配
-    best_score = 0
-    best_match = None
-
-    for cand in candidates:
-        cand_key = make_normalized_key(
-            cand.get('house'),
-            cand.get('street'),
-            cand.get('strtype')
-        )
-        score = fuzz.token_sort_ratio(validated_key, cand_key) / 100.0
-        if score > best_score:
-            best_score = score
-            best_match = cand
+    # 在候选地址的预计算键中查找最佳匹配
+    result = process.extractOne(
+        validated_key,
+        canonical_table.normalized_keys[candidates.ids].tolist(),
+        scorer=fuzz.token_sort_ratio,
+        score_cutoff=threshold * 100
+    )
 
     # 如果找到足够好的匹配，返回结果
-    if best_score >= threshold:
+    if result:
         # 将API置信度与匹配分数结合
+        best_score = result[1] / 100.0
         final_score = best_score * api_conf
-        return best_match, final_score
+        return int(candidates.ids[result[2]]), final_score
 
     return None
+
+def api_match_id(transaction: Dict[str, Any], street_index: Dict[str, CandidateBlock],
+                 canonical_table: CanonicalTable, api_validator,
+                 threshold: float = 0.8) -> Optional[Tuple[int, float]]:
+    """
+    Validate the address through the API and match the validated address,
+    returning the canonical table row id and combined score
+    """
+    # 验证地址
+    validated_address, api_conf = api_validator.validate_address(transaction)
+    return match_validated_address(validated_address, api_conf, street_index, canonical_table, threshold)
+
+def api_match_ids(transactions: List[Dict[str, Any]], street_index: Dict[str, CandidateBlock],
+                  canonical_table: CanonicalTable, api_validator, monitor=None,
+                  threshold: float = 0.8) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Validate a batch of transactions in one validator call and match each validated address.
+    Args:
+        transactions: Cleaned transactions left unmatched by the earlier stages
+        street_index: Prefix index, looked up by full street name
+        canonical_table: Table the row ids refer to
+        api_validator: Validator with validate_batch(addresses, monitor)
+        monitor: Optional PerformanceMonitor recording API calls and cache hits
+        threshold: Minimum API confidence and match score
+    Returns:
+        Tuple of (row ids with -1 for no match, combined scores, whether the
+        validator could not answer) per transaction
+    """
+    row_ids = np.full(len(transactions), -1, dtype=np.int64)
+    scores = np.zeros(len(transactions), dtype=np.float64)
+    failed = np.zeros(len(transactions), dtype=bool)
+
+    validations = api_validator.validate_batch(transactions, monitor)
+    for pos, (validated_address, api_conf) in enumerate(validations):
+        if api_conf is None:
+            failed[pos] = True
+            continue
+        result = match_validated_address(validated_address, api_conf, street_index,
+                                         canonical_table, threshold)
+        if result:
+            row_ids[pos], scores[pos] = result
+
+    return row_ids, scores, failed
+
+def api_fallback(transaction: Dict[str, Any], street_index: Dict[str, CandidateBlock],
+                 canonical_table: CanonicalTable, api_validator,
+                 threshold: float = 0.8) -> Optional[Tuple[Dict[str, Any], float]]:
+    """
+    API fallback that validates address and tries to match using validated address
+    """
+    result = api_match_id(transaction, street_index, canonical_table, api_validator, threshold)
+    if result:
+        row_id, score = result
+        return canonical_table.record(row_id), score
+    return None
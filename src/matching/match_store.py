@@ -0,0 +1,133 @@
+# src/matching/match_store.py
+
+import sqlite3
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.matching.cascade import TRANSACTION_FIELDS
+
+# Match outcome columns kept per transaction; the address text comes from the current input
+OUTCOME_COLUMNS = ['matched_address_id', 'confidence_score', 'match_type', 'matched_address']
+
+class MatchStore:
+    """
+    Match outcomes of earlier runs, kept in a SQLite file and keyed by
+    transaction id. Each outcome carries a fingerprint of the transaction's
+    parsed address and the version of the matching setup it was computed
+    with. A transaction is only matched again when it is new, when its address
+    changed, or when the version changed, e.g. after a canonical refresh, so
+    a nightly run does work proportional to the daily delta.
+    """
+
+    def __init__(self, path: str, version: str):
+        """
+        Args:
+            path: SQLite file; created if missing
+            version: Version of the canonical index and matching settings;
+                outcomes stored under another version are ignored and replaced
+        """
+        self.path = path
+        self.version = version
+        self.lookups = 0
+        self.reused = 0
+
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS match_store ("
+            "transaction_id TEXT PRIMARY KEY, fingerprint INTEGER NOT NULL, version TEXT NOT NULL, "
+            "matched_address_id TEXT, confidence_score REAL, match_type TEXT, matched_address TEXT)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def fingerprints(transactions: pd.DataFrame) -> np.ndarray:
+        """
+        64-bit hash per transaction of the fields the cascade matches on. The
+        hash is seeded with a fixed key, so it is stable across runs.
+        """
+        fields = transactions.reindex(columns=TRANSACTION_FIELDS).astype(object)
+        fields = fields.where(fields.notna(), '')
+        return pd.util.hash_pandas_object(fields, index=False).to_numpy().view(np.int64)
+
+    def _load(self, transaction_ids: list) -> Dict[str, Tuple]:
+        """Fetch stored rows of the current version"""
+        found = {}
+        # Stay below SQLite's bound parameter limit
+        for start in range(0, len(transaction_ids), 500):
+            batch = transaction_ids[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT transaction_id, fingerprint, {', '.join(OUTCOME_COLUMNS)} FROM match_store "
+                f"WHERE version = ? AND transaction_id IN ({placeholders})", [self.version, *batch]
+            )
+            for transaction_id, fingerprint, *outcome in rows:
+                found[transaction_id] = (fingerprint, outcome)
+        return found
+
+    def split(self, transactions: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Separate transactions with a stored, current outcome from those to match.
+        Args:
+            transactions: Chunk of transactions
+        Returns:
+            Tuple of (to_match, reused) where to_match is the subset of
+            transactions to run through the cascade and reused holds the stored
+            results of the others in build_results_frame columns, indexed like
+            transactions
+        """
+        ids = transactions['transaction_id'].astype(str).to_numpy(dtype=object)
+        fingerprints = self.fingerprints(transactions)
+        stored = self._load(list(dict.fromkeys(ids)))
+
+        outcomes = [stored.get(transaction_id) for transaction_id in ids]
+        known = np.array([outcome is not None and outcome[0] == fingerprint
+                          for outcome, fingerprint in zip(outcomes, fingerprints)], dtype=bool)
+        self.lookups += len(ids)
+        self.reused += int(known.sum())
+
+        hits = transactions[known]
+        reused = pd.DataFrame([outcome[1] for outcome, hit in zip(outcomes, known) if hit],
+                              columns=OUTCOME_COLUMNS, index=hits.index)
+        reused.insert(0, 'transaction_id', hits['transaction_id'])
+        reused.insert(4, 'original_address', hits['original_address'])
+        reused.insert(5, 'normalized_address', hits['normalized_address'])
+        reused['confidence_score'] = reused['confidence_score'].astype(float)
+        return transactions[~known], reused
+
+    def update(self, transactions: pd.DataFrame, results: pd.DataFrame, retry: Optional[np.ndarray] = None):
+        """
+        Store the outcomes of newly matched transactions under the current version.
+        Args:
+            transactions: Transactions that were matched
+            results: Their results from build_results_frame, in the same order
+            retry: Optional boolean mask of rows not to store, e.g. the api_failed
+                array of the cascade results; such rows are matched again next run
+        """
+        if retry is not None:
+            transactions, results = transactions[~retry], results[~retry]
+        if transactions.empty:
+            return
+        outcomes = results[OUTCOME_COLUMNS].astype(object)
+        outcomes = outcomes.where(outcomes.notna(), None)
+        rows = zip(transactions['transaction_id'].astype(str).tolist(), self.fingerprints(transactions).tolist(),
+                   [self.version] * len(transactions), *(outcomes[column].tolist() for column in OUTCOME_COLUMNS))
+        self._conn.executemany(
+            f"INSERT OR REPLACE INTO match_store VALUES (?, ?, ?, {', '.join('?' * len(OUTCOME_COLUMNS))})", rows
+        )
+        self._conn.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'lookups': self.lookups,
+            'reused': self.reused,
+            'matched': self.lookups - self.reused,
+            'reuse_rate': self.reused / self.lookups if self.lookups else 0.0
+        }
+
+    def close(self):
+        """Close the store"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
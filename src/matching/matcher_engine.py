@@ -1,113 +1,264 @@
 # src/matching/matcher_engine.py
 
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, Optional, Sequence, Tuple
+import numpy as np
 from rapidfuzz import fuzz, process
-from src.processing.preprocess_utils import make_normalized_key, clean
+from src.processing.preprocess_utils import (
+    make_component_key,
+    clean,
+    house_range,
+    CanonicalTable,
+    CandidateBlock,
+    HouseRangeBlock,
+    COMPONENT_FIELDS,
+    BUILDING_FIELDS
+)
 from collections import defaultdict
 
-def exact_match_dict(transaction: Dict[str, Any], canonical_addresses: List[Dict[str, Any]], 
-                    normalized_index: Dict[str, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+def exact_match_id(transaction: Dict[str, Any], normalized_index: Dict[str, int],
+                   component_index: Dict[Tuple[str, ...], int]) -> int:
     """
-    Perform exact match lookup using component-wise comparison and index
+    Exact match lookup returning the canonical table row id, or -1 if none
     """
-    # Try index-based lookup first
+    # Try the normalized address first
     normalized_address = clean(transaction.get('normalized_address', ''))
     if normalized_address:
-        match = normalized_index.get(normalized_address)
-        if match:
-            return match
-
-    # Then try component-wise exact match with street prefix filtering
-    street_prefix = clean(transaction['street'])[:3]
-    candidates = [addr for addr in canonical_addresses 
-                 if clean(addr.get('street', ''))[:3] == street_prefix]
-    
-    for canon_addr in candidates:
-        canon = {
-            'house': clean(canon_addr.get('house')),
-            'street': clean(canon_addr.get('street')),
-            'strtype': clean(canon_addr.get('strtype')),
-            'apttype': clean(canon_addr.get('apttype')),
-            'aptnbr': clean(canon_addr.get('aptnbr')),
-            'city': clean(canon_addr.get('city')),
-            'state': clean(canon_addr.get('state'))
-        }
-
-        if (clean(transaction['house']) == canon['house'] and
-            clean(transaction['street']) == canon['street'] and
-            clean(transaction['strtype']) == canon['strtype'] and
-            clean(transaction['city']) == canon['city'] and
-            clean(transaction['state']) == canon['state'] and
-            clean(transaction['apttype']) == canon['apttype'] and
-            clean(transaction['aptnbr']) == canon['aptnbr']):
-            return canon_addr
+        row_id = normalized_index.get(normalized_address)
+        if row_id is not None:
+            return row_id
 
-    return None
+    # Then the component-wise key
+    return component_index.get(make_component_key(transaction, COMPONENT_FIELDS), -1)
 
-def building_match(transaction: Dict[str, Any], canonical_addresses: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+def exact_match_ids(normalized_addresses: Sequence[str], component_keys: Sequence[Tuple[str, ...]],
+                    normalized_index: Dict[str, int],
+                    component_index: Dict[Tuple[str, ...], int]) -> np.ndarray:
+    """
+    Batch exact_match_id over already cleaned columns, as a hash join of the
+    whole batch against the normalized index and then of the misses against
+    the component index
+    Args:
+        normalized_addresses: Cleaned normalized address per row
+        component_keys: Cleaned COMPONENT_FIELDS tuple per row
+        normalized_index: Index from build_normalized_index_extended
+        component_index: Index from build_component_index
+    Returns:
+        Canonical table row id per row, -1 where there is no exact match
+    """
+    get = normalized_index.get
+    row_ids = np.fromiter((get(address, -1) if address else -1 for address in normalized_addresses),
+                          dtype=np.int64, count=len(normalized_addresses))
+
+    misses = np.flatnonzero(row_ids < 0)
+    get = component_index.get
+    row_ids[misses] = [get(component_keys[row], -1) for row in misses]
+    return row_ids
+
+def house_match_ids(houses: Sequence[str], streets: Sequence[str], strtypes: Sequence[str],
+                    aptnbrs: Sequence[str], house_index: Dict[Tuple[str, str], HouseRangeBlock],
+                    max_distance: int = 10,
+                    distance_penalty: float = 0.01) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Numeric house number matching on the exact street. Binary search in the
+    street's house range block finds the canonical spans containing the house,
+    or failing that the nearest ones within max_distance; among equally near
+    rows the one with the same apartment number wins, then the lowest house.
+    Args:
+        houses: Cleaned house of each row
+        streets: Cleaned street name of each row
+        strtypes: Cleaned street type of each row
+        aptnbrs: Cleaned apartment number of each row
+        house_index: Index from build_house_index
+        max_distance: Largest house number difference to accept
+        distance_penalty: Score deducted per unit of house number difference
+    Returns:
+        Tuple of (row ids with -1 for no match, scores) per row; a span
+        containing the house scores 1.0
+    """
+    n = len(houses)
+    row_ids = np.full(n, -1, dtype=np.int64)
+    scores = np.zeros(n, dtype=np.float64)
+
+    for row, (house, street, strtype, aptnbr) in enumerate(zip(houses, streets, strtypes, aptnbrs)):
+        span = house_range(house)
+        block = house_index.get((street, strtype)) if span and street else None
+        if block is None:
+            continue
+
+        low, high = span
+        start = int(np.searchsorted(block.lows, low - block.span - max_distance, side='left'))
+        stop = int(np.searchsorted(block.lows, high + max_distance, side='right'))
+        if start == stop:
+            continue
+        # Zero where the spans overlap, otherwise the gap between them
+        distance = np.maximum(0, np.maximum(block.lows[start:stop] - high, low - block.highs[start:stop]))
+        best = int(distance.min())
+        if best > max_distance:
+            continue
+
+        nearest = (np.flatnonzero(distance == best) + start).tolist()
+        pos = next((pos for pos in nearest if aptnbr and block.apts[pos] == aptnbr), nearest[0])
+        row_ids[row] = block.ids[pos]
+        scores[row] = 1.0 - distance_penalty * best
+
+    return row_ids, scores
+
+def _scan_component_key(canonical_table: CanonicalTable, key: Tuple[str, ...],
+                        fields: Tuple[str, ...]) -> int:
+    """Linear scan for the first row whose component key equals key"""
+    for row_id, record in canonical_table.rows():
+        if make_component_key(record, fields) == key:
+            return row_id
+    return -1
+
+def exact_match_dict(transaction: Dict[str, Any], canonical_table: CanonicalTable,
+                    normalized_index: Dict[str, int],
+                    component_index: Optional[Dict[Tuple[str, ...], int]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Perform exact match lookup using component-wise comparison and index
+    Args:
+        transaction: Transaction address components
+        canonical_table: Canonical address table, only scanned when no component index is given
+        normalized_index: Index from build_normalized_index_extended
+        component_index: Index from build_component_index
+    Returns:
+        Matched canonical address if found, None otherwise
+    """
+    if component_index is not None:
+        row_id = exact_match_id(transaction, normalized_index, component_index)
+    else:
+        row_id = exact_match_id(transaction, normalized_index, {})
+        if row_id < 0:
+            row_id = _scan_component_key(canonical_table, make_component_key(transaction, COMPONENT_FIELDS),
+                                         COMPONENT_FIELDS)
+    return canonical_table.record(row_id) if row_id >= 0 else None
+
+def building_match(transaction: Dict[str, Any], canonical_table: CanonicalTable,
+                   building_index: Optional[Dict[Tuple[str, ...], int]] = None) -> Optional[Dict[str, Any]]:
     """
     Match addresses ignoring apartment information
     """
-    # Filter candidates by street prefix for efficiency
-    street_prefix = clean(transaction['street'])[:3]
-    candidates = [addr for addr in canonical_addresses 
-                 if clean(addr.get('street', ''))[:3] == street_prefix]
-    
-    for addr in candidates:
-        if (clean(addr.get('house')) == clean(transaction['house']) and
-            clean(addr.get('street')) == clean(transaction['street']) and
-            clean(addr.get('strtype')) == clean(transaction['strtype']) and
-            clean(addr.get('city')) == clean(transaction['city']) and
-            clean(addr.get('state')) == clean(transaction['state'])):
-            return addr
-    return None
+    key = make_component_key(transaction, BUILDING_FIELDS)
+    if building_index is not None:
+        row_id = building_index.get(key, -1)
+    else:
+        row_id = _scan_component_key(canonical_table, key, BUILDING_FIELDS)
+    return canonical_table.record(row_id) if row_id >= 0 else None
 
-def fuzzy_match_block(normalized_address: str, street: str, prefix_index: Dict[str, List[Dict[str, Any]]], 
+def fuzzy_blocking_keys(street: str) -> Tuple[str, ...]:
+    """
+    Prefix index keys searched for a street, as used by fuzzy_match_block
+    """
+    keys = (clean(street)[:3],)
+    if len(street) > 3:
+        keys += (clean(street)[:4],)
+    return keys
+
+def fuzzy_candidates(keys: Tuple[str, ...], prefix_index: Dict[str, CandidateBlock]) -> Optional[CandidateBlock]:
+    """
+    Collect the candidates of the given prefix index keys into one block.
+    The 4-char block is a subset of the 3-char one, so candidates are deduplicated by row id.
+    """
+    blocks = [prefix_index[key] for key in keys if key in prefix_index]
+    if not blocks:
+        return None
+    if len(blocks) == 1:
+        return blocks[0]
+
+    ids = np.concatenate([block.ids for block in blocks])
+    block_keys = [key for block in blocks for key in block.keys]
+    _, first = np.unique(ids, return_index=True)
+    first.sort()
+    return CandidateBlock(keys=[block_keys[pos] for pos in first], ids=ids[first])
+
+def fuzzy_match_block(normalized_address: str, street: str, prefix_index: Dict[str, CandidateBlock],
+                     canonical_table: CanonicalTable,
                      threshold: float = 0.85) -> Optional[Tuple[Dict[str, Any], float]]:
     """
     Perform fuzzy matching using street prefix and type blocking
     Args:
         normalized_address: Normalized address string to match
+        street: Street name used for blocking
         prefix_index: Dictionary containing blocking indexes
+        canonical_table: Table the block row ids refer to
         threshold: Minimum similarity score to consider a match (default: 0.85)
     Returns:
         Tuple of (matched address, score) if found, None otherwise
     """
-    # Parse address components
-        
-    
-    # Get candidate pools using different blocking strategies
-    candidate_pools = []
-    
-    # 1. Try 3-char street prefix
-    prefix3 = clean(street)[:3]
-    candidates = prefix_index.get(prefix3, [])
-    candidate_pools.extend(candidates)
-    
-    # 2. Try 4-char street prefix for longer streets
-    if len(street) > 3:
-        prefix4 = clean(street)[:4]
-        candidates = prefix_index.get(prefix4, [])
-        candidate_pools.extend(candidates)
-    
-    
-    if not candidate_pools:
+    block = fuzzy_candidates(fuzzy_blocking_keys(street), prefix_index)
+    if block is None:
         return None
         
-    # Use RapidFuzz's process for efficient matching
-    candidates = [f"{clean(c.get('house'))} {clean(c.get('street'))} {clean(c.get('strtype'))}" 
-                 for c in candidate_pools]
-    
+    # Use RapidFuzz's process over the precomputed candidate strings
     result = process.extractOne(
         normalized_address,
-        candidates,
+        block.keys,
         scorer=fuzz.token_sort_ratio,
         score_cutoff=int(threshold * 100)
     )
     
     if result:
         score = result[1] / 100.0
-        match = candidate_pools[candidates.index(result[0])]
+        match = canonical_table.record(block.ids[result[2]])
         return match, score
         
-    return None
\ No newline at end of file
+    return None
+
+def fuzzy_match_block_batch(normalized_addresses: Sequence[str], streets: Sequence[str],
+                            prefix_index: Dict[str, CandidateBlock], threshold: float = 0.85,
+                            max_rows_per_call: int = 1024,
+                            candidate_generator=None, monitor=None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Batch variant of fuzzy_match_block that scores each blocking group with one
+    multithreaded rapidfuzz cdist call instead of one extractOne call per row
+    Args:
+        normalized_addresses: Normalized address strings to match
+        streets: Street name of each row, used for blocking
+        prefix_index: Dictionary containing blocking indexes
+        threshold: Minimum similarity score to consider a match (default: 0.85)
+        max_rows_per_call: Rows scored per cdist call, bounding the score matrix size
+        candidate_generator: Optional generator from src.matching.candidates with
+            group_key(street) and candidates(group_key); prefix blocking if None
+        monitor: Optional PerformanceMonitor that records the candidate set size per row
+    Returns:
+        Tuple of (row_ids, scores) arrays; row_ids holds the matched canonical table
+        row or -1 and scores holds the match score or 0.0 per row
+    """
+    n = len(normalized_addresses)
+    row_ids = np.full(n, -1, dtype=np.int64)
+    scores = np.zeros(n, dtype=np.float64)
+    candidate_sizes = np.zeros(n, dtype=np.int64)
+    score_cutoff = int(threshold * 100)
+
+    if candidate_generator is None:
+        group_key = fuzzy_blocking_keys
+        candidates = lambda keys: fuzzy_candidates(keys, prefix_index)
+    else:
+        group_key = candidate_generator.group_key
+        candidates = candidate_generator.candidates
+
+    # Group rows by the blocks they would search
+    groups = defaultdict(list)
+    for row, street in enumerate(streets):
+        groups[group_key(street)].append(row)
+
+    for keys, rows in groups.items():
+        block = candidates(keys)
+        if block is None:
+            continue
+        candidate_sizes[rows] = len(block.ids)
+
+        for start in range(0, len(rows), max_rows_per_call):
+            batch_rows = np.asarray(rows[start:start + max_rows_per_call])
+            queries = [normalized_addresses[row] for row in batch_rows]
+            matrix = process.cdist(queries, block.keys, scorer=fuzz.token_sort_ratio,
+                                   score_cutoff=score_cutoff, dtype=np.float64, workers=-1)
+            best = matrix.argmax(axis=1)
+            best_scores = matrix[np.arange(len(batch_rows)), best]
+            hit = best_scores >= max(score_cutoff, 1)
+            row_ids[batch_rows[hit]] = block.ids[best[hit]]
+            scores[batch_rows[hit]] = best_scores[hit] / 100.0
+
+    if monitor is not None:
+        monitor.record_candidates('fuzzy', candidate_sizes)
+    return row_ids, scores
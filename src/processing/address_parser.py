@@ -1,15 +1,19 @@
 import usaddress
+from src.processing.normalizer import normalize_text
 import pandas as pd
 import logging
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, List, Optional, Tuple
+from src.processing.parse_cache import ParseCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class AddressParser:
-    def __init__(self):
+    def __init__(self, cache: Optional[ParseCache] = None):
         self.logger = logging.getLogger(__name__)
+        # Optional cache so repeated addresses are tagged only once
+        self.cache = cache
         # Map usaddress fields to our database fields
         self.field_mapping = {
             'AddressNumber': 'house',
@@ -32,6 +36,32 @@ class AddressParser:
         Returns:
             Dict[str, Any]: Dictionary containing parsed address components
         """
+        if self.cache is not None:
+            return self.cache.parse_many([address], self._tag_many)[0]
+        return self._tag(address)
+
+    def parse_many(self, addresses: List[str]) -> List[Dict[str, Any]]:
+        """
+        Parse a batch of raw address strings, tagging each distinct address once.
+        
+        Args:
+            addresses (List[str]): Raw address strings
+            
+        Returns:
+            List[Dict[str, Any]]: Parsed components in input order
+        """
+        if self.cache is not None:
+            return self.cache.parse_many(addresses, self._tag_many)
+        distinct = {address: None for address in addresses}
+        for address in distinct:
+            distinct[address] = self._tag(address)
+        return [distinct[address] for address in addresses]
+
+    def _tag_many(self, addresses: List[str]) -> List[Dict[str, Any]]:
+        return [self._tag(address) for address in addresses]
+
+    def _tag(self, address: str) -> Dict[str, Any]:
+        """Run the usaddress tagger and map its fields to our schema"""
         try:
             tagged_address, _ = usaddress.tag(address)
             # Map the fields to our database schema
@@ -60,36 +90,7 @@ class AddressParser:
         Returns:
             str: Normalized address string
         """
-        if not address:
-            return ""
-            
-        # Convert to uppercase and remove extra spaces
-        address = " ".join(address.upper().split())
-        
-        # Standardize common abbreviations
-        replacements = {
-            "STREET": "ST",
-            "AVENUE": "AVE",
-            "BOULEVARD": "BLVD",
-            "ROAD": "RD",
-            "DRIVE": "DR",
-            "LANE": "LN",
-            "PLACE": "PL",
-            "COURT": "CT",
-            "CIRCLE": "CIR",
-            "SUITE": "STE",
-            "APARTMENT": "APT",
-            "FLOOR": "FL",
-            "NORTH": "N",
-            "SOUTH": "S",
-            "EAST": "E",
-            "WEST": "W"
-        }
-        
-        for old, new in replacements.items():
-            address = address.replace(old, new)
-            
-        return address
+        return normalize_text(address, case='upper')
 
     def parse_and_normalize(self, address: str) -> Tuple[Dict[str, Any], str]:
         """
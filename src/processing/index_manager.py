@@ -0,0 +1,295 @@
+# src/processing/index_manager.py
+
+import bisect
+import logging
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.processing.preprocess_utils import (
+    CandidateBlock,
+    HouseRangeBlock,
+    PhoneticBlock,
+    clean,
+    house_number,
+    house_range,
+    make_component_key,
+    normalized_index_keys,
+    phonetic_codes,
+    prefix_buckets,
+    street_key
+)
+
+logger = logging.getLogger(__name__)
+
+DELTA_ACTIONS = ('upsert', 'delete')
+
+class IndexManager:
+    """
+    Applies row-level changes keyed by hhid to a canonical table and all of its
+    matching indexes, so a small delta costs time proportional to the delta rather
+    than a full rebuild.
+
+    Updated rows keep their row id and new rows are appended, so every index holds
+    the same candidates, in the same order, as a full rebuild of the updated list.
+    Deleted rows stay in the table as tombstones and are removed from every index.
+    """
+
+    def __init__(self, indexes: Dict[str, Any]):
+        """
+        Args:
+            indexes: Indexes as produced by index_store.build_indexes or loaded from an artifact
+        """
+        self.indexes = indexes
+        self.table = indexes['table']
+
+        hhids = self.table.column('hhid')
+        self.hhid_rows = {hhids[row_id]: row_id for row_id in np.flatnonzero(self.table.live).tolist()}
+
+        # All rows, in row order, of the unique-key index entries that several rows
+        # share, so a removed winner can be replaced by the row a full rebuild would
+        # have picked. Entries held by one row are not listed; the index has the row.
+        self.shared_rows = indexes['shared_rows']
+
+    def _normalized_keys(self, row_id: int, record: Dict[str, Any]) -> List[str]:
+        return normalized_index_keys(self.table.text_keys[row_id], record.get('city'), record.get('state'))
+
+    def _insert_key_row(self, name: str, key, row_id: int, winner: int):
+        """Add a row to a unique-key index entry; winner picks its row from the entry's rows in row order"""
+        index, shared = self.indexes[name], self.shared_rows[name]
+        rows = shared.get(key)
+        if rows is None:
+            rows = [index[key]] if key in index else []
+        bisect.insort(rows, row_id)
+        if len(rows) > 1:
+            shared[key] = rows
+        index[key] = rows[winner]
+
+    def _remove_key_row(self, name: str, key, row_id: int, winner: int):
+        """Remove a row from a unique-key index entry, dropping the entry with its last row"""
+        index, shared = self.indexes[name], self.shared_rows[name]
+        rows = shared.pop(key, None) or [index[key]]
+        rows.remove(row_id)
+        if not rows:
+            del index[key]
+            return
+        if len(rows) > 1:
+            shared[key] = rows
+        index[key] = rows[winner]
+
+    @staticmethod
+    def _block_insert(index: Dict[str, CandidateBlock], bucket: str, row_id: int, key: str):
+        # Blocks are replaced rather than mutated; loaded id arrays are read-only views
+        block = index.get(bucket)
+        if block is None:
+            index[bucket] = CandidateBlock(keys=[key], ids=np.array([row_id], dtype=np.int64))
+            return
+        pos = int(np.searchsorted(block.ids, row_id))
+        keys = list(block.keys)
+        keys.insert(pos, key)
+        index[bucket] = CandidateBlock(keys=keys, ids=np.insert(block.ids, pos, row_id))
+
+    @staticmethod
+    def _block_remove(index: Dict[str, CandidateBlock], bucket: str, row_id: int):
+        block = index.get(bucket)
+        if block is None:
+            return
+        pos = int(np.searchsorted(block.ids, row_id))
+        if pos == len(block.ids) or block.ids[pos] != row_id:
+            return
+        if len(block.ids) == 1:
+            del index[bucket]
+            return
+        index[bucket] = CandidateBlock(keys=block.keys[:pos] + block.keys[pos + 1:],
+                                       ids=np.delete(block.ids, pos))
+
+    @staticmethod
+    def _phonetic_insert(index: Dict[str, PhoneticBlock], code: str, house: int, row_id: int, key: str):
+        # Keep the block sorted by house number, then row id
+        block = index.get(code)
+        if block is None:
+            index[code] = PhoneticBlock(houses=np.array([house], dtype=np.int64),
+                                        ids=np.array([row_id], dtype=np.int64), keys=[key])
+            return
+        lo = int(np.searchsorted(block.houses, house, side='left'))
+        hi = int(np.searchsorted(block.houses, house, side='right'))
+        pos = lo + int(np.searchsorted(block.ids[lo:hi], row_id))
+        keys = list(block.keys)
+        keys.insert(pos, key)
+        index[code] = PhoneticBlock(houses=np.insert(block.houses, pos, house),
+                                    ids=np.insert(block.ids, pos, row_id), keys=keys)
+
+    @staticmethod
+    def _phonetic_remove(index: Dict[str, PhoneticBlock], code: str, row_id: int):
+        block = index.get(code)
+        if block is None:
+            return
+        positions = np.flatnonzero(block.ids == row_id)
+        if not len(positions):
+            return
+        if len(block.ids) == 1:
+            del index[code]
+            return
+        pos = int(positions[0])
+        index[code] = PhoneticBlock(houses=np.delete(block.houses, pos), ids=np.delete(block.ids, pos),
+                                    keys=block.keys[:pos] + block.keys[pos + 1:])
+
+    @staticmethod
+    def _house_insert(index: Dict[Any, HouseRangeBlock], key, span, row_id: int, apt: str):
+        # Keep the block sorted by low house number, then row id
+        low, high = span
+        block = index.get(key)
+        if block is None:
+            index[key] = HouseRangeBlock(lows=np.array([low], dtype=np.int64),
+                                         highs=np.array([high], dtype=np.int64),
+                                         ids=np.array([row_id], dtype=np.int64), apts=[apt], span=high - low)
+            return
+        lo = int(np.searchsorted(block.lows, low, side='left'))
+        hi = int(np.searchsorted(block.lows, low, side='right'))
+        pos = lo + int(np.searchsorted(block.ids[lo:hi], row_id))
+        apts = list(block.apts)
+        apts.insert(pos, apt)
+        index[key] = HouseRangeBlock(lows=np.insert(block.lows, pos, low), highs=np.insert(block.highs, pos, high),
+                                     ids=np.insert(block.ids, pos, row_id), apts=apts,
+                                     span=max(block.span, high - low))
+
+    @staticmethod
+    def _house_remove(index: Dict[Any, HouseRangeBlock], key, row_id: int):
+        block = index.get(key)
+        if block is None:
+            return
+        positions = np.flatnonzero(block.ids == row_id)
+        if not len(positions):
+            return
+        if len(block.ids) == 1:
+            del index[key]
+            return
+        # span stays an upper bound, which keeps lookups correct
+        pos = int(positions[0])
+        index[key] = block._replace(lows=np.delete(block.lows, pos), highs=np.delete(block.highs, pos),
+                                    ids=np.delete(block.ids, pos), apts=block.apts[:pos] + block.apts[pos + 1:])
+
+    def _add_row(self, row_id: int):
+        """Insert a table row into every index"""
+        record = self.table.record(row_id)
+
+        # Later rows win in the normalized index, the first row in the component index
+        for key in self._normalized_keys(row_id, record):
+            self._insert_key_row('normalized', key, row_id, -1)
+        self._insert_key_row('component', make_component_key(record), row_id, 0)
+
+        span = house_range(record.get('house'))
+        house_key = street_key(record.get('street'), record.get('strtype'))
+        if span and house_key[0]:
+            self._house_insert(self.indexes['house'], house_key, span, row_id, clean(record.get('aptnbr')))
+
+        for bucket in prefix_buckets(record.get('street'), record.get('strtype')):
+            self._block_insert(self.indexes['prefix'], bucket, row_id, self.table.text_keys[row_id])
+        house = house_number(record.get('house'))
+        for code in phonetic_codes(record.get('street')):
+            self._phonetic_insert(self.indexes['metaphone'], code, house, row_id,
+                                  self.table.normalized_keys[row_id])
+        self.indexes['trigram'].add_row(row_id)
+
+    def _remove_row(self, row_id: int):
+        """Remove a table row from every index, using its current values"""
+        record = self.table.record(row_id)
+
+        for key in self._normalized_keys(row_id, record):
+            self._remove_key_row('normalized', key, row_id, -1)
+        self._remove_key_row('component', make_component_key(record), row_id, 0)
+
+        self._house_remove(self.indexes['house'], street_key(record.get('street'), record.get('strtype')), row_id)
+
+        for bucket in prefix_buckets(record.get('street'), record.get('strtype')):
+            self._block_remove(self.indexes['prefix'], bucket, row_id)
+        for code in phonetic_codes(record.get('street')):
+            self._phonetic_remove(self.indexes['metaphone'], code, row_id)
+        self.indexes['trigram'].remove_row(row_id)
+
+    def upsert(self, record: Dict[str, Any]) -> int:
+        """
+        Insert a canonical address or replace the one with the same hhid
+        Returns:
+            Table row id of the address
+        """
+        return self.upsert_many([record])[0]
+
+    def upsert_many(self, records: List[Dict[str, Any]]) -> List[int]:
+        """
+        Insert or replace canonical addresses by hhid; new addresses are appended
+        to the table in one batch
+        Returns:
+            Table row ids in the order of records
+        """
+        row_ids: List[Optional[int]] = []
+        new_records = {}
+        for record in records:
+            hhid = record['hhid']
+            row_id = self.hhid_rows.get(hhid)
+            if row_id is None:
+                # The last record wins when a new hhid repeats within the batch
+                new_records[hhid] = record
+            else:
+                self._remove_row(row_id)
+                self.table.update(row_id, record)
+                self._add_row(row_id)
+            row_ids.append(row_id)
+
+        if new_records:
+            for hhid, row_id in zip(new_records, self.table.append(list(new_records.values())).tolist()):
+                self.hhid_rows[hhid] = row_id
+                self._add_row(row_id)
+
+        return [self.hhid_rows[record['hhid']] if row_id is None else row_id
+                for record, row_id in zip(records, row_ids)]
+
+    def delete(self, hhid) -> bool:
+        """
+        Remove a canonical address by hhid
+        Returns:
+            Whether the address was present
+        """
+        row_id = self.hhid_rows.pop(hhid, None)
+        if row_id is None:
+            return False
+        self._remove_row(row_id)
+        self.table.delete(row_id)
+        return True
+
+    def apply_delta(self, delta: pd.DataFrame) -> Dict[str, int]:
+        """
+        Apply a delta of canonical addresses.
+        The delta has the canonical columns plus an optional 'action' column with
+        'upsert' (the default) or 'delete'; deletes only need hhid. When an hhid
+        appears more than once, its last row wins.
+        Args:
+            delta: Delta rows, e.g. read with pd.read_csv
+        Returns:
+            Counts of inserted, updated, deleted and missing (deletes of unknown hhids) rows
+        """
+        if 'action' in delta.columns:
+            actions = delta['action'].fillna('upsert').str.strip().str.lower()
+            unknown = set(actions) - set(DELTA_ACTIONS)
+            if unknown:
+                raise ValueError(f"Unknown delta actions: {sorted(unknown)}")
+            delta = delta.drop(columns='action')
+        else:
+            actions = pd.Series('upsert', index=delta.index)
+
+        last = ~delta['hhid'].duplicated(keep='last')
+        delta, actions = delta[last], actions[last]
+
+        stats = {'inserted': 0, 'updated': 0, 'deleted': 0, 'missing': 0}
+        for hhid in delta.loc[actions == 'delete', 'hhid']:
+            stats['deleted' if self.delete(hhid) else 'missing'] += 1
+
+        upserts = delta[actions == 'upsert'].to_dict('records')
+        stats['updated'] = sum(record['hhid'] in self.hhid_rows for record in upserts)
+        stats['inserted'] = len(upserts) - stats['updated']
+        self.upsert_many(upserts)
+
+        logger.info(f"Applied delta: {stats['inserted']:,} inserted, {stats['updated']:,} updated, "
+                    f"{stats['deleted']:,} deleted, {stats['missing']:,} unknown deletes")
+        return stats
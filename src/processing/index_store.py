@@ -0,0 +1,225 @@
+# src/processing/index_store.py
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import pickle
+import struct
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from src.matching.candidates import TrigramCandidateGenerator
+from src.processing.index_manager import IndexManager
+from src.processing.preprocess_utils import (
+    CanonicalTable,
+    build_component_index,
+    build_house_index,
+    build_metaphone_index,
+    build_normalized_index_extended,
+    build_prefix_index
+)
+from src.processing.table_io import read_table
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever index structures or key normalization change, so old artifacts are rebuilt
+INDEX_FORMAT_VERSION = 8
+
+# Canonical reference set and the index artifact built from it
+CANONICAL_PATH = "data/raw/11211 Addresses.csv"
+INDEX_PATH = "data/processed/canonical_index.bin"
+
+MAGIC = b'ADDRIDX\x00'
+# Raw array buffers start on this boundary inside the artifact
+BUFFER_ALIGNMENT = 64
+
+def build_indexes(canonical_table: CanonicalTable) -> Dict[str, Any]:
+    """
+    Build every matching index over a canonical table
+    Args:
+        canonical_table: Columnar canonical address table
+    Returns:
+        Dictionary of indexes keyed by name, including the table itself
+    """
+    # All row ids of keys that several rows share, which IndexManager needs to
+    # find the next winner when one is removed
+    shared_rows = {'normalized': {}, 'component': {}}
+    return {
+        'table': canonical_table,
+        'normalized': build_normalized_index_extended(canonical_table, shared_rows=shared_rows['normalized']),
+        'component': build_component_index(canonical_table, shared_rows=shared_rows['component']),
+        'shared_rows': shared_rows,
+        'house': build_house_index(canonical_table),
+        'prefix': build_prefix_index(canonical_table),
+        'metaphone': build_metaphone_index(canonical_table),
+        'trigram': TrigramCandidateGenerator(canonical_table)
+    }
+
+def file_sha256(path: str) -> str:
+    """
+    Hash a file's content in blocks without loading it into memory
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def save_index_artifact(indexes: Dict[str, Any], artifact_path: str, source_path: str,
+                        source_hash: str, deltas: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+    """
+    Serialize the canonical table and all indexes into one artifact file.
+    The file holds a JSON header, a pickle of the index objects, and the raw
+    NumPy buffers pickled out-of-band, so row id arrays can be memory-mapped on load.
+    Args:
+        indexes: Indexes from build_indexes
+        artifact_path: Output file
+        source_path: Canonical CSV the indexes were built from
+        source_hash: SHA-256 of the canonical CSV
+        deltas: Delta files applied on top of the last full build
+    Returns:
+        The artifact header
+    """
+    buffers = []
+    payload = pickle.dumps(indexes, protocol=5, buffer_callback=buffers.append)
+    raw_buffers = [buffer.raw() for buffer in buffers]
+
+    header = {
+        'format_version': INDEX_FORMAT_VERSION,
+        'source_path': source_path,
+        'source_sha256': source_hash,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'deltas': deltas or [],
+        'rows': int(indexes['table'].live.sum()),
+        'pickle_length': len(payload),
+        'buffer_lengths': [raw.nbytes for raw in raw_buffers]
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+
+    os.makedirs(os.path.dirname(artifact_path) or '.', exist_ok=True)
+    tmp_path = f"{artifact_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        f.write(payload)
+        for raw in raw_buffers:
+            f.write(b'\0' * (-f.tell() % BUFFER_ALIGNMENT))
+            f.write(raw)
+    # Replace atomically so readers never see a partial artifact
+    os.replace(tmp_path, artifact_path)
+    return header
+
+def read_artifact_header(artifact_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Read an artifact's header without loading the indexes.
+    Returns None if the file is missing or not an index artifact.
+    """
+    try:
+        with open(artifact_path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            (header_length,) = struct.unpack('<Q', f.read(8))
+            header = json.loads(f.read(header_length))
+    except (OSError, ValueError, struct.error):
+        return None
+    header['header_end'] = len(MAGIC) + 8 + header_length
+    return header
+
+def artifact_version(artifact_path: str) -> Optional[str]:
+    """
+    Short hash of the format version, canonical source and deltas an artifact
+    was built from; it changes whenever matching against the artifact may give
+    different results. None if there is no artifact.
+    """
+    header = read_artifact_header(artifact_path)
+    if header is None:
+        return None
+    source = {field: header[field] for field in ('format_version', 'source_sha256', 'deltas')}
+    return hashlib.sha256(json.dumps(source, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+def load_index_artifact(artifact_path: str) -> Dict[str, Any]:
+    """
+    Load indexes from an artifact. Row id arrays are read-only views on a
+    memory map of the file, so they are paged in lazily and shared between
+    processes through the page cache.
+    """
+    header = read_artifact_header(artifact_path)
+    if header is None:
+        raise ValueError(f"Not an index artifact: {artifact_path}")
+
+    with open(artifact_path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+
+    offset = header['header_end']
+    payload = view[offset:offset + header['pickle_length']]
+    offset += header['pickle_length']
+    buffers = []
+    for length in header['buffer_lengths']:
+        offset += -offset % BUFFER_ALIGNMENT
+        buffers.append(view[offset:offset + length])
+        offset += length
+
+    return pickle.loads(payload, buffers=buffers)
+
+def build_index_artifact(canonical_path: str, artifact_path: str) -> Dict[str, Any]:
+    """
+    Build all indexes from the canonical CSV or Parquet file and save them as an artifact.
+    Returns the indexes.
+    """
+    source_hash = file_sha256(canonical_path)
+    # Read as strings, like deltas, so updated and rebuilt rows hold the same values
+    canonical_table = CanonicalTable.from_frame(read_table(canonical_path, dtype=str))
+    indexes = build_indexes(canonical_table)
+    save_index_artifact(indexes, artifact_path, canonical_path, source_hash)
+    logger.info(f"Built index artifact {artifact_path} for {len(canonical_table):,} canonical addresses")
+    return indexes
+
+def load_or_build_indexes(canonical_path: str, artifact_path: str) -> Dict[str, Any]:
+    """
+    Load indexes from the artifact when it matches the canonical CSV content and
+    the current format version; otherwise rebuild it.
+    Args:
+        canonical_path: Canonical address CSV
+        artifact_path: Index artifact file
+    Returns:
+        Indexes as produced by build_indexes
+    """
+    header = read_artifact_header(artifact_path)
+    if (header is not None and header['format_version'] == INDEX_FORMAT_VERSION
+            and header['source_sha256'] == file_sha256(canonical_path)):
+        logger.info(f"Loading index artifact {artifact_path} built {header['created_at']}")
+        return load_index_artifact(artifact_path)
+
+    logger.info(f"Index artifact {artifact_path} is missing or stale, rebuilding")
+    return build_index_artifact(canonical_path, artifact_path)
+
+def update_index_artifact(canonical_path: str, artifact_path: str, delta_path: str) -> Dict[str, int]:
+    """
+    Apply a delta CSV to the index artifact instead of rebuilding it.
+    canonical_path should already hold the refreshed canonical export; its hash is
+    recorded so the next run loads the updated artifact without a rebuild.
+    Falls back to a full build when there is no artifact in the current format.
+    Args:
+        canonical_path: Canonical address CSV
+        artifact_path: Index artifact file
+        delta_path: Delta CSV or Parquet file as accepted by IndexManager.apply_delta
+    Returns:
+        Delta statistics from IndexManager.apply_delta
+    """
+    header = read_artifact_header(artifact_path)
+    if header is None or header['format_version'] != INDEX_FORMAT_VERSION:
+        logger.info(f"No current index artifact at {artifact_path}, building from {canonical_path}")
+        build_index_artifact(canonical_path, artifact_path)
+        return {'inserted': 0, 'updated': 0, 'deleted': 0, 'missing': 0}
+
+    manager = IndexManager(load_index_artifact(artifact_path))
+    # As strings: numeric inference would turn houses into floats in deltas with hhid-only deletes
+    stats = manager.apply_delta(read_table(delta_path, dtype=str))
+
+    deltas = header['deltas'] + [{'path': delta_path, 'sha256': file_sha256(delta_path)}]
+    save_index_artifact(manager.indexes, artifact_path, canonical_path, file_sha256(canonical_path), deltas)
+    return stats
@@ -0,0 +1,92 @@
+# src/processing/normalizer.py
+
+import re
+import numpy as np
+import pandas as pd
+
+# Standard address abbreviations, applied to whole tokens only
+ABBREVIATIONS = {
+    'street': 'st',
+    'avenue': 'ave',
+    'boulevard': 'blvd',
+    'road': 'rd',
+    'drive': 'dr',
+    'lane': 'ln',
+    'place': 'pl',
+    'court': 'ct',
+    'circle': 'cir',
+    'terrace': 'ter',
+    'parkway': 'pkwy',
+    'highway': 'hwy',
+    'suite': 'ste',
+    'apartment': 'apt',
+    'floor': 'fl',
+    'north': 'n',
+    'south': 's',
+    'east': 'e',
+    'west': 'w',
+    'northeast': 'ne',
+    'northwest': 'nw',
+    'southeast': 'se',
+    'southwest': 'sw'
+}
+
+_REPLACEMENTS = {
+    'lower': ABBREVIATIONS,
+    'upper': {word.upper(): abbr.upper() for word, abbr in ABBREVIATIONS.items()}
+}
+
+# One alternation over all abbreviated words, for tokens with punctuation attached
+_PATTERNS = {
+    case: re.compile(r'\b(?:' + '|'.join(map(re.escape, sorted(words, key=len, reverse=True))) + r')\b')
+    for case, words in _REPLACEMENTS.items()
+}
+
+def normalize_text(value, case: str = 'lower', drop_unit: bool = False) -> str:
+    """
+    Normalize an address string in one pass over its whitespace tokens.
+    Whitespace is collapsed, case is folded, and whole words are looked up in
+    ABBREVIATIONS, so "west" becomes "w" but "westminster" is kept.
+    Args:
+        value: Value to normalize; missing values (None, NaN) become an empty string
+        case: 'lower' or 'upper'
+        drop_unit: Remove the word "unit" in front of unit numbers
+    Returns:
+        Normalized string
+    """
+    if value is None or value != value:
+        return ''
+    text = str(value)
+    tokens = (text.lower() if case == 'lower' else text.upper()).split()
+    replacements = _REPLACEMENTS[case]
+    unit = 'unit' if case == 'lower' else 'UNIT'
+    normalized = []
+    for pos, token in enumerate(tokens):
+        replacement = replacements.get(token)
+        if replacement is not None:
+            normalized.append(replacement)
+        elif drop_unit and token == unit and pos + 1 < len(tokens):
+            continue
+        elif token.isalnum():
+            normalized.append(token)
+        else:
+            # Words attached to punctuation, e.g. "street,", go through the regex
+            normalized.append(_PATTERNS[case].sub(lambda match: replacements[match.group(0)], token))
+    return " ".join(normalized)
+
+def normalize_column(values: pd.Series, case: str = 'lower', drop_unit: bool = False) -> pd.Series:
+    """
+    Vectorized normalize_text over a pandas string column (object or Arrow backed).
+    Each distinct value is normalized once and the results are gathered back by code,
+    so the cost follows the number of distinct values rather than rows.
+    Args:
+        values: Column to normalize; missing values become an empty string
+        case: 'lower' or 'upper'
+        drop_unit: Remove the word "unit" in front of unit numbers
+    Returns:
+        Normalized column with the same index
+    """
+    codes, uniques = pd.factorize(values)
+    # Missing values get code -1, which picks the trailing empty string
+    normalized = np.array([normalize_text(value, case, drop_unit) for value in uniques] + [''], dtype=object)
+    return pd.Series(normalized[codes], index=values.index, name=values.name)
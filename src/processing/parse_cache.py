@@ -0,0 +1,135 @@
+# src/processing/parse_cache.py
+
+import hashlib
+import json
+import sqlite3
+from collections import OrderedDict
+from typing import Dict, Any, Callable, List, Optional
+
+
+class ParseCache:
+    """
+    Cache of address parse results keyed by a hash of the normalized raw string.
+    Lookups go through an in-memory LRU first and then an optional SQLite file,
+    so repeated addresses are parsed once per run and carried over between runs.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_memory_entries: int = 1000000):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self._memory = OrderedDict()
+        self.lookups = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.parsed = 0
+
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS parse_cache (key TEXT PRIMARY KEY, components TEXT NOT NULL)"
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(address: str) -> str:
+        """
+        Hash an address after collapsing whitespace.
+        Case is kept because usaddress tagging is case sensitive.
+        """
+        normalized = " ".join(str(address).split())
+        return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+    def _remember(self, key: str, components: Dict[str, Any]):
+        self._memory[key] = components
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _load(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch keys from the on-disk cache"""
+        found = {}
+        if self._conn is None:
+            return found
+        # Stay below SQLite's bound parameter limit
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT key, components FROM parse_cache WHERE key IN ({placeholders})", batch
+            )
+            for key, components in rows:
+                found[key] = json.loads(components)
+        return found
+
+    def _store(self, items: Dict[str, Dict[str, Any]]):
+        """Write new parse results to the on-disk cache"""
+        if self._conn is None or not items:
+            return
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO parse_cache (key, components) VALUES (?, ?)",
+            [(key, json.dumps(components)) for key, components in items.items()]
+        )
+        self._conn.commit()
+
+    def parse_many(self, addresses: List[str],
+                   parse_func: Callable[[List[str]], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Parse a batch of addresses, running parse_func once per distinct address
+        that is not already cached.
+
+        Args:
+            addresses: Raw address strings
+            parse_func: Parses a list of addresses into a list of component dicts
+
+        Returns:
+            List[Dict[str, Any]]: Parsed components in the order of addresses
+        """
+        keys = [self.make_key(address) for address in addresses]
+        self.lookups += len(keys)
+
+        # Deduplicate within the batch, keeping the first raw string per key
+        distinct = {}
+        for key, address in zip(keys, addresses):
+            distinct.setdefault(key, address)
+
+        results = {}
+        for key in distinct:
+            if key in self._memory:
+                results[key] = self._memory[key]
+                self._memory.move_to_end(key)
+        self.memory_hits += len(results)
+
+        from_disk = self._load([key for key in distinct if key not in results])
+        self.disk_hits += len(from_disk)
+        results.update(from_disk)
+
+        missing = [key for key in distinct if key not in results]
+        if missing:
+            parsed = dict(zip(missing, parse_func([distinct[key] for key in missing])))
+            self.parsed += len(parsed)
+            self._store(parsed)
+            results.update(parsed)
+
+        for key in from_disk.keys() | set(missing):
+            self._remember(key, results[key])
+
+        return [results[key] for key in keys]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache hit statistics; hits include duplicates within a batch"""
+        hits = self.lookups - self.parsed
+        return {
+            'lookups': self.lookups,
+            'hits': hits,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'parsed': self.parsed,
+            'hit_rate': hits / self.lookups if self.lookups else 0.0
+        }
+
+    def close(self):
+        """Close the on-disk cache"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
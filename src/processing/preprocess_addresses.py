@@ -1,8 +1,13 @@
 import pandas as pd
 import usaddress
+from src.processing.normalizer import normalize_text, normalize_column
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+from multiprocessing import Pool, cpu_count
 from tqdm import tqdm
+from src.processing.parse_cache import ParseCache
+from src.processing.preprocess_utils import phonetic_column
+from src.processing.table_io import TRANSACTION_TYPES, TableWriter, iter_batches, with_format
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -46,75 +51,113 @@ class AddressPreprocessor:
         """
         Normalize address string, remove 'UNIT' but keep all other unit info.
         """
-        if not address:
-            return ""
-        # Convert to uppercase and remove extra spaces
-        address = " ".join(address.upper().split())
-        # Remove the word 'UNIT' but keep the number/letter after it
-        address = address.replace("UNIT ", "")
-        # Standardize common abbreviations
-        replacements = {
-            "STREET": "ST",
-            "AVENUE": "AVE",
-            "BOULEVARD": "BLVD",
-            "ROAD": "RD",
-            "DRIVE": "DR",
-            "LANE": "LN",
-            "PLACE": "PL",
-            "COURT": "CT",
-            "CIRCLE": "CIR",
-            "SUITE": "STE",
-            "APARTMENT": "APT",
-            "FLOOR": "FL",
-            "NORTH": "N",
-            "SOUTH": "S",
-            "EAST": "E",
-            "WEST": "W"
-        }
-        for old, new in replacements.items():
-            address = address.replace(old, new)
-        return address
+        return normalize_text(address, case='upper', drop_unit=True)
+
+# Columns written for each processed transaction, in output order
+OUTPUT_COLUMNS = ['transaction_id', 'original_address', 'normalized_address',
+                  'house', 'street', 'strtype', 'apttype', 'aptnbr', 'city', 'state', 'zip',
+                  'street_phonetic']
+COMPONENT_COLUMNS = OUTPUT_COLUMNS[3:-1]
+
+# Parser used inside pool workers
+_worker_preprocessor = AddressPreprocessor()
+
+def parse_batch(addresses: List[str]) -> List[Dict[str, Any]]:
+    """
+    Parse a batch of addresses in a worker process.
+    """
+    return [_worker_preprocessor.parse_address(address) for address in addresses]
+
+def join_address_lines(df: pd.DataFrame) -> pd.Series:
+    """
+    Combine address_line_1 and address_line_2 with vectorized string operations.
+    A missing or blank address_line_2 leaves address_line_1 as it is.
+    """
+    line1 = df['address_line_1'].astype(str)
+    line2 = df['address_line_2']
+    missing = line2.isna() | (line2.astype(str).str.strip() == '')
+    return line1.where(missing, line1 + ' ' + line2.astype(str))
+
+def preprocess_chunk(chunk: pd.DataFrame, pool: Pool, batch_size: int,
+                     parse_cache: ParseCache) -> pd.DataFrame:
+    """
+    Parse and normalize one chunk of raw transactions.
+    
+    Args:
+        chunk: Raw transactions with id, address_line_1 and address_line_2
+        pool: Process pool that runs usaddress parsing
+        batch_size: Number of addresses sent to a worker at a time
+        parse_cache: Cache that limits parsing to distinct, previously unseen addresses
+    
+    Returns:
+        pd.DataFrame: Processed transactions in OUTPUT_COLUMNS order
+    """
+    def parse_in_pool(address_list):
+        batches = [address_list[i:i + batch_size] for i in range(0, len(address_list), batch_size)]
+        return [result for batch in pool.imap(parse_batch, batches) for result in batch]
+    
+    addresses = join_address_lines(chunk)
+    parsed = parse_cache.parse_many(addresses.tolist(), parse_in_pool)
+    
+    components = pd.DataFrame.from_records(parsed, columns=COMPONENT_COLUMNS, index=chunk.index)
+    processed = pd.DataFrame({
+        'transaction_id': chunk['id'],
+        'original_address': addresses,
+        'normalized_address': normalize_column(addresses, case='upper', drop_unit=True),  # Only 'UNIT' removed, others kept
+    })
+    processed = pd.concat([processed, components.fillna('')], axis=1)
+    processed['street_phonetic'] = phonetic_column(processed['street'])
+    return processed[OUTPUT_COLUMNS]
 
-def main():
+def main(input_path: str = "data/raw/transactions_2_11211.csv",
+         output_path: str = "data/processed/processed_transactions.csv",
+         chunk_size: int = 100000, batch_size: int = 2000, workers: Optional[int] = None,
+         cache_path: Optional[str] = None):
+    """
+    Preprocess raw transactions chunk by chunk.
+    Each chunk is parsed across a process pool and appended to the output file,
+    so memory use depends on chunk_size rather than on the input size.
+    Repeated addresses are parsed once; cache_path keeps parse results between runs.
+    Input and output may be CSV or Parquet, selected by the file suffix.
+    """
     print("\n=== Starting Address Preprocessing ===")
-    preprocessor = AddressPreprocessor()
-    # Load transactions
-    print("\nLoading transactions...")
-    transactions = pd.read_csv("data/raw/transactions_2_11211.csv")
-    print(f"Loaded {len(transactions)} transactions")
-    # Process addresses
-    print("\nProcessing addresses...")
-    processed_data = []
-    for idx, row in tqdm(transactions.iterrows(), total=len(transactions), desc="Processing addresses"):
-        # Combine address lines
-        address = str(row['address_line_1'])
-        if pd.notna(row['address_line_2']):
-            address = f"{address} {row['address_line_2']}"
-        # Parse and normalize
-        parsed = preprocessor.parse_address(address)
-        normalized = preprocessor.normalize_address(address)
-        # Store results
-        processed_data.append({
-            'transaction_id': row['id'],
-            'original_address': address,
-            'normalized_address': normalized,  # Only 'UNIT' removed, others kept
-            'house': parsed.get('house', ''),
-            'street': parsed.get('street', ''),
-            'strtype': parsed.get('strtype', ''),
-            'apttype': parsed.get('apttype', ''),
-            'aptnbr': parsed.get('aptnbr', ''),
-            'city': parsed.get('city', ''),
-            'state': parsed.get('state', ''),
-            'zip': parsed.get('zip', '')
-        })
-    # Convert to DataFrame and save
-    processed_df = pd.DataFrame(processed_data)
-    output_path = "data/processed/processed_transactions.csv"
-    processed_df.to_csv(output_path, index=False)
+    parse_cache = ParseCache(cache_path)
+    workers = workers or cpu_count()
+    print(f"\nStreaming transactions from {input_path} with {workers} workers...")
+    
+    reader = iter_batches(input_path, chunk_size, columns=['id', 'address_line_1', 'address_line_2'])
+    total = 0
+    sample = None
+    with Pool(workers) as pool, TableWriter(output_path, TRANSACTION_TYPES) as writer, \
+            tqdm(desc="Processing addresses", unit='records') as pbar:
+        for chunk in reader:
+            processed_df = preprocess_chunk(chunk, pool, batch_size, parse_cache)
+            # Write incrementally so memory does not grow with the input
+            writer.write(processed_df)
+            if sample is None:
+                sample = processed_df.head()
+            total += len(processed_df)
+            pbar.update(len(processed_df))
+            pbar.set_postfix({'Cache hit rate': f"{parse_cache.get_stats()['hit_rate']:.1%}"})
+    
+    cache_stats = parse_cache.get_stats()
+    parse_cache.close()
+    print(f"Processed {total} transactions")
+    print(f"Parse cache: {cache_stats['hits']:,}/{cache_stats['lookups']:,} hits "
+          f"({cache_stats['hit_rate']:.1%}), {cache_stats['disk_hits']:,} from disk, "
+          f"{cache_stats['parsed']:,} addresses parsed")
     # Print sample of processed data
-    print("\n=== Sample of Processed Data ===")
-    print(processed_df.head().to_string())
+    if sample is not None:
+        print("\n=== Sample of Processed Data ===")
+        print(sample.to_string())
     print(f"\nProcessed data saved to: {output_path}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+    arg_parser = argparse.ArgumentParser(description="Preprocess raw transaction addresses")
+    arg_parser.add_argument("--parse-cache", help="SQLite file that keeps parse results between runs")
+    arg_parser.add_argument("--format", choices=['csv', 'parquet'], default='csv',
+                            help="Format of the processed transactions file")
+    args = arg_parser.parse_args()
+    main(output_path=with_format("data/processed/processed_transactions.csv", args.format),
+         cache_path=args.parse_cache)
@@ -1,54 +1,34 @@
 # src/processing/preprocess_utils.py
 
+import re
 from collections import defaultdict
 import metaphone
-from typing import Dict, List, Any
-import concurrent.futures
+from typing import Dict, List, Any, NamedTuple, Optional, Tuple
+import numpy as np
+import pandas as pd
 from functools import lru_cache
+from src.processing.normalizer import normalize_text
 
 @lru_cache(maxsize=10000)
 def clean(value: str) -> str:
     """
     Clean and normalize a string value with caching
     """
-    if value is None:
-        return ''
-    value = str(value).strip().lower()
-    # 处理常见的地址缩写
-    replacements = {
-        'street': 'st',
-        'avenue': 'ave',
-        'boulevard': 'blvd',
-        'road': 'rd',
-        'drive': 'dr',
-        'lane': 'ln',
-        'place': 'pl',
-        'court': 'ct',
-        'circle': 'cir',
-        'terrace': 'ter',
-        'parkway': 'pkwy',
-        'highway': 'hwy',
-        'north': 'n',
-        'south': 's',
-        'east': 'e',
-        'west': 'w',
-        'northeast': 'ne',
-        'northwest': 'nw',
-        'southeast': 'se',
-        'southwest': 'sw'
-    }
-    for full, abbr in replacements.items():
-        value = value.replace(full, abbr)
-    return value
+    return normalize_text(value, case='lower')
+
+def present(value) -> bool:
+    """True unless value is None, NaN or an empty string"""
+    return value is not None and value == value and value != ''
 
 def make_normalized_key(house, street, strtype, city=None, state=None, apttype=None, aptnbr=None):
     """
     Create a normalized key from address components with improved handling.
+    Missing components (None, NaN, empty strings) are left out.
     """
     parts = []
     
     # 处理门牌号
-    if house:
+    if present(house):
         house = str(house).strip()
         # 处理范围格式 (例如: "123-125")
         if '-' in house:
@@ -56,105 +36,371 @@ def make_normalized_key(house, street, strtype, city=None, state=None, apttype=N
         parts.append(clean(house))
     
     # 处理街道名
-    if street:
+    if present(street):
         parts.append(clean(street))
     
     # 处理街道类型
-    if strtype:
+    if present(strtype):
         parts.append(clean(strtype))
     
     # 处理公寓信息
-    if apttype and aptnbr:
+    if present(apttype) and present(aptnbr):
         parts.append(clean(apttype))
         parts.append(clean(aptnbr))
     
     # 处理城市和州
-    if city:
+    if present(city):
         parts.append(clean(city))
-    if state:
+    if present(state):
         parts.append(clean(state))
     
     return " ".join(parts)
 
-def build_normalized_index_extended(canonical_list: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+# Fields compared by the component-wise exact matcher
+COMPONENT_FIELDS = ('house', 'street', 'strtype', 'apttype', 'aptnbr', 'city', 'state')
+# Same comparison without the apartment fields, used for building-level matches
+BUILDING_FIELDS = ('house', 'street', 'strtype', 'city', 'state')
+
+def make_component_key(record: Dict[str, Any], fields: Tuple[str, ...] = COMPONENT_FIELDS) -> Tuple[str, ...]:
+    """
+    Create a composite key of cleaned address components for hash lookups.
+    """
+    return tuple(clean(record.get(field)) for field in fields)
+
+class CanonicalTable:
+    """
+    Columnar canonical address table addressed by integer row id.
+    Key strings used for scoring are computed once per row here, so blocking
+    indexes can hand matchers ready-to-score strings instead of records.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        self.columns = columns
+        self.size = len(next(iter(columns.values()))) if columns else 0
+        # Rows removed by incremental updates stay in place as tombstones
+        self.live = np.ones(self.size, dtype=bool)
+        self.text_keys, self.normalized_keys = self._make_keys(
+            self.column('house'), self.column('street'), self.column('strtype')
+        )
+
+    @staticmethod
+    def _make_keys(house, street, strtype) -> Tuple[np.ndarray, np.ndarray]:
+        # "house street strtype" as scored by fuzzy matching
+        text_keys = np.array(
+            [f"{clean(h)} {clean(s)} {clean(t)}" for h, s, t in zip(house, street, strtype)],
+            dtype=object
+        )
+        # make_normalized_key form as scored by phonetic and API matching
+        normalized_keys = np.array(
+            [make_normalized_key(h, s, t) for h, s, t in zip(house, street, strtype)],
+            dtype=object
+        )
+        return text_keys, normalized_keys
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]]) -> 'CanonicalTable':
+        """Build a table from a list of canonical address dictionaries"""
+        names = list(dict.fromkeys(name for record in records for name in record))
+        return cls({name: np.array([record.get(name) for record in records], dtype=object)
+                    for name in names})
+
+    @classmethod
+    def from_frame(cls, df) -> 'CanonicalTable':
+        """Build a table from a canonical address DataFrame"""
+        # Copy: object columns would otherwise be read-only views, which update() writes to
+        return cls({name: df[name].to_numpy(dtype=object, copy=True) for name in df.columns})
+
+    def __len__(self) -> int:
+        return self.size
+
+    def column(self, name: str) -> np.ndarray:
+        """Return a column, or an all-None column if the table does not have it"""
+        if name in self.columns:
+            return self.columns[name]
+        return np.full(self.size, None, dtype=object)
+
+    def record(self, row_id: int) -> Dict[str, Any]:
+        """Return one row as a canonical address dictionary"""
+        return {name: values[row_id] for name, values in self.columns.items()}
+
+    def rows(self):
+        """Iterate over (row id, canonical address dictionary) pairs"""
+        for row_id in range(self.size):
+            yield row_id, self.record(row_id)
+
+    def append(self, records: List[Dict[str, Any]]) -> np.ndarray:
+        """Append canonical address dictionaries as new rows and return their row ids"""
+        names = list(dict.fromkeys([*self.columns, *(name for record in records for name in record)]))
+        for name in names:
+            added = np.array([record.get(name) for record in records], dtype=object)
+            self.columns[name] = np.concatenate([self.column(name), added])
+
+        text_keys, normalized_keys = self._make_keys(
+            *([record.get(name) for record in records] for name in ('house', 'street', 'strtype'))
+        )
+        self.text_keys = np.concatenate([self.text_keys, text_keys])
+        self.normalized_keys = np.concatenate([self.normalized_keys, normalized_keys])
+        self.live = np.concatenate([self.live, np.ones(len(records), dtype=bool)])
+
+        row_ids = np.arange(self.size, self.size + len(records), dtype=np.int64)
+        self.size += len(records)
+        return row_ids
+
+    def update(self, row_id: int, record: Dict[str, Any]):
+        """Replace a row in place with a canonical address dictionary"""
+        for name in record:
+            if name not in self.columns:
+                self.columns[name] = self.column(name)
+        for name, values in self.columns.items():
+            values[row_id] = record.get(name)
+
+        text_keys, normalized_keys = self._make_keys(
+            [record.get('house')], [record.get('street')], [record.get('strtype')]
+        )
+        self.text_keys[row_id] = text_keys[0]
+        self.normalized_keys[row_id] = normalized_keys[0]
+        self._set_live(row_id, True)
+
+    def delete(self, row_id: int):
+        """Mark a row as removed; its row id is never reused"""
+        self._set_live(row_id, False)
+
+    def _set_live(self, row_id: int, value: bool):
+        # A table loaded from an index artifact maps its mask read-only
+        if not self.live.flags.writeable:
+            self.live = self.live.copy()
+        self.live[row_id] = value
+
+class CandidateBlock(NamedTuple):
+    """Candidates of one index bucket: key strings to score and parallel table row ids"""
+    keys: List[str]
+    ids: np.ndarray
+
+def _make_blocks(row_ids: Dict[str, List[int]], keys: np.ndarray) -> Dict[str, CandidateBlock]:
+    """Turn per-bucket row id lists into candidate blocks with parallel key strings"""
+    return {
+        bucket: CandidateBlock(keys=[keys[i] for i in ids], ids=np.asarray(ids, dtype=np.int64))
+        for bucket, ids in row_ids.items()
+    }
+
+def normalized_index_keys(text_key: str, city, state) -> List[str]:
+    """Keys of one canonical row in the normalized index, with and without city and state"""
+    keys = (text_key, f"{text_key} {clean(city)} {clean(state)}")
+    return [key for key in keys if key.strip()]
+
+def prefix_buckets(street, strtype) -> List[str]:
+    """Blocking keys of one canonical row in the prefix index"""
+    street = clean(street)
+    strtype = clean(strtype)
+    buckets = []
+
+    if street:
+        # 1. Street prefix blocking (first 3 chars)
+        prefix = street[:3]
+        buckets.append(prefix)
+
+        # 2. Street prefix + type blocking
+        if strtype:
+            buckets.append(f"{prefix}_{strtype}")
+
+        # 3. Street prefix (first 4 chars) for longer streets
+        if len(street) > 3:
+            buckets.append(street[:4])
+
+    return buckets
+
+def phonetic_codes(street) -> List[str]:
+    """
+    Distinct primary and secondary double-metaphone codes of each token of a street name
+    """
+    codes = []
+    for token in clean(street).split():
+        for code in metaphone.dm(token):
+            if code and code not in codes:
+                codes.append(code)
+    return codes
+
+def phonetic_column(streets: pd.Series) -> pd.Series:
+    """
+    Space-separated phonetic_codes per street, computed once per distinct street.
+    Preprocessing stores this as the street_phonetic column.
+    """
+    codes, uniques = pd.factorize(streets)
+    # Missing values get code -1, which picks the trailing empty string
+    joined = np.array([" ".join(phonetic_codes(street)) for street in uniques] + [''], dtype=object)
+    return pd.Series(joined[codes], index=streets.index, name='street_phonetic')
+
+_HOUSE_NUMBER = re.compile(r'\d+')
+
+def house_number(house) -> int:
+    """
+    Leading number of a house, so "123-125" and "123A" give 123; 0 without digits
+    """
+    if house is None or house != house:
+        return 0
+    match = _HOUSE_NUMBER.search(str(house))
+    # Bound the length so the number fits in an int64 house array
+    return int(match.group()[:18]) if match else 0
+
+_HOUSE_RANGE = re.compile(r'(\d+)(?:\s*-\s*(\d+))?')
+
+def house_range(house) -> Optional[Tuple[int, int]]:
+    """
+    Numeric (low, high) span of a house, so "123-125" covers both numbers and
+    "123A" is (123, 123); None without digits. A second number below the first,
+    as in Queens-style "101-01", is not a range.
     """
-    Build an extended normalized index with parallel processing
+    if house is None or house != house:
+        return None
+    match = _HOUSE_RANGE.search(str(house))
+    if not match:
+        return None
+    low = int(match.group(1)[:18])
+    high = int(match.group(2)[:18]) if match.group(2) else low
+    return low, max(low, high)
+
+def street_key(street, strtype) -> Tuple[str, str]:
+    """Cleaned (street, strtype) key of the house range index"""
+    return clean(street), clean(strtype)
+
+def build_normalized_index_extended(canonical_table: CanonicalTable,
+                                    shared_rows: Optional[Dict[str, List[int]]] = None) -> Dict[str, int]:
+    """
+    Build an extended normalized index over the precomputed table keys
+    Args:
+        canonical_table: Columnar canonical address table
+        shared_rows: Optional dictionary that receives all row ids of keys held by more than one row
+    Returns:
+        Dictionary mapping normalized keys to table row ids; later rows win
     """
     index = {}
+    cities = canonical_table.column('city')
+    states = canonical_table.column('state')
     
-    def process_record(record):
-        try:
-            # Pre-calculate cleaned values
-            house = clean(record.get("house", ""))
-            street = clean(record.get("street", ""))
-            strtype = clean(record.get("strtype", ""))
-            city = clean(record.get("city", ""))
-            state = clean(record.get("state", ""))
-            
-            # Build keys
-            keys = [
-                f"{house} {street} {strtype}",
-                f"{house} {street} {strtype} {city} {state}"
-            ]
-            return [(key, record) for key in keys if key.strip()]
-        except Exception as e:
-            print(f"Warning: Skipping record due to error: {e}")
-            return []
-
-    # Use parallel processing for index building
-    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
-        results = list(executor.map(process_record, canonical_list))
-        
-    # Build index from results
-    for key_records in results:
-        for key, record in key_records:
-            index[key] = record
+    for row_id, (key, city, state) in enumerate(zip(canonical_table.text_keys, cities, states)):
+        # Keys with and without city and state
+        for normalized_key in normalized_index_keys(key, city, state):
+            if shared_rows is not None and normalized_key in index:
+                shared_rows.setdefault(normalized_key, [index[normalized_key]]).append(row_id)
+            index[normalized_key] = row_id
             
     return index
 
-def build_prefix_index(canonical_addresses: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+def build_component_index(canonical_table: CanonicalTable,
+                          fields: Tuple[str, ...] = COMPONENT_FIELDS,
+                          shared_rows: Optional[Dict[Tuple[str, ...], List[int]]] = None
+                          ) -> Dict[Tuple[str, ...], int]:
+    """
+    Build a composite-key index over cleaned address components.
+    The first canonical row for a key wins, matching the order of a linear scan.
+    Args:
+        canonical_table: Columnar canonical address table
+        fields: Component fields that make up the key
+        shared_rows: Optional dictionary that receives all row ids of keys held by more than one row
+    Returns:
+        Dictionary mapping component key tuples to table row ids
+    """
+    index = {}
+    columns = [map(clean, canonical_table.column(field)) for field in fields]
+    for row_id, key in enumerate(zip(*columns)):
+        first = index.setdefault(key, row_id)
+        if shared_rows is not None and first != row_id:
+            shared_rows.setdefault(key, [first]).append(row_id)
+    return index
+
+def build_building_index(canonical_table: CanonicalTable) -> Dict[Tuple[str, ...], int]:
+    """
+    Build a composite-key index that ignores apartment information
+    """
+    return build_component_index(canonical_table, BUILDING_FIELDS)
+
+def build_prefix_index(canonical_table: CanonicalTable) -> Dict[str, CandidateBlock]:
     """
     Build an optimized blocking index using street prefix and street type
     Args:
-        canonical_addresses: List of canonical address dictionaries
+        canonical_table: Columnar canonical address table
     Returns:
-        Dictionary with blocking keys mapping to lists of addresses
+        Dictionary with blocking keys mapping to candidate blocks of fuzzy key strings
     """
     index = defaultdict(list)
     
-    for addr in canonical_addresses:
-        street = clean(addr.get('street', ''))
-        strtype = clean(addr.get('strtype', ''))
-        
-        if street:
-            # 1. Street prefix blocking (first 3 chars)
-            prefix = street[:3]
-            index[prefix].append(addr)
-            
-            # 2. Street prefix + type blocking
-            if strtype:
-                combined_key = f"{prefix}_{strtype}"
-                index[combined_key].append(addr)
-            
-            # 3. Street prefix (first 4 chars) for longer streets
-            if len(street) > 3:
-                prefix4 = street[:4]
-                index[prefix4].append(addr)
+    for row_id, (street, strtype) in enumerate(zip(canonical_table.column('street'),
+                                                    canonical_table.column('strtype'))):
+        for bucket in prefix_buckets(street, strtype):
+            index[bucket].append(row_id)
     
-    return index
+    return _make_blocks(index, canonical_table.text_keys)
+
+class PhoneticBlock(NamedTuple):
+    """
+    Rows of one phonetic code sorted by house number, with parallel row ids and
+    normalized key strings, so candidates for a house are found by binary search
+    """
+    houses: np.ndarray
+    ids: np.ndarray
+    keys: List[str]
+
+class HouseRangeBlock(NamedTuple):
+    """
+    House number spans of one street sorted by low number, with parallel row ids
+    and cleaned apartment numbers. span is an upper bound of high - low, which
+    bounds the binary search for spans containing a number.
+    """
+    lows: np.ndarray
+    highs: np.ndarray
+    ids: np.ndarray
+    apts: List[str]
+    span: int
 
-def build_metaphone_index(canonical_addresses: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+def build_house_index(canonical_table: CanonicalTable) -> Dict[Tuple[str, str], HouseRangeBlock]:
     """
-    Build an optimized Metaphone index
+    Build a per-street index of canonical house number ranges
+    Args:
+        canonical_table: Columnar canonical address table
+    Returns:
+        Dictionary mapping street_key to house range blocks
+    """
+    index = defaultdict(list)
+    for row_id, (house, street, strtype) in enumerate(zip(canonical_table.column('house'),
+                                                          canonical_table.column('street'),
+                                                          canonical_table.column('strtype'))):
+        span = house_range(house)
+        key = street_key(street, strtype)
+        if span and key[0]:
+            index[key].append((span[0], row_id, span[1]))
+
+    aptnbrs = canonical_table.column('aptnbr')
+    blocks = {}
+    for key, entries in index.items():
+        # Sorted by low number, then by row id within a number
+        entries.sort()
+        lows, ids, highs = (np.array(values, dtype=np.int64) for values in zip(*entries))
+        blocks[key] = HouseRangeBlock(lows=lows, highs=highs, ids=ids,
+                                      apts=[clean(aptnbrs[row_id]) for row_id in ids.tolist()],
+                                      span=int((highs - lows).max()))
+    return blocks
+
+def build_metaphone_index(canonical_table: CanonicalTable) -> Dict[str, PhoneticBlock]:
+    """
+    Build a multi-key phonetic index
+    Args:
+        canonical_table: Columnar canonical address table
+    Returns:
+        Dictionary mapping the primary and secondary double-metaphone codes of every
+        street token to phonetic blocks sorted by house number
     """
     index = defaultdict(list)
+    houses = np.array([house_number(house) for house in canonical_table.column('house')], dtype=np.int64)
+    
+    for row_id, street in enumerate(canonical_table.column('street')):
+        for code in phonetic_codes(street):
+            index[code].append(row_id)
     
-    # Pre-calculate address strings and their Metaphone encodings
-    for addr in canonical_addresses:
-        address_str = f"{clean(addr.get('house', ''))} {clean(addr.get('street', ''))} {clean(addr.get('strtype', ''))}"
-        if address_str.strip():
-            metaphone_key = metaphone.dm(address_str)[0]
-            if metaphone_key:
-                index[metaphone_key].append(addr)
-                
-    return index
\ No newline at end of file
+    blocks = {}
+    for code, rows in index.items():
+        rows = np.asarray(rows, dtype=np.int64)
+        # Sorted by house number, then by row id within a house
+        rows = rows[np.argsort(houses[rows], kind='stable')]
+        blocks[code] = PhoneticBlock(houses=houses[rows], ids=rows,
+                                     keys=canonical_table.normalized_keys[rows].tolist())
+    return blocks
@@ -0,0 +1,174 @@
+# src/processing/table_io.py
+
+import os
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+# Files with these suffixes are read and written as Parquet; anything else as CSV
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+FILE_FORMATS = {'csv': '.csv', 'parquet': '.parquet'}
+# Empty CSV fields and the "NULL" of raw exports are missing; other strings, such as the
+# unit number "NA", are kept, as in Parquet
+CSV_NA_OPTIONS = {'keep_default_na': False, 'na_values': ['', 'NULL']}
+
+# Column types of the pipeline's intermediates. 'category' columns repeat few
+# distinct values and are dictionary encoded in Parquet; all others are strings
+# unless listed as numeric
+TRANSACTION_TYPES = {
+    'transaction_id': 'string', 'original_address': 'string', 'normalized_address': 'string',
+    'house': 'string', 'street': 'category', 'strtype': 'category', 'apttype': 'category', 'aptnbr': 'string',
+    'city': 'category', 'state': 'category', 'zip': 'category', 'street_phonetic': 'category'
+}
+RESULT_TYPES = {
+    'transaction_id': 'string', 'matched_address_id': 'string', 'confidence_score': 'float64',
+    'match_type': 'category', 'original_address': 'string', 'normalized_address': 'string',
+    'matched_address': 'string'
+}
+
+def _arrow():
+    """Import pyarrow on first use, so CSV-only runs do not need it"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet files require pyarrow; install it with pip install pyarrow") from e
+    return pyarrow
+
+def is_parquet(path: str) -> bool:
+    return path.lower().endswith(PARQUET_SUFFIXES)
+
+def with_format(path: str, file_format: str) -> str:
+    """Replace the suffix of path with the one of file_format, 'csv' or 'parquet'"""
+    return os.path.splitext(path)[0] + FILE_FORMATS[file_format]
+
+def arrow_schema(columns: List[str], types: Dict[str, str]):
+    """
+    Arrow schema for columns: dictionary encoded strings for 'category'
+    columns, float64 for 'float64' ones and plain strings otherwise
+    """
+    pa = _arrow()
+    fields = {
+        'category': pa.dictionary(pa.int32(), pa.string()),
+        'float64': pa.float64(),
+        'string': pa.string()
+    }
+    return pa.schema([(column, fields[types.get(column, 'string')]) for column in columns])
+
+def _strings(values: pd.Series):
+    """String array of values; missing values and empty strings become nulls, as they do in CSV"""
+    values = values.astype('string')
+    return _arrow().array(values.mask(values == ''), type=_arrow().string(), from_pandas=True)
+
+def _to_arrow(frame: pd.DataFrame, types: Dict[str, str]):
+    """Convert a frame with the explicit schema instead of inferring types from the values"""
+    pa = _arrow()
+    schema = arrow_schema(list(frame.columns), types)
+    arrays = []
+    for field in schema:
+        if pa.types.is_dictionary(field.type):
+            arrays.append(_strings(frame[field.name]).dictionary_encode().cast(field.type))
+        elif pa.types.is_floating(field.type):
+            arrays.append(pa.array(pd.to_numeric(frame[field.name]), type=field.type, from_pandas=True))
+        else:
+            arrays.append(_strings(frame[field.name]))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def _to_pandas(table) -> pd.DataFrame:
+    """Arrow table to a frame with the dtypes pd.read_csv(dtype=str) would give"""
+    pa = _arrow()
+    decoded = pa.schema([
+        (field.name, field.type.value_type if pa.types.is_dictionary(field.type) else field.type)
+        for field in table.schema
+    ])
+    frame = table.cast(decoded).to_pandas()
+    # Match read_csv: missing strings are NaN, not None
+    return frame.where(frame.notna(), float('nan'))
+
+def count_records(path: str) -> int:
+    """
+    Count data rows without loading the file: from the Parquet footer, or by
+    counting CSV lines
+    """
+    if is_parquet(path):
+        return _arrow().parquet.ParquetFile(path).metadata.num_rows
+    with open(path, 'rb') as f:
+        lines = sum(block.count(b'\n') for block in iter(lambda: f.read(1 << 20), b''))
+    return max(0, lines - 1)  # Exclude header
+
+def read_table(path: str, columns: Optional[List[str]] = None, dtype=None) -> pd.DataFrame:
+    """
+    Read a CSV or Parquet file. Only the listed columns are read; with
+    Parquet, the others are not even decoded.
+    Args:
+        path: File to read; the suffix selects the format
+        columns: Columns to read, all if None
+        dtype: CSV dtype, e.g. str; Parquet files use their stored schema
+    Returns:
+        DataFrame
+    """
+    if is_parquet(path):
+        return _to_pandas(_arrow().parquet.read_table(path, columns=columns))
+    usecols = (lambda column: column in columns) if columns else None
+    return pd.read_csv(path, usecols=usecols, dtype=dtype, **CSV_NA_OPTIONS)
+
+def iter_batches(path: str, batch_size: int, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Read a CSV or Parquet file in frames of at most batch_size rows, with
+    string columns. Frames are indexed by row number, as pd.read_csv chunks are.
+    """
+    if not is_parquet(path):
+        usecols = (lambda column: column in columns) if columns else None
+        yield from pd.read_csv(path, usecols=usecols, dtype=str, chunksize=batch_size, **CSV_NA_OPTIONS)
+        return
+    start = 0
+    for batch in _arrow().parquet.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns):
+        frame = _to_pandas(_arrow().Table.from_batches([batch]))
+        frame.index = pd.RangeIndex(start, start + len(frame))
+        start += len(frame)
+        yield frame
+
+def write_table(frame: pd.DataFrame, path: str, types: Optional[Dict[str, str]] = None):
+    """Write a frame as CSV, or as Parquet with the column types in types"""
+    with TableWriter(path, types) as writer:
+        writer.write(frame)
+
+class TableWriter:
+    """
+    Appends frames to one CSV or Parquet file. Each Parquet write becomes a
+    row group, so a file can be written chunk by chunk without holding it all.
+    All frames must have the same columns.
+    """
+
+    def __init__(self, path: str, types: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            path: Output file; the suffix selects the format
+            types: Column types as in TRANSACTION_TYPES; unlisted columns are strings
+        """
+        self.path = path
+        self.types = types or {}
+        self.rows = 0
+        self._writer = None
+
+    def write(self, frame: pd.DataFrame):
+        if not is_parquet(self.path):
+            # The header goes with the first frame only
+            frame.to_csv(self.path, mode='w' if self.rows == 0 else 'a', header=self.rows == 0, index=False)
+        else:
+            table = _to_arrow(frame, self.types)
+            if self._writer is None:
+                self._writer = _arrow().parquet.ParquetWriter(self.path, table.schema, compression='zstd')
+            self._writer.write_table(table)
+        self.rows += len(frame)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self) -> 'TableWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
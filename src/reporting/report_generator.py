@@ -1,6 +1,7 @@
 import pandas as pd
 from typing import List, Dict, Any
 from src.utils.performance_monitor import PerformanceMonitor
+from src.processing.table_io import RESULT_TYPES, with_format, write_table
 from datetime import datetime
 
 def generate_matching_summary(df: pd.DataFrame) -> str:
@@ -30,7 +31,7 @@ def generate_confidence_distribution(df: pd.DataFrame) -> str:
     
     return "\n".join(summary)
 
-def generate_unmatched_analysis(monitor: PerformanceMonitor, results_df: pd.DataFrame) -> str:
+def generate_unmatched_analysis(monitor: PerformanceMonitor, results_df: pd.DataFrame, file_format: str = 'csv') -> str:
     """
     Generate detailed analysis of unmatched records with English annotations.
     
@@ -94,8 +95,8 @@ def generate_unmatched_analysis(monitor: PerformanceMonitor, results_df: pd.Data
     
     # Save unmatched records to separate file
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    unmatched_path = f"data/processed/unmatched_records_{timestamp}.csv"
-    unmatched_df.to_csv(unmatched_path, index=False)
+    unmatched_path = with_format(f"data/processed/unmatched_records_{timestamp}.csv", file_format)
+    write_table(unmatched_df, unmatched_path, RESULT_TYPES)
     summary.append(f"\nDetailed unmatched records saved to: {unmatched_path}")
     
     return "\n".join(summary)
@@ -111,14 +112,43 @@ def generate_performance_metrics(monitor: PerformanceMonitor) -> str:
     summary.append(f"Peak memory usage: {stats['peak_memory_mb']/1024:.2f} GB")
     summary.append(f"Total API calls: {stats['total_api_calls']:,}")
     summary.append(f"Total API cost: ${stats['total_api_cost']:.2f}")
+    if stats['api_cache_hits']:
+        summary.append(f"API cache hits: {stats['api_cache_hits']:,} "
+                       f"(hit rate {stats['api_cache_hit_rate']:.1%})")
+    if stats['dedup_distinct_rows']:
+        summary.append(f"Distinct match keys: {stats['dedup_distinct_rows']:,} of "
+                       f"{stats['dedup_input_rows']:,} transactions (dedup ratio {stats['dedup_ratio']:.2f}x)")
+    if stats['stage_stats']:
+        summary.append("Matching stages (distinct match keys):")
+        for stage, stage_stats in stats['stage_stats'].items():
+            latency = stage_stats['latency']
+            summary.append(f"  {stage}: {stage_stats['rows']:,} in, {stage_stats['matched']:,} matched, "
+                           f"{stage_stats['seconds']:.3f} seconds in {stage_stats['calls']:,} calls "
+                           f"(p50 {latency['p50'] * 1000:.1f} ms, p95 {latency['p95'] * 1000:.1f} ms, "
+                           f"p99 {latency['p99'] * 1000:.1f} ms)")
+    if stats['candidate_sizes']:
+        summary.append("Candidates per query:")
+        for stage, sizes in stats['candidate_sizes'].items():
+            summary.append(f"  {stage}: mean {sizes['mean']:.1f}, p50 {sizes['p50']:.0f}, "
+                           f"p95 {sizes['p95']:.0f}, p99 {sizes['p99']:.0f}, max {sizes['max']:.0f}")
+    if stats['cache_stats']:
+        summary.append("Cache hit rates:")
+        for cache, cache_stats in stats['cache_stats'].items():
+            summary.append(f"  {cache}: {cache_stats['hit_rate']:.1%} of "
+                           f"{cache_stats['hits'] + cache_stats['misses']:,} lookups")
+    if stats['write_stats']:
+        summary.append("Result writes:")
+        for sink, write_stats in stats['write_stats'].items():
+            summary.append(f"  {sink}: {write_stats['rows']:,} rows in {write_stats['seconds']:.2f}s "
+                           f"({write_stats['rows_per_second']:,.0f} rows/s)")
     
     
     return "\n".join(summary)
 
 def save_results(df: pd.DataFrame, output_path: str) -> bool:
-    """Save results to CSV file"""
+    """Save results to a CSV or Parquet file, selected by the file suffix"""
     try:
-        df.to_csv(output_path, index=False)
+        write_table(df, output_path, RESULT_TYPES)
         return True
     except PermissionError:
         print(f"Error: Cannot save results file to {output_path}. Please ensure the file is not open in another program.")
@@ -0,0 +1,149 @@
+# src/utils/checkpoint.py
+
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Any, Iterable, Iterator, Optional, Tuple
+
+import pandas as pd
+
+from src.processing.table_io import FILE_FORMATS, RESULT_TYPES, read_table, write_table
+
+logger = logging.getLogger(__name__)
+
+# Each run keeps its manifest and per-chunk outputs in a directory of its own
+CHECKPOINT_DIR = "data/processed/runs"
+MANIFEST_NAME = "manifest.json"
+
+def _write_json(data: Dict[str, Any], path: str):
+    """Write JSON through a temporary file, so a crash never leaves a partial file behind"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+class RunCheckpoint:
+    """
+    Manifest and per-chunk outputs of one matching run.
+
+    Every finished chunk is written to its own results file, with the worker
+    statistics next to it, before the manifest records it as done. After a
+    crash or pre-emption, reopening the run with the same run id skips the
+    recorded chunks and processes only the rest. merge() then concatenates the
+    chunk outputs in input order, and finish() deletes them once the merged
+    results are saved. Chunks are numbered by their position in the input, so
+    a resumed run reads the same input with the chunk size the run started
+    with; open() raises ValueError when the run parameters differ.
+    """
+
+    def __init__(self, run_dir: str, manifest: Dict[str, Any]):
+        self.run_dir = run_dir
+        self.manifest = manifest
+
+    @classmethod
+    def open(cls, run_id: str, params: Dict[str, Any], chunk_size: int,
+             checkpoint_dir: str = CHECKPOINT_DIR) -> 'RunCheckpoint':
+        """
+        Resume the run if it has a manifest and has not finished, otherwise start it.
+        Args:
+            run_id: Identifier of the run and name of its directory
+            params: Run parameters that must not change between attempts, e.g.
+                the input path and output format ('file_format' is required)
+            chunk_size: Rows per chunk of a new run; a resumed run keeps its own
+            checkpoint_dir: Directory holding the run directories
+        Returns:
+            RunCheckpoint
+        """
+        run_dir = os.path.join(checkpoint_dir, run_id)
+        manifest_path = os.path.join(run_dir, MANIFEST_NAME)
+        manifest = None
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get('finished_at'):
+                # Its chunk outputs are gone, so a finished run is started again
+                logger.info(f"Run {run_id} finished at {manifest['finished_at']}, starting it again")
+                manifest = None
+        if manifest is not None:
+            changed = {name: (manifest['params'].get(name), value) for name, value in params.items()
+                       if manifest['params'].get(name) != value}
+            if changed:
+                raise ValueError(f"Run {run_id} was started with different parameters: {changed}")
+            checkpoint = cls(run_dir, manifest)
+            logger.info(f"Resuming run {run_id}: {len(checkpoint.done):,} chunks "
+                        f"({checkpoint.rows_done:,} rows) already done")
+            return checkpoint
+
+        os.makedirs(run_dir, exist_ok=True)
+        manifest = {'run_id': run_id, 'params': params, 'chunk_size': chunk_size,
+                    'created_at': datetime.now().isoformat(), 'chunks': {}, 'results_path': None}
+        checkpoint = cls(run_dir, manifest)
+        checkpoint._save()
+        return checkpoint
+
+    @property
+    def chunk_size(self) -> int:
+        return self.manifest['chunk_size']
+
+    @property
+    def done(self) -> Dict[str, Dict[str, Any]]:
+        """Manifest entries of the finished chunks, keyed by chunk number"""
+        return self.manifest['chunks']
+
+    @property
+    def rows_done(self) -> int:
+        return sum(entry['rows'] for entry in self.done.values())
+
+    def pending(self, chunks: Iterable[pd.DataFrame]) -> Iterator[Tuple[int, pd.DataFrame]]:
+        """Number the input chunks and yield (number, chunk) for those not done yet"""
+        for number, chunk in enumerate(chunks):
+            if str(number) not in self.done:
+                yield number, chunk
+
+    def completed_stats(self) -> Iterator[Dict[str, Any]]:
+        """Worker statistics of the chunks finished by earlier attempts, for PerformanceMonitor.merge_stats"""
+        for entry in self.done.values():
+            with open(os.path.join(self.run_dir, entry['stats'])) as f:
+                yield json.load(f)
+
+    def record(self, number: int, results: pd.DataFrame, stats: Dict[str, Any]):
+        """
+        Save the results and statistics of a finished chunk, then mark it done
+        Args:
+            number: Chunk number from pending()
+            results: Results frame of the chunk, as from build_results_frame
+            stats: Worker statistics of the chunk
+        """
+        name = f"chunk_{number:06d}"
+        results_file = name + FILE_FORMATS[self.manifest['params']['file_format']]
+        tmp_path = os.path.join(self.run_dir, f"tmp_{results_file}")
+        write_table(results, tmp_path, RESULT_TYPES)
+        os.replace(tmp_path, os.path.join(self.run_dir, results_file))
+        _write_json(stats, os.path.join(self.run_dir, f"{name}.stats.json"))
+
+        self.done[str(number)] = {'rows': len(results), 'results': results_file, 'stats': f"{name}.stats.json"}
+        self._save()
+
+    def merge(self) -> pd.DataFrame:
+        """Concatenate the chunk outputs in input order"""
+        # CSV chunks would otherwise have numeric-looking ids parsed as numbers
+        dtype = {column: float if kind == 'float64' else str for column, kind in RESULT_TYPES.items()}
+        frames = [read_table(os.path.join(self.run_dir, self.done[number]['results']), dtype=dtype)
+                  for number in sorted(self.done, key=int)]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def finish(self, results_path: Optional[str]):
+        """Record where the merged results were saved and delete the chunk outputs"""
+        self.manifest['results_path'] = results_path
+        self.manifest['finished_at'] = datetime.now().isoformat()
+        self._save()
+        # Only the manifest is kept; the merged results hold everything the chunks did
+        for entry in self.done.values():
+            for name in (entry['results'], entry['stats']):
+                path = os.path.join(self.run_dir, name)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _save(self):
+        _write_json(self.manifest, os.path.join(self.run_dir, MANIFEST_NAME))
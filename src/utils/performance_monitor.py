@@ -3,15 +3,109 @@ import psutil
 import os
 from datetime import datetime
 import json
-from typing import Dict, Any, List
+import math
+from typing import Dict, Any, List, Sequence
 from collections import defaultdict
 
+import numpy as np
+
+class Histogram:
+    """
+    Log-bucketed histogram of non-negative values, such as latencies or
+    candidate set sizes. Bucket i holds values up to 2 ** (i / resolution), so
+    percentiles carry a relative error below 2 ** (1 / resolution) - 1 (4.4% by
+    default) at constant memory. Histograms merge by adding bucket counts, which
+    makes merged worker percentiles identical to those of a single process.
+    """
+
+    def __init__(self, resolution: int = 16):
+        self.resolution = resolution
+        self.buckets = defaultdict(int)
+        self.zeros = 0
+        self.count = 0
+        self.total = 0.0
+        self.max_value = 0.0
+
+    def record(self, value: float, count: int = 1):
+        """Record a value count times"""
+        if value > 0:
+            self.buckets[math.ceil(math.log2(value) * self.resolution)] += count
+        else:
+            self.zeros += count
+        self.count += count
+        self.total += value * count
+        self.max_value = max(self.max_value, value)
+
+    def record_many(self, values: Sequence[float]):
+        """Record an array of values with one vectorized bucketing pass"""
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        positive = values[values > 0]
+        buckets, counts = np.unique(np.ceil(np.log2(positive) * self.resolution).astype(np.int64),
+                                    return_counts=True)
+        for bucket, count in zip(buckets.tolist(), counts.tolist()):
+            self.buckets[bucket] += count
+        self.zeros += len(values) - len(positive)
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.max_value = max(self.max_value, float(values.max()))
+
+    def percentile(self, percent: float) -> float:
+        """Upper bound of the bucket holding the given percentile, capped at the largest value"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(percent / 100 * self.count))
+        seen = self.zeros
+        if seen >= rank:
+            return 0.0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(2 ** (bucket / self.resolution), self.max_value)
+        return self.max_value
+
+    def merge(self, other: 'Histogram'):
+        """Add another histogram of the same resolution into this one"""
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] += count
+        self.zeros += other.zeros
+        self.count += other.count
+        self.total += other.total
+        self.max_value = max(self.max_value, other.max_value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary percentiles plus the raw buckets, so the dictionary can be merged again"""
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'max': self.max_value,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'resolution': self.resolution,
+            'zeros': self.zeros,
+            'buckets': {str(bucket): count for bucket, count in sorted(self.buckets.items())}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Histogram':
+        histogram = cls(data['resolution'])
+        histogram.buckets.update({int(bucket): count for bucket, count in data['buckets'].items()})
+        histogram.zeros = data['zeros']
+        histogram.count = data['count']
+        histogram.total = data['sum']
+        histogram.max_value = data['max']
+        return histogram
+
 class PerformanceMonitor:
     def __init__(self):
         self.start_time = time.time()
         self.peak_memory = 0
         self.api_calls = 0
         self.api_cost = 0.0
+        self.api_cache_hits = 0
         self.unmatched_reasons = defaultdict(int)
         self.batch_stats = []
         self.match_type_stats = defaultdict(int)
@@ -20,6 +114,13 @@ class PerformanceMonitor:
         self.memory_usage_history = []
         self.last_update_time = self.start_time
         self.last_processed_count = 0
+        self.dedup_input_rows = 0
+        self.dedup_distinct_rows = 0
+        self.stage_stats = {}
+        self.stage_latency = defaultdict(Histogram)
+        self.candidate_sizes = defaultdict(Histogram)
+        self.cache_stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+        self.write_stats = defaultdict(lambda: {'rows': 0, 'seconds': 0.0})
         
     def update_peak_memory(self):
         """Update peak memory usage and record memory history"""
@@ -36,9 +137,52 @@ class PerformanceMonitor:
         self.api_calls += 1
         self.api_cost += cost
         
-    def record_unmatched(self, reason: str):
+    def record_api_cache_hit(self, count: int = 1):
+        """Record validations answered from cache instead of an API call"""
+        self.api_cache_hits += count
+        
+    def record_unmatched(self, reason: str, count: int = 1):
         """Record reason for unmatched address"""
-        self.unmatched_reasons[reason] += 1
+        self.unmatched_reasons[reason] += count
+        
+    def record_dedup(self, input_rows: int, distinct_rows: int):
+        """Record how many distinct match keys a batch of transactions reduced to"""
+        self.dedup_input_rows += input_rows
+        self.dedup_distinct_rows += distinct_rows
+        
+    def record_stage(self, stage: str, rows: int, matched: int, seconds: float):
+        """Record one call of a matching stage: rows entering it, rows it matched and time spent"""
+        stats = self.stage_stats.setdefault(stage, {'calls': 0, 'rows': 0, 'matched': 0, 'seconds': 0.0})
+        stats['calls'] += 1
+        stats['rows'] += rows
+        stats['matched'] += matched
+        stats['seconds'] += seconds
+        self.stage_latency[stage].record(seconds)
+        
+    def record_candidates(self, stage: str, sizes: Sequence[int]):
+        """Record the candidate set size of every query a stage scored"""
+        self.candidate_sizes[stage].record_many(sizes)
+        
+    def record_cache(self, cache: str, hits: int, misses: int):
+        """Record lookups answered by a cache and lookups it had to compute"""
+        stats = self.cache_stats[cache]
+        stats['hits'] += hits
+        stats['misses'] += misses
+        
+    def record_write(self, sink: str, rows: int, seconds: float):
+        """Record rows written to a result sink and the time spent writing them"""
+        stats = self.write_stats[sink]
+        stats['rows'] += rows
+        stats['seconds'] += seconds
+        
+    def record_matches(self, match_types: Sequence[str], confidence_scores: Sequence[float]):
+        """Vectorized record_match over a batch of results"""
+        match_types = np.asarray(match_types, dtype=object)
+        for match_type, count in zip(*np.unique(match_types, return_counts=True)):
+            self.match_type_stats[match_type] += int(count)
+        buckets = (np.asarray(confidence_scores, dtype=np.float64) * 5).astype(np.int64)
+        for bucket, count in zip(*np.unique(buckets, return_counts=True)):
+            self.confidence_score_distribution[f"{bucket * 20}-{(bucket + 1) * 20}"] += int(count)
         
     def record_match(self, match_type: str, confidence_score: float):
         """Record match type and confidence score"""
@@ -91,6 +235,8 @@ class PerformanceMonitor:
             'total_api_calls': self.api_calls,
             'total_api_cost': self.api_cost,
             'api_calls_per_second': self.api_calls / total_runtime if total_runtime > 0 else 0,
+            'api_cache_hits': self.api_cache_hits,
+            'api_cache_hit_rate': self.api_cache_hits / (self.api_calls + self.api_cache_hits) if self.api_calls + self.api_cache_hits > 0 else 0,
             
             # Processing metrics
             'total_records_processed': total_records,
@@ -102,7 +248,22 @@ class PerformanceMonitor:
             'match_type_distribution': dict(self.match_type_stats),
             'confidence_score_distribution': dict(self.confidence_score_distribution),
             'unmatched_reasons': dict(self.unmatched_reasons),
-            'match_rate': sum(self.match_type_stats.values()) / total_records if total_records > 0 else 0,
+            'match_rate': sum(count for match_type, count in self.match_type_stats.items()
+                              if match_type != 'no_match') / total_records if total_records > 0 else 0,
+            
+            # Deduplication metrics
+            'dedup_input_rows': self.dedup_input_rows,
+            'dedup_distinct_rows': self.dedup_distinct_rows,
+            'dedup_ratio': self.dedup_input_rows / self.dedup_distinct_rows if self.dedup_distinct_rows > 0 else 0,
+            
+            # Matching stage metrics, counted over distinct match keys, with per-call latency
+            'stage_stats': {stage: {**stats, 'latency': self.stage_latency[stage].to_dict()}
+                            for stage, stats in self.stage_stats.items()},
+            'candidate_sizes': {stage: histogram.to_dict() for stage, histogram in self.candidate_sizes.items()},
+            'cache_stats': self._cache_stats(),
+            'write_stats': {sink: {**stats,
+                                   'rows_per_second': stats['rows'] / stats['seconds'] if stats['seconds'] > 0 else 0}
+                            for sink, stats in self.write_stats.items()},
             
             # Detailed statistics
             'batch_stats': self.batch_stats,
@@ -110,17 +271,64 @@ class PerformanceMonitor:
             'memory_usage_history': self.memory_usage_history
         }
     
+    def _cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        caches = {name: dict(stats) for name, stats in self.cache_stats.items()}
+        if self.api_calls or self.api_cache_hits:
+            caches['api'] = {'hits': self.api_cache_hits, 'misses': self.api_calls}
+        for stats in caches.values():
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_rate'] = stats['hits'] / lookups if lookups else 0
+        return caches
+    
+    def merge_stats(self, stats: Dict[str, Any]):
+        """
+        Add the get_stats() output of another monitor, typically a worker's, into this one.
+        Counters, distributions and histograms are summed; peak memory is the
+        largest peak of any merged process.
+        """
+        self.peak_memory = max(self.peak_memory, stats['peak_memory_mb'])
+        self.api_calls += stats['total_api_calls']
+        self.api_cost += stats['total_api_cost']
+        self.api_cache_hits += stats['api_cache_hits']
+        self.record_dedup(stats['dedup_input_rows'], stats['dedup_distinct_rows'])
+        for reason, count in stats['unmatched_reasons'].items():
+            self.unmatched_reasons[reason] += count
+        for match_type, count in stats['match_type_distribution'].items():
+            self.match_type_stats[match_type] += count
+        for score_range, count in stats['confidence_score_distribution'].items():
+            self.confidence_score_distribution[score_range] += count
+        
+        for stage, stage_stats in stats['stage_stats'].items():
+            merged = self.stage_stats.setdefault(stage, {'calls': 0, 'rows': 0, 'matched': 0, 'seconds': 0.0})
+            for field in merged:
+                merged[field] += stage_stats[field]
+            self.stage_latency[stage].merge(Histogram.from_dict(stage_stats['latency']))
+        for stage, sizes in stats['candidate_sizes'].items():
+            self.candidate_sizes[stage].merge(Histogram.from_dict(sizes))
+        for cache, cache_stats in stats['cache_stats'].items():
+            if cache != 'api':
+                self.record_cache(cache, cache_stats['hits'], cache_stats['misses'])
+        for sink, write_stats in stats['write_stats'].items():
+            self.record_write(sink, write_stats['rows'], write_stats['seconds'])
+        
+        self.batch_stats.extend(stats['batch_stats'])
+        self.processing_speeds.extend(stats['processing_speeds'])
+        self.memory_usage_history.extend(stats['memory_usage_history'])
+    
+    def export_json(self, path: str) -> str:
+        """Write get_stats() to a JSON file and return its path"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.get_stats(), f, indent=2)
+        return path
+    
     def save_report(self, output_dir: str) -> str:
         """Save detailed performance report to JSON file"""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         report_path = os.path.join(output_dir, f'performance_report_{timestamp}.json')
         
-        # Create output directory if it doesn't exist
-        os.makedirs(output_dir, exist_ok=True)
-        
         # Save detailed report
-        with open(report_path, 'w') as f:
-            json.dump(self.get_stats(), f, indent=2)
+        self.export_json(report_path)
             
         # Save summary report
         summary_path = os.path.join(output_dir, f'performance_summary_{timestamp}.json')
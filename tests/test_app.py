@@ -0,0 +1,69 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from src.api.app import app
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    canonical_path = str(tmp_path / "canonical.csv")
+    pd.DataFrame({
+        'hhid': ['W1', 'W2', 'H1'],
+        'house': ['10', '12', '5'],
+        'street': ['WITHERS', 'WITHERS', 'HOPE'],
+        'strtype': ['ST', 'ST', 'ST'],
+        'apttype': '', 'aptnbr': '',
+        'city': 'BROOKLYN', 'state': 'NY', 'zip': '11211'
+    }).to_csv(canonical_path, index=False)
+    monkeypatch.setenv('ADDRESS_CANONICAL_PATH', canonical_path)
+    monkeypatch.setenv('ADDRESS_INDEX_PATH', str(tmp_path / "index.bin"))
+    monkeypatch.delenv('ADDRESS_VALIDATOR_URL', raising=False)
+    monkeypatch.delenv('ADDRESS_FUZZY_CANDIDATES', raising=False)
+    with TestClient(app) as client:
+        yield client
+
+def address(transaction_id, house, street, strtype='ST'):
+    return {'transaction_id': transaction_id, 'house': house, 'street': street, 'strtype': strtype,
+            'city': 'BROOKLYN', 'state': 'NY', 'zip': '11211',
+            'normalized_address': f"{house} {street} {strtype}"}
+
+def test_health(client):
+    assert client.get('/health').json() == {'status': 'ok', 'canonical_addresses': 3}
+
+def test_match(client):
+    response = client.post('/match', json=address('t1', '12', 'WITHERS'))
+    assert response.status_code == 200
+    body = response.json()
+    assert body['transaction_id'] == 't1'
+    assert body['matched_address_id'] == 'W2'
+    assert body['matched_address'] == '12 WITHERS ST'
+    assert body['match_type'] == 'exact'
+    assert body['total_ms'] >= 0 and 'exact' in body['stage_ms']
+
+def test_match_batch(client):
+    addresses = [address('t1', '12', 'WITHERS'), address('t2', '5', 'HOPE'), address('t3', '12', 'WITHERS')]
+    response = client.post('/match/batch', json={'addresses': addresses})
+    assert response.status_code == 200
+    body = response.json()
+    assert [result['transaction_id'] for result in body['results']] == ['t1', 't2', 't3']
+    assert [result['matched_address_id'] for result in body['results']] == ['W2', 'H1', 'W2']
+    # Repeated addresses are matched once
+    assert body['distinct_addresses'] == 2
+
+    # Each batch result equals the single-address result
+    for result, payload in zip(body['results'], addresses):
+        single = client.post('/match', json=payload).json()
+        assert {key: single[key] for key in result} == result
+
+    assert client.post('/match/batch', json={'addresses': []}).json()['results'] == []
+
+def test_malformed_input(client):
+    assert client.post('/match', json={'house': ['12'], 'street': 'WITHERS'}).status_code == 422
+    assert client.post('/match/batch', json={'addresses': {'house': '12'}}).status_code == 422
+    assert client.post('/match/batch', json=[address('t1', '12', 'WITHERS')]).status_code == 422
+    response = client.post('/match/batch', content=b'{not json', headers={'content-type': 'application/json'})
+    assert response.status_code == 422
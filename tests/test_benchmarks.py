@@ -0,0 +1,70 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd
+import pytest
+from benchmarks.regression import compare_reports, make_report
+from benchmarks.synthetic import SYNTHETIC_COLUMNS, SyntheticAddressGenerator, load_canonical, scale_canonical
+
+@pytest.fixture
+def canonical():
+    return pd.DataFrame({
+        'hhid': ['A1', 'A2', 'B1', 'C1'],
+        'house': ['1', '1', '61-63', '240'],
+        'street': ['WITHERS', 'WITHERS', 'BEDFORD', 'MASPETH'],
+        'strtype': ['ST', 'ST', 'AVE', 'AVE'],
+        'apttype': ['APT', 'APT', None, None],
+        'aptnbr': ['1A', '2B', None, None],
+        'city': ['BROOKLYN'] * 4,
+        'state': ['NY'] * 4,
+        'zip': [11211] * 4
+    })
+
+def test_generator_is_seeded(canonical):
+    first = SyntheticAddressGenerator(canonical, seed=7).generate(50)
+    assert list(first.columns) == SYNTHETIC_COLUMNS
+    assert first.equals(SyntheticAddressGenerator(canonical, seed=7).generate(50))
+    assert not first.equals(SyntheticAddressGenerator(canonical, seed=8).generate(50))
+    assert set(first['expected_hhid']) <= set(canonical['hhid'])
+
+def test_generator_variants(canonical):
+    transactions = SyntheticAddressGenerator(canonical, seed=1, typo_rate=1.0, abbreviation_rate=1.0,
+                                             unit_rate=0.0, city_rate=0.0).generate(40)
+    assert not transactions['street'].str.upper().isin(canonical['street']).all()
+    assert set(transactions['strtype'].str.upper()) == {'STREET', 'AVENUE'}
+    # Normalization abbreviates the spelled-out street types again
+    assert transactions['normalized_address'].str.contains(r' (?:ST|AVE)\b').all()
+
+def test_scale_canonical_shifts_houses(canonical):
+    scaled = scale_canonical(canonical, 3)
+    assert len(scaled) == 12
+    assert scaled['hhid'].is_unique
+    assert scaled['house'].tolist()[4:8] == ['10001', '10001', '10061-10063', '10240']
+
+def test_compare_flags_regressions():
+    baseline = make_report({
+        'speed': {'value': 100.0, 'higher_is_better': True},
+        'latency': {'value': 1.0, 'higher_is_better': False},
+        'accuracy': {'value': 0.90, 'higher_is_better': True, 'tolerance': 0.01, 'absolute': True},
+        'dropped': {'value': 1.0, 'higher_is_better': False}
+    })
+    current = make_report({
+        'speed': {'value': 70.0, 'higher_is_better': True},
+        'latency': {'value': 0.5, 'higher_is_better': False},
+        'accuracy': {'value': 0.895, 'higher_is_better': True, 'tolerance': 0.01, 'absolute': True},
+        'added': {'value': 1.0, 'higher_is_better': False}
+    })
+    status = {row['name']: row['status'] for row in compare_reports(current, baseline, tolerance=0.25)}
+    assert status == {'speed': 'regression', 'latency': 'improvement', 'accuracy': 'ok',
+                      'dropped': 'missing', 'added': 'new'}
+
+def test_load_canonical_reads_like_index_store(canonical, tmp_path):
+    path = str(tmp_path / "canonical.csv")
+    canonical.assign(aptnbr=['1A', 'NA', None, None]).to_csv(path, index=False)
+    loaded = load_canonical(path)
+    # Strings throughout, like the table the indexes are built from
+    assert loaded['zip'].tolist() == ['11211'] * 4
+    assert loaded['aptnbr'].tolist()[:2] == ['1A', 'NA'] and loaded['aptnbr'].isna().sum() == 2
+    pd.testing.assert_frame_equal(load_canonical(path, limit=2), loaded.head(2))
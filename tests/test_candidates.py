@@ -0,0 +1,77 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd
+import pytest
+from src.matching.candidates import PrefixCandidateGenerator, TrigramCandidateGenerator
+from src.processing.index_manager import IndexManager
+from src.processing.index_store import build_indexes
+from src.processing.preprocess_utils import CanonicalTable
+
+@pytest.fixture
+def canonical():
+    return pd.DataFrame({
+        'hhid': ['W1', 'W2', 'W3', 'H1', 'B1', 'G1'],
+        'house': ['10', '12', '14', '5', '240', '7'],
+        'street': ['WITHERS', 'WITHERS', 'WITHERS', 'HOPE', 'BEDFORD', 'GRAND'],
+        'strtype': ['ST', 'ST', 'ST', 'ST', 'AVE', 'ST'],
+        'apttype': None, 'aptnbr': None,
+        'city': 'BROOKLYN', 'state': 'NY', 'zip': '11211'
+    })
+
+def hhids(generator, street):
+    block = generator.candidates(generator.group_key(street))
+    return [] if block is None else generator.table.column('hhid')[block.ids].tolist()
+
+def postings(generator):
+    """Trigram postings as street names, leaving out streets without rows"""
+    live = {street for street, rows in zip(generator.streets, generator.street_rows) if len(rows)}
+    result = {}
+    for trigram, street_ids in generator.postings.items():
+        streets = sorted(generator.streets[street_id] for street_id in street_ids.tolist()
+                         if generator.streets[street_id] in live)
+        if streets:
+            result[trigram] = streets
+    return result
+
+def test_typo_in_first_letter(canonical):
+    indexes = build_indexes(CanonicalTable.from_frame(canonical))
+    # Prefix blocking only looks at the first letters
+    assert hhids(PrefixCandidateGenerator(indexes['prefix']), 'bithers') == []
+    assert hhids(indexes['trigram'], 'bithers') == ['W1', 'W2', 'W3']
+    assert hhids(indexes['trigram'], 'withers') == ['W1', 'W2', 'W3']
+    assert hhids(indexes['trigram'], 'xyz') == []
+    assert indexes['trigram'].candidates('') is None
+
+def test_candidate_cap(canonical):
+    table = CanonicalTable.from_frame(canonical)
+    generator = TrigramCandidateGenerator(table, max_candidates=2)
+    block = generator.candidates('withers')
+    assert block.ids.tolist() == [0, 1]
+    assert block.keys == ['10 withers st', '12 withers st']
+    # top_k limits the streets, most similar first
+    assert hhids(TrigramCandidateGenerator(table, top_k=1, min_similarity=0.0), 'wither') == ['W1', 'W2', 'W3']
+
+def test_add_and_remove_rows_keep_postings(canonical):
+    manager = IndexManager(build_indexes(CanonicalTable.from_frame(canonical)))
+    manager.apply_delta(pd.DataFrame({
+        'action': ['upsert', 'upsert', 'upsert', 'delete', 'delete'],
+        'hhid': ['W2', 'R1', 'H2', 'G1', 'B1'],
+        'house': ['12', '1', '9', None, None],
+        'street': ['ROEBLING', 'ROEBLING', 'HOPE', None, None],
+        'strtype': 'ST', 'apttype': None, 'aptnbr': None,
+        'city': 'BROOKLYN', 'state': 'NY', 'zip': '11211'
+    }))
+    updated = manager.indexes['trigram']
+
+    live = manager.table.live
+    fresh = TrigramCandidateGenerator(CanonicalTable.from_frame(pd.DataFrame(
+        {name: values[live] for name, values in manager.table.columns.items()}
+    )))
+    assert postings(updated) == postings(fresh)
+    for street in ('withers', 'roebling', 'hope', 'grand', 'bedford', 'robling'):
+        assert sorted(hhids(updated, street)) == sorted(hhids(fresh, street))
+    assert hhids(updated, 'roebling') == ['W2', 'R1']
+    assert hhids(updated, 'grand') == []
@@ -0,0 +1,142 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+import pytest
+from src.matching import cascade
+from src.matching.cascade import MATCH_TYPES, STAGES, TRANSACTION_FIELDS, match_transactions, run_cascade
+from src.processing.normalizer import normalize_column
+from src.processing.index_store import build_indexes
+from src.processing.preprocess_utils import CanonicalTable, phonetic_column
+from src.utils.performance_monitor import PerformanceMonitor
+
+@pytest.fixture
+def indexes():
+    return build_indexes(CanonicalTable.from_frame(pd.DataFrame({
+        'hhid': ['W1', 'W2', 'H1', 'B1', 'F1'],
+        'house': ['10', '12', '61-63', '240', '5'],
+        'street': ['WITHERS', 'WITHERS', 'HOPE', 'BEDFORD', 'FULTON'],
+        'strtype': ['ST', 'ST', 'ST', 'AVE', 'ST'],
+        'apttype': None, 'aptnbr': None,
+        'city': 'BROOKLYN', 'state': 'NY', 'zip': '11211'
+    })))
+
+def transactions(addresses, start=0):
+    """Parsed transactions from (house, street, strtype) tuples"""
+    houses, streets, strtypes = zip(*addresses)
+    return pd.DataFrame({
+        'house': houses, 'street': streets, 'strtype': strtypes, 'apttype': np.nan, 'aptnbr': np.nan,
+        'city': 'Brooklyn', 'state': 'NY', 'zip': '11211',
+        'normalized_address': [f"{house} {street} {strtype}".upper() for house, street, strtype in addresses]
+    }, index=pd.RangeIndex(start, start + len(addresses)))
+
+class CorrectingValidator:
+    """Validator that corrects "Nowhere" to 61-63 Hope St and is unsure about everything else"""
+
+    def __init__(self):
+        self.validated = []
+
+    def validate_batch(self, addresses, monitor=None):
+        self.validated.extend(address['street'] for address in addresses)
+        return [(dict(address, house='61-63', street='HOPE', strtype='ST'), 0.95)
+                if address['street'] == 'nowhere' else (address, 0.5) for address in addresses]
+
+def hhids(indexes, results):
+    return [None if row_id < 0 else indexes['table'].column('hhid')[row_id]
+            for row_id in results['canonical_id'].tolist()]
+
+def test_duplicate_keys_are_matched_once(indexes, monkeypatch):
+    cascade_rows = []
+    run_cascade = cascade.run_cascade
+
+    def counting_cascade(columns, *args):
+        cascade_rows.append(len(columns['street']))
+        return run_cascade(columns, *args)
+
+    monkeypatch.setattr(cascade, 'run_cascade', counting_cascade)
+    # Case differences disappear in cleaning, so rows 0, 2 and 5 share a key
+    chunk = transactions([('10', 'Withers', 'St'), ('62', 'Hope', 'St'), ('10', 'WITHERS', 'St'),
+                          ('7', 'Nothing', 'Rd'), ('62', 'Hope', 'St'), ('10', 'Withers', 'St')], start=100)
+    validator = CorrectingValidator()
+    monitor = PerformanceMonitor()
+    results, _ = match_transactions(chunk, indexes, validator, monitor)
+
+    assert cascade_rows == [3]
+    assert validator.validated == ['nothing']
+    assert monitor.stage_stats['exact']['rows'] == 3
+    # Every transaction gets its key's outcome back, in input order
+    assert results['transaction_index'].tolist() == list(range(100, 106))
+    assert hhids(indexes, results) == ['W1', 'H1', 'W1', None, 'H1', 'W1']
+    assert MATCH_TYPES[results['match_type']].tolist() == ['exact', 'house_range', 'exact', 'no_match',
+                                                           'house_range', 'exact']
+    assert results['score'].tolist() == [1.0, 1.0, 1.0, 0.0, 1.0, 1.0]
+
+    stats = monitor.get_stats()
+    assert (stats['dedup_input_rows'], stats['dedup_distinct_rows'], stats['dedup_ratio']) == (6, 3, 2.0)
+
+def test_each_stage_sees_the_rows_left_before_it(indexes, monkeypatch):
+    # Streets each stage is called with, in the order the stages run
+    seen = {}
+
+    def recording(stage, function, street_of):
+        def wrapper(*args, **kwargs):
+            seen[stage] = street_of(args)
+            return function(*args, **kwargs)
+        return wrapper
+
+    monkeypatch.setattr(cascade, 'house_match_ids', recording('house', cascade.house_match_ids, lambda args: args[1]))
+    monkeypatch.setattr(cascade, 'fuzzy_match_block_batch',
+                        recording('fuzzy', cascade.fuzzy_match_block_batch, lambda args: args[1]))
+    monkeypatch.setattr(cascade, 'phonetic_match_ids',
+                        recording('metaphone', cascade.phonetic_match_ids,
+                                  lambda args: [key.split()[1] for key in args[0]]))
+    monkeypatch.setattr(cascade, 'api_match_ids',
+                        recording('api', cascade.api_match_ids, lambda args: [row['street'] for row in args[0]]))
+
+    # One row for each stage, in stage order, and one that nothing matches
+    chunk = transactions([('10', 'Withers', 'St'), ('62', 'Hope', 'St'), ('12', 'Withers', 'Stt'),
+                          ('5', 'Phulton', 'St'), ('1', 'Nowhere', 'St'), ('7', 'Nothing', 'Rd')])
+    columns = {field: normalize_column(chunk[field]).tolist() for field in TRANSACTION_FIELDS}
+    monitor = PerformanceMonitor()
+    match_ids, scores, match_types, api_failed, stage_seconds = run_cascade(columns, indexes, CorrectingValidator(),
+                                                                            monitor)
+
+    assert seen == {
+        'house': ['hope', 'withers', 'phulton', 'nowhere', 'nothing'],
+        'fuzzy': ['withers', 'phulton', 'nowhere', 'nothing'],
+        'metaphone': ['phulton', 'nowhere', 'nothing'],
+        'api': ['nowhere', 'nothing']
+    }
+    assert MATCH_TYPES[match_types].tolist() == ['exact', 'house_range', 'fuzzy', 'metaphone', 'api_validated',
+                                                 'no_match']
+    assert indexes['table'].column('hhid')[match_ids[:5]].tolist() == ['W1', 'H1', 'W2', 'F1', 'H1']
+    assert match_ids[5] == -1 and scores[5] == 0.0 and not api_failed.any()
+
+    assert list(stage_seconds) == list(STAGES)
+    stage_stats = {stage: (stats['calls'], stats['rows'], stats['matched'])
+                   for stage, stats in monitor.stage_stats.items()}
+    assert stage_stats == {
+        'exact': (1, 6, 1), 'house': (1, 5, 1), 'fuzzy': (1, 4, 1), 'metaphone': (1, 3, 1), 'api': (1, 2, 1)
+    }
+
+def test_empty_phonetic_codes_are_computed(indexes):
+    chunk = transactions([('5', 'Phulton', 'St'), ('5', 'Phulton', 'St'), ('5', 'Phulton', 'St'),
+                          ('12', 'Withers', 'Stt')])
+    without_codes, _ = match_transactions(chunk, indexes, CorrectingValidator(), PerformanceMonitor())
+
+    # Codes stored by preprocessing, an empty field and a missing one
+    chunk['street_phonetic'] = phonetic_column(chunk['street'])
+    chunk.loc[1, 'street_phonetic'] = ''
+    chunk.loc[2, 'street_phonetic'] = np.nan
+    monitor = PerformanceMonitor()
+    results, _ = match_transactions(chunk, indexes, CorrectingValidator(), monitor)
+
+    assert hhids(indexes, results) == ['F1', 'F1', 'F1', 'W2']
+    assert MATCH_TYPES[results['match_type']].tolist() == ['metaphone', 'metaphone', 'metaphone', 'fuzzy']
+    for field in without_codes:
+        assert results[field].tolist() == without_codes[field].tolist()
+    # Computed codes equal the stored ones, so the rows still share one key
+    assert monitor.get_stats()['dedup_distinct_rows'] == 2
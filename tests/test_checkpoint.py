@@ -0,0 +1,68 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd
+import pytest
+from src.utils.checkpoint import RunCheckpoint
+from src.utils.performance_monitor import PerformanceMonitor
+
+PARAMS = {'source': 'transactions.csv', 'total_records': 10, 'file_format': 'csv', 'candidates': 'prefix'}
+
+def chunk_results(number):
+    # Numeric-looking ids must come back as strings, and the id "NA" not as missing
+    return pd.DataFrame({'transaction_id': [f"{number}{row:02d}" for row in range(2)],
+                         'matched_address_id': [None, 'NA'], 'confidence_score': [0.0, 0.9],
+                         'match_type': ['no_match', 'fuzzy']})
+
+def chunk_stats():
+    monitor = PerformanceMonitor()
+    monitor.record_matches(['no_match', 'fuzzy'], [0.0, 0.9])
+    monitor.record_batch_stats(2, 0.1)
+    return monitor.get_stats()
+
+def test_resume_skips_done_chunks(tmp_path):
+    chunks = [pd.DataFrame({'transaction_id': [str(number)]}) for number in range(5)]
+    first = RunCheckpoint.open('run', PARAMS, 2, str(tmp_path))
+    assert [number for number, _ in first.pending(chunks)] == [0, 1, 2, 3, 4]
+    # The first attempt finishes chunks 3 and 0, in completion order, then dies
+    for number in (3, 0):
+        first.record(number, chunk_results(number), chunk_stats())
+
+    # A resumed run keeps its chunk size and only sees the other chunks
+    resumed = RunCheckpoint.open('run', PARAMS, 500, str(tmp_path))
+    assert resumed.chunk_size == 2
+    assert resumed.rows_done == 4
+    assert [number for number, _ in resumed.pending(chunks)] == [1, 2, 4]
+    monitor = PerformanceMonitor()
+    for stats in resumed.completed_stats():
+        monitor.merge_stats(stats)
+    assert monitor.get_stats()['match_type_distribution'] == {'no_match': 2, 'fuzzy': 2}
+
+    for number, _ in resumed.pending(chunks):
+        resumed.record(number, chunk_results(number), chunk_stats())
+    merged = resumed.merge()
+    assert merged['transaction_id'].tolist() == [f"{number}{row:02d}" for number in range(5) for row in range(2)]
+    pd.testing.assert_frame_equal(merged, pd.concat([chunk_results(number) for number in range(5)],
+                                                    ignore_index=True), check_dtype=False)
+
+def test_changed_parameters_are_rejected(tmp_path):
+    RunCheckpoint.open('run', PARAMS, 2, str(tmp_path))
+    with pytest.raises(ValueError, match='total_records'):
+        RunCheckpoint.open('run', {**PARAMS, 'total_records': 11}, 2, str(tmp_path))
+
+def test_finish_deletes_chunk_outputs(tmp_path):
+    checkpoint = RunCheckpoint.open('run', PARAMS, 2, str(tmp_path))
+    for number in range(3):
+        checkpoint.record(number, chunk_results(number), chunk_stats())
+    assert len(os.listdir(tmp_path / 'run')) == 7
+    merged = checkpoint.merge()
+    checkpoint.finish('results.csv')
+    assert os.listdir(tmp_path / 'run') == ['manifest.json']
+    assert len(merged) == 6
+
+    # Running a finished run again starts it over, even with other parameters
+    again = RunCheckpoint.open('run', {**PARAMS, 'total_records': 11}, 500, str(tmp_path))
+    assert again.chunk_size == 500 and again.rows_done == 0
+    assert list(again.completed_stats()) == []
@@ -0,0 +1,58 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd
+from src.matching.fallback import phonetic_match_id, phonetic_match_ids
+from src.processing.index_store import build_indexes
+from src.processing.preprocess_utils import CanonicalTable, house_number, make_normalized_key, phonetic_codes
+from src.utils.performance_monitor import PerformanceMonitor
+
+def test_phonetic_batch_equals_per_row():
+    canonical = pd.DataFrame({
+        'hhid': ['W1', 'W2', 'W3', 'W4', 'D1', 'D2', 'H1'],
+        'house': ['10', '10', '12', '20', '10', '12', '5'],
+        'street': ['WITHERS', 'WYTHERS', 'WITHERS', 'WITHERS', 'WIDDERS', 'WIDERS', 'HOPE'],
+        'strtype': ['ST', 'ST', 'ST', 'ST', 'ST', 'ST', 'ST'],
+        'apttype': None, 'aptnbr': None,
+        'city': 'BROOKLYN', 'state': 'NY', 'zip': '11211'
+    })
+    indexes = build_indexes(CanonicalTable.from_frame(canonical))
+    transactions = [
+        # Rows sharing block slices; 11 scores the same against 10 and 12 Withers
+        ('10', 'WITHERS'), ('10', 'WITHERZ'), ('11', 'WITHERS'), ('10', 'WIDERS'), ('10', 'WITHERS'),
+        # No block for the codes, a neighbouring house, and no candidate at all
+        ('20', 'WITHER'), ('99', 'HOPE'), ('5', 'XQZ')
+    ]
+    keys = [make_normalized_key(house, street, 'ST') for house, street in transactions]
+    codes = [phonetic_codes(street) for _, street in transactions]
+    houses = [house_number(house) for house, _ in transactions]
+
+    monitor = PerformanceMonitor()
+    # Two rows per cdist call, so groups are split across calls too
+    row_ids, scores = phonetic_match_ids(keys, codes, houses, indexes['metaphone'], max_rows_per_call=2,
+                                         monitor=monitor)
+    for (house, street), row_id, score in zip(transactions, row_ids, scores):
+        single = phonetic_match_id({'house': house, 'street': street, 'strtype': 'ST'}, indexes['metaphone'])
+        if single is None:
+            assert row_id == -1 and score == 0.0
+        else:
+            # Exactly equal, not merely close: cdist scores in float64 like extractOne
+            assert (row_id, score) == single
+    assert row_ids.tolist() == [0, 0, 0, 4, 0, -1, 6, -1]
+    assert monitor.get_stats()['candidate_sizes']['metaphone']['count'] == len(transactions)
+
+    # Rows without a key are not matched
+    row_ids, scores = phonetic_match_ids([''], [['A0RS']], [10], indexes['metaphone'])
+    assert row_ids.tolist() == [-1] and scores.tolist() == [0.0]
+
+def test_empty_stored_codes_are_computed():
+    canonical = pd.DataFrame({'hhid': ['F1'], 'house': '5', 'street': 'FULTON', 'strtype': 'ST',
+                              'apttype': None, 'aptnbr': None, 'city': 'BROOKLYN', 'state': 'NY', 'zip': '11211'})
+    indexes = build_indexes(CanonicalTable.from_frame(canonical))
+    transaction = {'house': '5', 'street': 'PHULTON', 'strtype': 'ST'}
+    expected = phonetic_match_id(transaction, indexes['metaphone'])
+    assert expected is not None and expected[0] == 0
+    for stored in ('', ' ', None):
+        assert phonetic_match_id(dict(transaction, street_phonetic=stored), indexes['metaphone']) == expected
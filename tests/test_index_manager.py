@@ -0,0 +1,103 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd
+from src.processing.index_manager import IndexManager
+from src.processing.index_store import build_indexes
+from src.processing.preprocess_utils import CanonicalTable
+
+COLUMNS = ['hhid', 'house', 'street', 'strtype', 'apttype', 'aptnbr', 'city', 'state', 'zip']
+
+def canonical(rows):
+    return pd.DataFrame([row + ['BROOKLYN', 'NY', '11211'] for row in rows], columns=COLUMNS)
+
+def by_hhid(indexes):
+    """
+    Every index with row ids replaced by hhids, so a table with tombstones
+    compares equal to a fresh build over its live rows
+    """
+    table = indexes['table']
+    hhids = table.column('hhid')
+
+    def names(ids):
+        return [hhids[row_id] for row_id in ids.tolist()]
+
+    live = [row_id for row_id in range(len(table)) if table.live[row_id]]
+    return {
+        # Missing values as None, since NaN never equals NaN
+        'table': [{name: None if pd.isna(value) else value for name, value in table.record(row_id).items()}
+                  for row_id in live],
+        'normalized': {key: hhids[row_id] for key, row_id in indexes['normalized'].items()},
+        'component': {key: hhids[row_id] for key, row_id in indexes['component'].items()},
+        'shared_rows': {name: {key: [hhids[row_id] for row_id in rows] for key, rows in shared.items()}
+                        for name, shared in indexes['shared_rows'].items()},
+        # span is left out: after removals it stays an upper bound
+        'house': {key: (block.lows.tolist(), block.highs.tolist(), names(block.ids), block.apts)
+                  for key, block in indexes['house'].items()},
+        'prefix': {bucket: (block.keys, names(block.ids)) for bucket, block in indexes['prefix'].items()},
+        'metaphone': {code: (block.houses.tolist(), names(block.ids), block.keys)
+                      for code, block in indexes['metaphone'].items()},
+        'trigram': {street: names(rows) for street, rows in zip(indexes['trigram'].streets,
+                                                                 indexes['trigram'].street_rows) if len(rows)}
+    }
+
+def test_apply_delta_equals_full_build():
+    before = canonical([
+        ['W1', '10', 'WITHERS', 'ST', None, None],
+        ['W2', '12', 'WITHERS', 'ST', 'APT', '2A'],
+        ['H1', '5', 'HOPE', 'ST', None, None],
+        ['H2', '61-63', 'HOPE', 'ST', None, None],
+        ['B1', '240', 'BEDFORD', 'AVE', None, None],
+        ['G1', '7', 'GRAND', 'ST', None, None],
+        # Rows sharing the normalized key of W2, and the component key of H1
+        ['W3', '12', 'WITHERS', 'ST', 'APT', '4C'],
+        ['D1', '5', 'HOPE', 'ST', None, None]
+    ])
+    delta = pd.DataFrame([
+        # Updates: a new apartment, and a move to another street
+        ['upsert', 'W2', '12', 'WITHERS', 'ST', 'APT', '3B'],
+        ['upsert', 'H1', '14', 'WITHERS', 'ST', None, None],
+        # Inserts, one onto a new street and one repeated with the last row winning
+        ['upsert', 'R1', '101-01', 'ROEBLING', 'ST', None, None],
+        ['upsert', 'N1', '8', 'HOPE', 'ST', None, None],
+        ['upsert', 'N1', '9', 'HOPE', 'ST', None, None],
+        ['upsert', 'N2', '12', 'WITHERS', 'ST', 'APT', '5D'],
+        # Deletes, emptying the GRAND street, and one of an unknown hhid
+        ['delete', 'G1', None, None, None, None, None],
+        ['delete', 'B1', None, None, None, None, None],
+        ['delete', 'X9', None, None, None, None, None]
+    ], columns=['action'] + COLUMNS[:6]).assign(city='BROOKLYN', state='NY', zip='11211')
+
+    manager = IndexManager(build_indexes(CanonicalTable.from_frame(before)))
+    stats = manager.apply_delta(delta)
+    assert stats == {'inserted': 3, 'updated': 2, 'deleted': 2, 'missing': 1}
+
+    # Updated rows keep their place and new rows come last, as in the refreshed export
+    after = canonical([
+        ['W1', '10', 'WITHERS', 'ST', None, None],
+        ['W2', '12', 'WITHERS', 'ST', 'APT', '3B'],
+        ['H1', '14', 'WITHERS', 'ST', None, None],
+        ['H2', '61-63', 'HOPE', 'ST', None, None],
+        ['W3', '12', 'WITHERS', 'ST', 'APT', '4C'],
+        ['D1', '5', 'HOPE', 'ST', None, None],
+        ['R1', '101-01', 'ROEBLING', 'ST', None, None],
+        ['N1', '9', 'HOPE', 'ST', None, None],
+        ['N2', '12', 'WITHERS', 'ST', 'APT', '5D']
+    ])
+    assert by_hhid(manager.indexes) == by_hhid(build_indexes(CanonicalTable.from_frame(after)))
+    hhids = manager.table.column('hhid')
+    assert hhids[manager.indexes['normalized']['12 withers st']] == 'N2'
+    # H1 moved away, so D1 is the only row left on its component key
+    assert hhids[manager.indexes['component'][('5', 'hope', 'st', '', '', 'brooklyn', 'ny')]] == 'D1'
+    assert ('5', 'hope', 'st', '', '', 'brooklyn', 'ny') not in manager.indexes['shared_rows']['component']
+
+def test_update_table_built_from_frame():
+    # All-missing columns are object columns, which pandas hands out as read-only views
+    frame = canonical([['W1', '10', 'WITHERS', 'ST', None, None]])
+    manager = IndexManager(build_indexes(CanonicalTable.from_frame(frame)))
+    manager.upsert({'hhid': 'W1', 'house': '10', 'street': 'WITHERS', 'strtype': 'ST', 'apttype': 'APT',
+                    'aptnbr': '1', 'city': 'BROOKLYN', 'state': 'NY', 'zip': '11211'})
+    assert manager.table.record(0)['aptnbr'] == '1'
+    assert frame.loc[0, 'aptnbr'] is None
@@ -0,0 +1,111 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+import pytest
+from src.processing import index_store
+from src.processing.index_store import (
+    build_index_artifact,
+    build_indexes,
+    file_sha256,
+    load_index_artifact,
+    load_or_build_indexes,
+    read_artifact_header,
+    save_index_artifact,
+    update_index_artifact
+)
+from src.processing.preprocess_utils import CanonicalTable
+from tests.test_index_manager import by_hhid
+
+@pytest.fixture
+def canonical_path(tmp_path):
+    path = str(tmp_path / "canonical.csv")
+    pd.DataFrame({
+        'hhid': ['W1', 'W2', 'W3', 'H1', 'B1'],
+        'house': ['10', '12', '61-63', '5', '240'],
+        'street': ['WITHERS', 'WITHERS', 'WITHERS', 'HOPE', 'BEDFORD'],
+        'strtype': ['ST', 'ST', 'ST', 'ST', 'AVE'],
+        'apttype': ['', '', '', 'APT', ''], 'aptnbr': ['', '', '', '2A', ''],
+        'city': 'BROOKLYN', 'state': 'NY', 'zip': '11211'
+    }).to_csv(path, index=False)
+    return path
+
+def assert_same(built, loaded, path='indexes'):
+    """Compare index structures value by value; loaded arrays are read-only views on the artifact"""
+    if isinstance(built, np.ndarray):
+        assert loaded.dtype == built.dtype, path
+        # Series.equals treats missing values in the same places as equal
+        assert pd.Series(built).equals(pd.Series(loaded)), path
+    elif isinstance(built, dict):
+        assert list(loaded) == list(built), path
+        for key in built:
+            assert_same(built[key], loaded[key], f"{path}[{key!r}]")
+    elif isinstance(built, (list, tuple)):
+        assert type(loaded) is type(built) and len(loaded) == len(built), path
+        for pos, (left, right) in enumerate(zip(built, loaded)):
+            assert_same(left, right, f"{path}[{pos}]")
+    elif hasattr(built, '__dict__'):
+        assert type(loaded) is type(built), path
+        assert_same(vars(built), vars(loaded), path)
+    else:
+        assert loaded == built, path
+
+def test_artifact_round_trip(canonical_path, tmp_path):
+    artifact_path = str(tmp_path / "index.bin")
+    indexes = build_indexes(CanonicalTable.from_frame(pd.read_csv(canonical_path)))
+    header = save_index_artifact(indexes, artifact_path, canonical_path, file_sha256(canonical_path))
+
+    assert read_artifact_header(artifact_path)['source_sha256'] == header['source_sha256']
+    loaded = load_index_artifact(artifact_path)
+    assert_same(indexes, loaded)
+
+def test_stale_artifact_is_rebuilt(canonical_path, tmp_path, monkeypatch):
+    artifact_path = str(tmp_path / "index.bin")
+    load_or_build_indexes(canonical_path, artifact_path)
+    built_at = os.stat(artifact_path).st_mtime_ns
+
+    # Unchanged source and format: the artifact is loaded as is
+    load_or_build_indexes(canonical_path, artifact_path)
+    assert os.stat(artifact_path).st_mtime_ns == built_at
+
+    # A changed canonical file is picked up
+    with open(canonical_path, 'a') as f:
+        f.write("G1,7,GRAND,ST,,,BROOKLYN,NY,11211\n")
+    indexes = load_or_build_indexes(canonical_path, artifact_path)
+    assert len(indexes['table']) == 6
+    assert read_artifact_header(artifact_path)['source_sha256'] == file_sha256(canonical_path)
+
+    # So is a new format version
+    rebuilt_at = os.stat(artifact_path).st_mtime_ns
+    monkeypatch.setattr(index_store, 'INDEX_FORMAT_VERSION', index_store.INDEX_FORMAT_VERSION + 1)
+    load_or_build_indexes(canonical_path, artifact_path)
+    assert read_artifact_header(artifact_path)['format_version'] == index_store.INDEX_FORMAT_VERSION
+    assert os.stat(artifact_path).st_mtime_ns != rebuilt_at
+
+def test_update_equals_rebuild(canonical_path, tmp_path):
+    artifact_path = str(tmp_path / "index.bin")
+    build_index_artifact(canonical_path, artifact_path)
+
+    # Delete rows leave house empty, which numeric inference would read as floats
+    delta_path = str(tmp_path / "delta.csv")
+    with open(delta_path, 'w') as f:
+        f.write("action,hhid,house,street,strtype,apttype,aptnbr,city,state,zip\n"
+                "upsert,W2,20,WITHERS,ST,,,BROOKLYN,NY,11211\n"
+                "upsert,G1,7,GRAND,ST,,,BROOKLYN,NY,11211\n"
+                "delete,B1,,,,,,,,\n")
+    with open(canonical_path) as f:
+        lines = f.read().splitlines()
+    refreshed_path = str(tmp_path / "refreshed.csv")
+    with open(refreshed_path, 'w') as f:
+        f.write("\n".join([lines[0], lines[1], "W2,20,WITHERS,ST,,,BROOKLYN,NY,11211", lines[3], lines[4],
+                           "G1,7,GRAND,ST,,,BROOKLYN,NY,11211"]) + "\n")
+
+    stats = update_index_artifact(refreshed_path, artifact_path, delta_path)
+    assert stats == {'inserted': 1, 'updated': 1, 'deleted': 1, 'missing': 0}
+    updated = load_index_artifact(artifact_path)
+    rebuilt = build_index_artifact(refreshed_path, str(tmp_path / "rebuilt.bin"))
+    assert by_hhid(updated) == by_hhid(rebuilt)
+    assert updated['normalized']['20 withers st'] == 1
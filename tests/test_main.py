@@ -0,0 +1,69 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import threading
+import time
+from collections import namedtuple
+from multiprocessing.pool import ThreadPool
+
+import pytest
+import main
+from main import get_optimal_workers, imap_bounded
+
+def square(item):
+    # Later items finish first, so completion order differs from input order
+    time.sleep(0.01 * (5 - item % 5))
+    return item * item
+
+def fail_on_three(item):
+    if item == 3:
+        raise ValueError("bad chunk 3")
+    return item
+
+def test_imap_bounded_limits_tasks_in_flight():
+    lock = threading.Lock()
+    counts = {'submitted': 0, 'collected': 0, 'most_in_flight': 0}
+
+    def items():
+        for item in range(20):
+            with lock:
+                counts['submitted'] += 1
+                counts['most_in_flight'] = max(counts['most_in_flight'], counts['submitted'] - counts['collected'])
+            yield item
+
+    results = []
+    with ThreadPool(4) as pool:
+        for item, result in imap_bounded(pool, square, items(), max_pending=3):
+            with lock:
+                counts['collected'] += 1
+            results.append((item, result))
+
+    assert counts['most_in_flight'] == 3
+    # Every result comes back once, paired with its own item
+    assert sorted(results) == [(item, item * item) for item in range(20)]
+
+def test_imap_bounded_single_worker_keeps_input_order():
+    with ThreadPool(1) as pool:
+        assert list(imap_bounded(pool, square, range(8), max_pending=4)) == [(item, item * item)
+                                                                            for item in range(8)]
+
+def test_imap_bounded_raises_worker_errors():
+    with ThreadPool(2) as pool:
+        with pytest.raises(ValueError, match="bad chunk 3"):
+            list(imap_bounded(pool, fail_on_three, range(6), max_pending=2))
+
+def test_get_optimal_workers(monkeypatch):
+    memory = namedtuple('memory', 'total')
+    monkeypatch.setattr(main.psutil, 'virtual_memory', lambda: memory(64 * 1024 ** 3))
+    monkeypatch.setattr(main, 'cpu_count', lambda: 4)
+    # A local named cpu_count would shadow the function and fail before this returns
+    assert get_optimal_workers() == 4
+    monkeypatch.setattr(main, 'cpu_count', lambda: 32)
+    assert get_optimal_workers() == 8
+    # Half a gigabyte per worker
+    monkeypatch.setattr(main.psutil, 'virtual_memory', lambda: memory(1024 ** 3))
+    assert get_optimal_workers() == 2
+    monkeypatch.setattr(main.psutil, 'virtual_memory', lambda: memory(1024 ** 2))
+    assert get_optimal_workers() == 1
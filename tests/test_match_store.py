@@ -0,0 +1,87 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+from src.matching.cascade import build_results_frame, match_transactions
+from src.matching.match_store import MatchStore
+from src.processing.index_store import build_indexes
+from src.processing.preprocess_utils import CanonicalTable
+from src.utils.performance_monitor import PerformanceMonitor
+
+def transactions(streets):
+    return pd.DataFrame({
+        'transaction_id': [f"txn-{number}" for number in range(len(streets))],
+        'original_address': [f"1 {street} Street" for street in streets],
+        'normalized_address': [f"1 {street.upper()} ST" for street in streets],
+        'house': '1', 'street': streets, 'strtype': 'Street', 'apttype': np.nan, 'aptnbr': np.nan,
+        'city': 'Brooklyn', 'state': 'NY', 'zip': '11211'
+    }, index=pd.RangeIndex(10, 10 + len(streets)))
+
+def results(chunk):
+    return pd.DataFrame({
+        'transaction_id': chunk['transaction_id'].to_numpy(),
+        'matched_address_id': [None if street == 'Nowhere' else f"H-{street}" for street in chunk['street']],
+        'confidence_score': [0.0 if street == 'Nowhere' else 0.95 for street in chunk['street']],
+        'match_type': ['no_match' if street == 'Nowhere' else 'fuzzy' for street in chunk['street']],
+        'original_address': chunk['original_address'].to_numpy(),
+        'normalized_address': chunk['normalized_address'].to_numpy(),
+        'matched_address': [None if street == 'Nowhere' else f"1 {street.upper()} ST" for street in chunk['street']]
+    })
+
+def test_only_new_or_changed_rows_are_matched(tmp_path):
+    path = str(tmp_path / "matches.sqlite")
+    first = transactions(['Withers', 'Nowhere', 'Hope'])
+    store = MatchStore(path, 'v1')
+    to_match, reused = store.split(first)
+    assert len(to_match) == 3 and reused.empty
+    store.update(to_match, results(to_match))
+    store.close()
+
+    # Next night: txn-2 moved to another street and txn-3 is new
+    second = transactions(['Withers', 'Nowhere', 'Grand', 'Roebling'])
+    store = MatchStore(path, 'v1')
+    to_match, reused = store.split(second)
+    assert to_match['transaction_id'].tolist() == ['txn-2', 'txn-3']
+    assert reused.index.tolist() == [10, 11]
+    pd.testing.assert_frame_equal(reused.reset_index(drop=True), results(second.iloc[:2]), check_dtype=False)
+    assert store.get_stats() == {'lookups': 4, 'reused': 2, 'matched': 2, 'reuse_rate': 0.5}
+    store.update(to_match, results(to_match))
+
+    # A new index version invalidates every stored outcome
+    assert len(MatchStore(path, 'v2').split(second)[0]) == 4
+    assert len(MatchStore(path, 'v1').split(second)[0]) == 0
+
+def test_fingerprints_cover_match_fields():
+    chunk = transactions(['Withers', 'Hope'])
+    fingerprints = MatchStore.fingerprints(chunk)
+    assert fingerprints.dtype == np.int64
+    assert (MatchStore.fingerprints(chunk.fillna('')) == fingerprints).all()
+    assert (MatchStore.fingerprints(chunk.assign(aptnbr='2A')) != fingerprints).all()
+
+class FailingValidator:
+    """Validator whose service never answers"""
+
+    def validate_batch(self, addresses, monitor=None):
+        return [(None, None) for _ in addresses]
+
+def test_failed_validations_are_retried(tmp_path):
+    canonical = pd.DataFrame({'hhid': ['W1'], 'house': '1', 'street': 'WITHERS', 'strtype': 'ST',
+                              'apttype': None, 'aptnbr': None, 'city': 'BROOKLYN', 'state': 'NY', 'zip': '11211'})
+    indexes = build_indexes(CanonicalTable.from_frame(canonical))
+    chunk = transactions(['Withers', 'Nowhere'])
+
+    results, _ = match_transactions(chunk, indexes, FailingValidator(), PerformanceMonitor())
+    assert results['api_failed'].tolist() == [False, True]
+    frame = build_results_frame(chunk, results, indexes['table'])
+    assert frame['match_type'].tolist() == ['exact', 'no_match']
+
+    store = MatchStore(str(tmp_path / "matches.sqlite"), 'v1')
+    store.update(chunk, frame, retry=results['api_failed'])
+    to_match, reused = store.split(chunk)
+    # The no-match from the failed validation is matched again; a real no-match would be reused
+    assert to_match['transaction_id'].tolist() == ['txn-1']
+    assert reused['matched_address_id'].tolist() == ['W1']
+    store.close()
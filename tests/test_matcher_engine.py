@@ -0,0 +1,168 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd
+import pytest
+from src.matching.matcher_engine import (
+    building_match,
+    exact_match_dict,
+    fuzzy_match_block,
+    fuzzy_match_block_batch,
+    house_match_ids
+)
+from src.processing.index_store import build_indexes
+from src.processing.preprocess_utils import (
+    CanonicalTable,
+    build_building_index,
+    build_component_index,
+    build_house_index,
+    build_normalized_index_extended,
+    house_range,
+    make_component_key
+)
+
+@pytest.fixture
+def indexes():
+    canonical = pd.DataFrame({
+        'hhid': ['W1', 'W2', 'W3', 'H1', 'H2', 'B1'],
+        'house': ['10', '12', '61-63', '5', '7', '240'],
+        'street': ['WITHERS', 'WITHERS', 'WITHERS', 'HOPE', 'HOPE', 'BEDFORD'],
+        'strtype': ['ST', 'ST', 'ST', 'ST', 'ST', 'AVE'],
+        'apttype': None, 'aptnbr': None,
+        'city': 'BROOKLYN', 'state': 'NY', 'zip': '11211'
+    })
+    return build_indexes(CanonicalTable.from_frame(canonical))
+
+def test_fuzzy_batch_scores_equal_per_row_scores(indexes):
+    queries = ['10 withers st', '12 wither st', '61 withers st', '7 hope st', '240 bedfrd ave', '1 nowhere rd']
+    streets = ['withers', 'wither', 'withers', 'hope', 'bedfrd', 'nowhere']
+    row_ids, scores = fuzzy_match_block_batch(queries, streets, indexes['prefix'])
+    for query, street, row_id, score in zip(queries, streets, row_ids, scores):
+        single = fuzzy_match_block(query, street, indexes['prefix'], indexes['table'])
+        if single is None:
+            assert row_id == -1 and score == 0.0
+        else:
+            # Exactly equal, not merely close: cdist scores in float64 like extractOne
+            assert score == single[1]
+            assert indexes['table'].record(row_id)['hhid'] == single[0]['hhid']
+
+def house_matches(indexes, rows, **kwargs):
+    """Matched hhids and scores of (house, street, strtype, aptnbr) rows"""
+    row_ids, scores = house_match_ids(*zip(*rows), indexes['house'], **kwargs)
+    hhids = indexes['table'].column('hhid')
+    return [hhids[row_id] if row_id >= 0 else None for row_id in row_ids.tolist()], scores.tolist()
+
+def test_house_range():
+    assert house_range('10-20') == (10, 20)
+    assert house_range('10 - 12') == (10, 12)
+    assert house_range('123A') == (123, 123)
+    # Queens-style house numbers are not ranges
+    assert house_range('101-01') == (101, 101)
+    assert house_range('REAR') is None
+    assert house_range(None) is None
+
+def test_build_house_index(indexes):
+    block = indexes['house'][('withers', 'st')]
+    assert block.lows.tolist() == [10, 12, 61]
+    assert block.highs.tolist() == [10, 12, 63]
+    assert indexes['table'].column('hhid')[block.ids].tolist() == ['W1', 'W2', 'W3']
+    assert block.span == 2
+    assert ('bedford', 'ave') in indexes['house'] and ('bedford', 'st') not in indexes['house']
+
+def test_house_match_inside_and_nearest(indexes):
+    hhids, scores = house_matches(indexes, [
+        ('62', 'withers', 'st', ''),     # inside 61-63
+        ('60-64', 'withers', 'st', ''),  # overlapping the span
+        ('14', 'withers', 'st', ''),     # 2 from 12
+        ('11', 'withers', 'st', ''),     # as near to 10 as to 12: the lowest house wins
+        ('250', 'bedford', 'ave', ''),   # exactly max_distance away
+        ('251', 'bedford', 'ave', ''),   # beyond max_distance
+        ('40', 'withers', 'st', ''),     # beyond max_distance on both sides
+        ('5', 'hope', 'ave', ''),        # another street type
+        ('rear', 'hope', 'st', '')       # no house number
+    ])
+    assert hhids == ['W3', 'W3', 'W2', 'W1', 'B1', None, None, None, None]
+    assert scores == pytest.approx([1.0, 1.0, 0.98, 0.99, 0.9, 0.0, 0.0, 0.0, 0.0])
+
+    hhids, scores = house_matches(indexes, [('14', 'withers', 'st', '')], max_distance=1)
+    assert hhids == [None]
+    hhids, scores = house_matches(indexes, [('14', 'withers', 'st', '')], distance_penalty=0.05)
+    assert scores == pytest.approx([0.9])
+
+def test_house_match_prefers_same_apartment():
+    table = CanonicalTable.from_frame(pd.DataFrame({
+        'hhid': ['A1', 'A2', 'A3', 'Q1'],
+        'house': ['20', '20', '20', '101-01'],
+        'street': ['GRAND', 'GRAND', 'GRAND', 'ROEBLING'],
+        'strtype': 'ST', 'apttype': 'APT', 'aptnbr': ['1', '2 B', '3', None],
+        'city': 'BROOKLYN', 'state': 'NY', 'zip': '11211'
+    }))
+    indexes = {'table': table, 'house': build_house_index(table)}
+    assert indexes['house'][('grand', 'st')].apts == ['1', '2 b', '3']
+    hhids, scores = house_matches(indexes, [
+        ('20', 'grand', 'st', '3'), ('20', 'grand', 'st', '2 b'), ('20', 'grand', 'st', '9'),
+        ('20', 'grand', 'st', ''), ('21', 'grand', 'st', '3'), ('101-01', 'roebling', 'st', ''),
+        ('102', 'roebling', 'st', '')
+    ])
+    assert hhids == ['A3', 'A2', 'A1', 'A1', 'A3', 'Q1', 'Q1']
+    assert scores == pytest.approx([1.0, 1.0, 1.0, 1.0, 0.99, 1.0, 0.99])
+
+@pytest.fixture
+def apartments():
+    return CanonicalTable.from_frame(pd.DataFrame({
+        'hhid': ['A1', 'A2', 'A3', 'H1', 'H2'],
+        'house': ['10', '10', '10', '5', '5'],
+        'street': ['WITHERS', 'WITHERS', 'WITHERS', 'HOPE', 'HOPE'],
+        'strtype': 'ST',
+        'apttype': ['APT', 'APT', 'APT', None, None],
+        'aptnbr': ['1A', '2B', '1A', None, None],
+        'city': 'BROOKLYN', 'state': 'NY', 'zip': '11211'
+    }))
+
+def test_build_component_index(apartments):
+    shared = {}
+    index = build_component_index(apartments, shared_rows=shared)
+    # The first row wins when rows share a key, as in a linear scan
+    assert index[('10', 'withers', 'st', 'apt', '1a', 'brooklyn', 'ny')] == 0
+    assert index[('5', 'hope', 'st', '', '', 'brooklyn', 'ny')] == 3
+    assert len(index) == 3
+    assert shared == {('10', 'withers', 'st', 'apt', '1a', 'brooklyn', 'ny'): [0, 2],
+                      ('5', 'hope', 'st', '', '', 'brooklyn', 'ny'): [3, 4]}
+    for _, record in apartments.rows():
+        assert index[make_component_key(record)] == min(
+            other for other, other_record in apartments.rows()
+            if make_component_key(other_record) == make_component_key(record)
+        )
+
+def test_exact_match_index_equals_scan(apartments):
+    normalized_index = build_normalized_index_extended(apartments)
+    component_index = build_component_index(apartments)
+    transactions = [
+        {'house': '10', 'street': 'Withers', 'strtype': 'St', 'apttype': 'Apt', 'aptnbr': '1A',
+         'city': 'Brooklyn', 'state': 'NY'},
+        {'house': '10', 'street': 'Withers', 'strtype': 'St', 'apttype': 'Apt', 'aptnbr': '2B',
+         'city': 'Brooklyn', 'state': 'NY'},
+        {'house': '5', 'street': 'Hope', 'strtype': 'St', 'city': 'Brooklyn', 'state': 'NY'},
+        {'house': '10', 'street': 'Withers', 'strtype': 'St', 'apttype': 'Apt', 'aptnbr': '9Z',
+         'city': 'Brooklyn', 'state': 'NY'},
+        # The normalized index is tried first; its later row wins
+        {'normalized_address': '10 WITHERS ST', 'house': '10', 'street': 'Withers', 'strtype': 'St'}
+    ]
+    expected = ['A1', 'A2', 'H1', None, 'A3']
+    for transaction, hhid in zip(transactions, expected):
+        indexed = exact_match_dict(transaction, apartments, normalized_index, component_index)
+        scanned = exact_match_dict(transaction, apartments, normalized_index)
+        assert indexed == scanned
+        assert (indexed and indexed['hhid']) == hhid
+
+def test_building_match_ignores_apartment(apartments):
+    building_index = build_building_index(apartments)
+    for aptnbr in ('1A', '2B', '9Z', None):
+        transaction = {'house': '10', 'street': 'WITHERS', 'strtype': 'ST', 'apttype': 'APT', 'aptnbr': aptnbr,
+                       'city': 'BROOKLYN', 'state': 'NY'}
+        assert building_match(transaction, apartments, building_index)['hhid'] == 'A1'
+        assert building_match(transaction, apartments) == building_match(transaction, apartments, building_index)
+    assert building_match({'house': '12', 'street': 'WITHERS', 'strtype': 'ST', 'city': 'BROOKLYN',
+                           'state': 'NY'}, apartments, building_index) is None
@@ -0,0 +1,41 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+from src.processing.normalizer import normalize_column, normalize_text
+
+def test_whole_words_only():
+    assert normalize_text("123  West   Street") == "123 w st"
+    # Abbreviated words inside longer words are kept
+    assert normalize_text("10 Westminster Road") == "10 westminster rd"
+    assert normalize_text("1 Broadway") == "1 broadway"
+    assert normalize_text("5 Northeast Avenue", case='upper') == "5 NE AVE"
+
+def test_punctuated_tokens():
+    assert normalize_text("12 Withers Street, Apartment 2") == "12 withers st, apt 2"
+    assert normalize_text("North-East Boulevard.") == "n-e blvd."
+    assert normalize_text("Broadway, Brooklyn") == "broadway, brooklyn"
+
+def test_drop_unit():
+    assert normalize_text("12 Withers St Unit 4", drop_unit=True) == "12 withers st 4"
+    assert normalize_text("12 Withers St Unit 4") == "12 withers st unit 4"
+    # A trailing "unit" is not in front of a unit number and stays
+    assert normalize_text("Unit", drop_unit=True) == "unit"
+    assert normalize_text("12 WITHERS ST UNIT 4", case='upper', drop_unit=True) == "12 WITHERS ST 4"
+
+def test_missing_values():
+    assert normalize_text(None) == ''
+    assert normalize_text(np.nan) == ''
+
+def test_column_matches_text():
+    values = pd.Series(["123 West Street", None, "1 Broadway", "12 Withers Street, Unit 2", "123 West Street",
+                        np.nan, "10 westminster rd"], index=range(5, 12), name='address')
+    for case in ('lower', 'upper'):
+        for drop_unit in (False, True):
+            expected = pd.Series([normalize_text(value, case, drop_unit) for value in values],
+                                 index=values.index, name='address')
+            pd.testing.assert_series_equal(normalize_column(values, case, drop_unit), expected)
+            pd.testing.assert_series_equal(normalize_column(values.astype('string'), case, drop_unit), expected)
@@ -0,0 +1,49 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.processing.parse_cache import ParseCache
+
+class CountingParser:
+    """Parse function that records every address it is asked to parse"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, addresses):
+        self.calls.append(list(addresses))
+        return [{'street': address.split()[1]} for address in addresses]
+
+def test_memory_hits_and_duplicates():
+    parse = CountingParser()
+    cache = ParseCache()
+    first = cache.parse_many(['10 Withers St', '10  Withers St', '5 Hope St'], parse)
+    assert first == [{'street': 'Withers'}, {'street': 'Withers'}, {'street': 'Hope'}]
+    # Whitespace variants share one key and are parsed once
+    assert parse.calls == [['10 Withers St', '5 Hope St']]
+
+    second = cache.parse_many(['5 Hope St', '240 Bedford Ave', '5 HOPE ST'], parse)
+    assert second == [{'street': 'Hope'}, {'street': 'Bedford'}, {'street': 'HOPE'}]
+    # Case is part of the key
+    assert parse.calls[1] == ['240 Bedford Ave', '5 HOPE ST']
+    assert cache.get_stats() == {'lookups': 6, 'hits': 2, 'memory_hits': 1, 'disk_hits': 0,
+                                 'parsed': 4, 'hit_rate': 2 / 6}
+
+def test_disk_hits_carry_over_between_runs(tmp_path):
+    path = str(tmp_path / "parse_cache.sqlite")
+    cache = ParseCache(path)
+    cache.parse_many(['10 Withers St', '5 Hope St'], CountingParser())
+    cache.close()
+
+    parse = CountingParser()
+    cache = ParseCache(path, max_memory_entries=1)
+    assert cache.parse_many(['5 Hope St', '10 Withers St'], parse) == [{'street': 'Hope'}, {'street': 'Withers'}]
+    assert parse.calls == []
+    assert cache.get_stats()['disk_hits'] == 2
+    # Only the most recent entry stays in memory; the evicted one comes from disk again
+    cache.parse_many(['10 Withers St', '5 Hope St'], parse)
+    assert parse.calls == []
+    assert cache.get_stats()['memory_hits'] == 1
+    assert cache.get_stats()['disk_hits'] == 3
+    cache.close()
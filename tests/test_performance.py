@@ -10,13 +10,8 @@ import json
 from datetime import datetime
 from tqdm import tqdm
 from src.utils.performance_monitor import PerformanceMonitor
-from src.processing.preprocess_utils import (
-    build_prefix_index,
-    build_metaphone_index,
-    build_normalized_index_extended,
-    clean,
-    make_normalized_key
-)
+from src.processing.preprocess_utils import clean, make_normalized_key
+from src.processing.index_store import load_or_build_indexes
 from src.matching.matcher_engine import exact_match_dict, fuzzy_match_block
 from src.matching.fallback import phonetic_fallback, api_fallback
 from multiprocessing import Pool, cpu_count
@@ -59,9 +54,18 @@ def build_row(txn, match, score, match_type):
         'matched_address': f"{match['house']} {match['street']} {match['strtype']}" if match else None
     }
 
-def process_chunk(args):
+# Reference data held by each worker process, set once by init_worker
+_worker_state = {}
+
+def init_worker(indexes, validator):
+    """Pool initializer that keeps the reference data resident in each worker"""
+    _worker_state['indexes'] = indexes
+    _worker_state['validator'] = validator
+
+def process_chunk(chunk):
     """Process a chunk of transactions in parallel"""
-    chunk, canonical_addresses, indexes, validator = args
+    indexes = _worker_state['indexes']
+    validator = _worker_state['validator']
     monitor = PerformanceMonitor()
     
     results = []
@@ -85,27 +89,27 @@ def process_chunk(args):
     # Process each transaction
     for parsed in parsed_transactions:
         # Try exact matching first
-        match = exact_match_dict(parsed, canonical_addresses, indexes['normalized'])
+        match = exact_match_dict(parsed, indexes['table'], indexes['normalized'], indexes['component'])
         if match:
             results.append(build_row(parsed['original_txn'], match, 1.0, 'exact'))
             continue
 
         # Try fuzzy matching with improved blocking
-        fuzzy = fuzzy_match_block(parsed['normalized_address'], parsed['street'], indexes['prefix'])
+        fuzzy = fuzzy_match_block(parsed['normalized_address'], parsed['street'], indexes['prefix'], indexes['table'])
         if fuzzy:
             match, score = fuzzy
             results.append(build_row(parsed['original_txn'], match, score, 'fuzzy'))
             continue
 
         # Try phonetic matching
-        phonetic = phonetic_fallback(parsed, indexes['metaphone'])
+        phonetic = phonetic_fallback(parsed, indexes['metaphone'], indexes['table'])
         if phonetic:
             match, score = phonetic
             results.append(build_row(parsed['original_txn'], match, score, 'metaphone'))
             continue
 
         # Try API validation as fallback
-        api = api_fallback(parsed, indexes['prefix'], validator)
+        api = api_fallback(parsed, indexes['prefix'], indexes['table'], validator)
         if api:
             match, score = api
             monitor.record_api_call(0.01)  # Record API call cost
@@ -124,18 +128,13 @@ def test_large_scale_performance():
     # Initialize
     validator = AddressValidator()
     transactions = pd.read_csv("data/processed/processed_transactions.csv")
-    canonical_df = pd.read_csv("data/raw/11211 Addresses.csv")
-    canonical_addresses = canonical_df.to_dict('records')
     
     # Initialize main performance monitor
     main_monitor = PerformanceMonitor()
     
-    # Build indexes
-    indexes = {
-        'normalized': build_normalized_index_extended(canonical_addresses),
-        'prefix': build_prefix_index(canonical_addresses),
-        'metaphone': build_metaphone_index(canonical_addresses)
-    }
+    # Load indexes, rebuilding the artifact only if the canonical CSV changed
+    indexes = load_or_build_indexes("data/raw/11211 Addresses.csv",
+                                    "data/processed/canonical_index.bin")
     
     # Split data into chunks
     CHUNK_SIZE = 50000000  # Process 20M records per thread
@@ -152,9 +151,9 @@ def test_large_scale_performance():
     # Process chunks in parallel
     all_results = []
     try:
-        with Pool(cpu_count()) as pool:
-            args = [(chunk, canonical_addresses, indexes, validator) for chunk in chunks]
-            for chunk_results, chunk_stats in pool.imap_unordered(process_chunk, args):
+        with Pool(cpu_count(), initializer=init_worker,
+                  initargs=(indexes, validator)) as pool:
+            for chunk_results, chunk_stats in pool.imap_unordered(process_chunk, chunks):
                 all_results.extend(chunk_results)
                 
                 # Update main monitor with chunk statistics
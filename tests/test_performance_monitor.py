@@ -0,0 +1,58 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+
+import numpy as np
+import pytest
+from src.utils.performance_monitor import Histogram, PerformanceMonitor
+
+def test_histogram_percentiles_within_bucket_error():
+    values = np.random.default_rng(0).lognormal(mean=-6, sigma=1.5, size=10000)
+    histogram = Histogram()
+    histogram.record_many(values)
+    error = 2 ** (1 / histogram.resolution)
+    for percent in (50, 95, 99):
+        exact = np.percentile(values, percent, method='inverted_cdf')
+        assert exact <= histogram.percentile(percent) <= exact * error
+    assert histogram.percentile(100) == pytest.approx(values.max())
+
+def test_histogram_counts_zeros():
+    histogram = Histogram()
+    histogram.record_many([0, 0, 0, 5])
+    assert histogram.percentile(50) == 0.0
+    assert histogram.percentile(99) == 5
+
+def worker_stats(seed):
+    rng = np.random.default_rng(seed)
+    monitor = PerformanceMonitor()
+    for seconds in rng.random(20):
+        monitor.record_stage('fuzzy', 10, 4, seconds)
+    monitor.record_candidates('fuzzy', rng.integers(0, 500, size=100))
+    monitor.record_cache('clean', 30, 10)
+    monitor.record_unmatched('no_match_found', 2)
+    monitor.record_matches(['fuzzy', 'no_match', 'fuzzy'], [0.9, 0.0, 0.95])
+    monitor.record_batch_stats(3, 0.1)
+    return monitor
+
+def test_merged_worker_stats_match_a_single_monitor():
+    workers = [worker_stats(seed) for seed in range(3)]
+    parent = PerformanceMonitor()
+    for worker in workers:
+        # Worker stats cross the process boundary as plain data
+        parent.merge_stats(json.loads(json.dumps(worker.get_stats())))
+    stats = parent.get_stats()
+
+    combined = Histogram()
+    for worker in workers:
+        combined.merge(worker.stage_latency['fuzzy'])
+    assert stats['stage_stats']['fuzzy']['calls'] == 60
+    assert stats['stage_stats']['fuzzy']['rows'] == 600
+    assert stats['stage_stats']['fuzzy']['latency']['p99'] == combined.percentile(99)
+    assert stats['candidate_sizes']['fuzzy']['count'] == 300
+    assert stats['cache_stats']['clean'] == {'hits': 90, 'misses': 30, 'hit_rate': 0.75}
+    assert stats['unmatched_reasons'] == {'no_match_found': 6}
+    assert stats['match_type_distribution'] == {'fuzzy': 6, 'no_match': 3}
+    assert stats['total_records_processed'] == 9
@@ -0,0 +1,52 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+from src.processing.parse_cache import ParseCache
+from src.processing.preprocess_addresses import OUTPUT_COLUMNS, join_address_lines, preprocess_chunk
+
+class SerialPool:
+    """Stand-in for a process pool that parses in this process"""
+
+    def __init__(self):
+        self.batches = []
+
+    def imap(self, func, batches):
+        self.batches.extend(batches)
+        return map(func, batches)
+
+def raw_chunk():
+    return pd.DataFrame({
+        'id': ['t1', 't2', 't3', 't4'],
+        'address_line_1': ['108 Withers Street', '465 Humboldt Street', '12 Hope Street', '108 Withers Street'],
+        'address_line_2': ['Unit 2A', np.nan, '', 'Unit 2A']
+    }, index=pd.RangeIndex(10, 14))
+
+def test_join_address_lines():
+    assert join_address_lines(raw_chunk()).tolist() == ['108 Withers Street Unit 2A', '465 Humboldt Street',
+                                                        '12 Hope Street', '108 Withers Street Unit 2A']
+
+def test_preprocess_chunk():
+    pool = SerialPool()
+    processed = preprocess_chunk(raw_chunk(), pool, batch_size=2, parse_cache=ParseCache())
+
+    assert list(processed.columns) == OUTPUT_COLUMNS
+    assert processed.index.tolist() == [10, 11, 12, 13]
+    # The repeated address is parsed once, in batches of batch_size
+    assert pool.batches == [['108 Withers Street Unit 2A', '465 Humboldt Street'], ['12 Hope Street']]
+
+    assert processed['transaction_id'].tolist() == ['t1', 't2', 't3', 't4']
+    assert processed['original_address'].tolist() == join_address_lines(raw_chunk()).tolist()
+    # Only the word UNIT is dropped from the normalized address
+    assert processed['normalized_address'].tolist() == ['108 WITHERS ST 2A', '465 HUMBOLDT ST', '12 HOPE ST',
+                                                        '108 WITHERS ST 2A']
+    assert processed.loc[10, ['house', 'street', 'strtype', 'apttype', 'aptnbr']].tolist() == [
+        '108', 'Withers', 'Street', 'Unit', '2A']
+    # Components the parser did not find are empty strings
+    assert processed.loc[11, ['house', 'street', 'strtype', 'apttype', 'aptnbr']].tolist() == [
+        '465', 'Humboldt', 'Street', '', '']
+    assert processed.loc[12, 'city'] == ''
+    assert processed.loc[10, 'street_phonetic'] == processed.loc[13, 'street_phonetic'] != ''
@@ -0,0 +1,88 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+import pytest
+from src.processing.preprocess_addresses import join_address_lines
+from src.processing.preprocess_utils import make_normalized_key
+from src.processing.table_io import (
+    RESULT_TYPES,
+    TRANSACTION_TYPES,
+    TableWriter,
+    count_records,
+    iter_batches,
+    read_table,
+    write_table
+)
+
+pyarrow = pytest.importorskip('pyarrow')
+
+@pytest.fixture
+def transactions():
+    return pd.DataFrame({
+        'transaction_id': [f"txn-{number}" for number in range(30)],
+        'original_address': [f"{number} Withers Street" for number in range(30)],
+        'normalized_address': [f"{number} WITHERS ST" for number in range(30)],
+        'house': [str(number) for number in range(30)],
+        'street': 'Withers',
+        'strtype': 'Street',
+        'apttype': ['' if number % 3 else 'Unit' for number in range(30)],
+        'aptnbr': ['' if number % 3 else 'NA' for number in range(30)],
+        'city': 'Brooklyn',
+        'state': 'NY',
+        'zip': '11211',
+        'street_phonetic': 'A0RS'
+    })
+
+def test_parquet_reads_like_csv(transactions, tmp_path):
+    csv_path, parquet_path = str(tmp_path / "t.csv"), str(tmp_path / "t.parquet")
+    for path in (csv_path, parquet_path):
+        with TableWriter(path, TRANSACTION_TYPES) as writer:
+            writer.write(transactions.iloc[:20])
+            writer.write(transactions.iloc[20:])
+        assert count_records(path) == 30
+
+    # Both formats keep the unit number "NA" and read empty fields as missing
+    from_csv = read_table(csv_path, dtype=str)
+    from_parquet = read_table(parquet_path)
+    pd.testing.assert_frame_equal(from_parquet, from_csv)
+    assert from_csv.loc[0, 'aptnbr'] == 'NA' and from_csv['aptnbr'].isna().sum() == 20
+    assert pyarrow.types.is_dictionary(pyarrow.parquet.read_schema(parquet_path).field('street').type)
+
+    batches = list(iter_batches(parquet_path, 12, columns=['transaction_id', 'aptnbr']))
+    assert [len(batch) for batch in batches] == [12, 12, 6]
+    assert list(batches[0].columns) == ['transaction_id', 'aptnbr']
+    pd.testing.assert_frame_equal(pd.concat(batches), from_csv[['transaction_id', 'aptnbr']])
+    csv_batches = list(iter_batches(csv_path, 12, columns=['transaction_id', 'aptnbr']))
+    pd.testing.assert_frame_equal(pd.concat(csv_batches), pd.concat(batches))
+
+def test_result_types(tmp_path):
+    path = str(tmp_path / "results.parquet")
+    results = pd.DataFrame({'transaction_id': ['a', 'b'], 'matched_address_id': [None, 'H1'],
+                            'confidence_score': [0.0, 0.95], 'match_type': ['no_match', 'fuzzy']})
+    write_table(results, path, RESULT_TYPES)
+    back = read_table(path)
+    assert back['confidence_score'].dtype == np.float64
+    assert back['matched_address_id'].isna().tolist() == [True, False]
+    assert back['match_type'].tolist() == ['no_match', 'fuzzy']
+
+def test_normalized_key_skips_missing_components():
+    assert make_normalized_key('12', 'Withers', np.nan, apttype=np.nan, aptnbr='2A') == '12 withers'
+    assert make_normalized_key(np.nan, 'Withers', 'St', city='') == 'withers st'
+
+def test_raw_null_is_missing(tmp_path):
+    path = str(tmp_path / "raw.csv")
+    with open(path, 'w') as f:
+        f.write("id,address_line_1,address_line_2\n"
+                "t1,465 Humboldt Street,NULL\n"
+                "t2,108 Withers Street,Unit NA\n"
+                "t3,12 Hope Street,\n")
+    raw = read_table(path, dtype=str)
+    assert raw['address_line_2'].isna().tolist() == [True, False, True]
+    batch, = iter_batches(path, 10, columns=['id', 'address_line_1', 'address_line_2'])
+    pd.testing.assert_frame_equal(batch, raw)
+    assert join_address_lines(batch).tolist() == ['465 Humboldt Street', '108 Withers Street Unit NA',
+                                                  '12 Hope Street']
@@ -0,0 +1,115 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from src.api.validator import AsyncValidatorClient
+from src.utils.performance_monitor import PerformanceMonitor
+
+class StubValidator(BaseHTTPRequestHandler):
+    """Echoes the posted address back with a fixed confidence"""
+
+    def do_POST(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            fail = server.failures_left > 0
+            if fail:
+                server.failures_left -= 1
+
+        address = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        time.sleep(server.delay)
+        body = json.dumps({'address': address, 'confidence': 0.9}).encode()
+
+        with server.lock:
+            server.in_flight -= 1
+        self.send_response(503 if fail else 200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubValidator)
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.in_flight = 0
+    server.max_in_flight = 0
+    server.failures_left = 0
+    server.delay = 0.0
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def make_client(server, **kwargs):
+    return AsyncValidatorClient(f"http://127.0.0.1:{server.server_address[1]}", backoff=0.01, **kwargs)
+
+def address(house, street='withers'):
+    return {'house': house, 'street': street, 'strtype': 'st', 'city': 'brooklyn', 'state': 'ny', 'zip': '11211'}
+
+def test_duplicates_and_cache_hits_skip_api_calls(stub_server):
+    client = make_client(stub_server)
+    monitor = PerformanceMonitor()
+
+    results = client.validate_batch([address('1'), address('2'), address('1')], monitor)
+    assert [result[0]['house'] for result in results] == ['1', '2', '1']
+    assert all(result[1] == 0.9 for result in results)
+    assert stub_server.requests == 2
+
+    client.validate_batch([address('1'), address('2')], monitor)
+    assert stub_server.requests == 2
+    assert monitor.api_calls == 2
+    assert monitor.api_cache_hits == 3
+    assert monitor.api_cost == pytest.approx(2 * client.cost_per_call)
+    client.close()
+
+def test_retries_server_errors_with_backoff(stub_server):
+    stub_server.failures_left = 2
+    client = make_client(stub_server, max_retries=3)
+
+    validated, confidence = client.validate_address(address('5'))
+    assert validated['house'] == '5' and confidence == 0.9
+    assert client.get_stats()['retries'] == 2
+    assert stub_server.requests == 3
+    client.close()
+
+def test_failed_validation_is_not_cached(stub_server):
+    stub_server.failures_left = 2
+    client = make_client(stub_server, max_retries=1)
+
+    assert client.validate_address(address('7')) == (None, None)
+    assert client.get_stats()['failures'] == 1
+    assert client.validate_address(address('7'))[0]['house'] == '7'
+    client.close()
+
+def test_concurrency_limit(stub_server):
+    stub_server.delay = 0.05
+    client = make_client(stub_server, max_concurrency=3)
+
+    client.validate_batch([address(str(house)) for house in range(12)])
+    assert stub_server.requests == 12
+    assert stub_server.max_in_flight <= 3
+    client.close()
+
+def test_cache_entries_expire(stub_server):
+    client = make_client(stub_server, cache_ttl=0.05)
+
+    client.validate_address(address('9'))
+    time.sleep(0.1)
+    client.validate_address(address('9'))
+    assert stub_server.requests == 2
+    client.close()